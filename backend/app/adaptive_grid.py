@@ -0,0 +1,128 @@
+import math
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .contouring import cell_segments, stitch_segments
+from .illuminance import ComputeBudgetExceeded
+
+
+# Cells whose corner range comes within this fraction of its own span of a level
+# are refined too, so peaks that fall between coarse samples are not lost.
+REFINE_MARGIN = 0.5
+
+
+class _SampleCache:
+    """
+    Sorted store of evaluated lattice points, keyed by j * width + i. A lookup
+    that would take it past `max_points` raises ComputeBudgetExceeded before
+    evaluating anything.
+    """
+
+    def __init__(self, evaluate: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                 origin: float, spacing: float, width: int, max_points: Optional[int] = None):
+        self._evaluate = evaluate
+        self._origin = origin
+        self._spacing = spacing
+        self._width = width
+        self._max_points = max_points
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._values = np.zeros(0)
+
+    @property
+    def size(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        if len(self._keys):
+            pos = np.minimum(np.searchsorted(self._keys, uniq), len(self._keys) - 1)
+            known = self._keys[pos] == uniq
+        else:
+            pos = np.zeros(len(uniq), dtype=np.intp)
+            known = np.zeros(len(uniq), dtype=bool)
+
+        values = np.empty(len(uniq))
+        values[known] = self._values[pos[known]]
+
+        missing = uniq[~known]
+        if self._max_points is not None and len(self._keys) + len(missing) > self._max_points:
+            raise ComputeBudgetExceeded("Adaptive evaluation exceeded its point budget.")
+        if len(missing):
+            j, i = np.divmod(missing, self._width)
+            new_values = self._evaluate(self._origin + i * self._spacing, self._origin + j * self._spacing)
+            values[~known] = new_values
+
+            merged_keys = np.concatenate((self._keys, missing))
+            merged_values = np.concatenate((self._values, new_values))
+            order = np.argsort(merged_keys, kind="stable")
+            self._keys = merged_keys[order]
+            self._values = merged_values[order]
+
+        return values[inverse.ravel()]
+
+
+def adaptive_isolines(
+    evaluate: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    half_extent: float,
+    spacing: float,
+    coarse_spacing: float,
+    levels: Sequence[float],
+    max_points: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[List[List[np.ndarray]], int]:
+    """
+    Quadtree evaluation of a scalar field on the square [-half_extent, half_extent]^2.
+
+    Starts from a lattice of `coarse_spacing` cells and recursively splits only the
+    cells whose corner values straddle one of `levels`, down to `spacing`. The
+    finest cells are contoured with marching squares, so the result matches a
+    dense grid at `spacing` while evaluating a small fraction of its points.
+
+    `evaluate(x, y)` receives flat coordinate arrays and returns field values.
+    ComputeBudgetExceeded is raised before more than `max_points` points would
+    be evaluated, or between refinement steps once `deadline` (a
+    time.monotonic() value) has passed.
+    Returns (paths per level in world coordinates, number of points evaluated).
+    """
+    levels = np.asarray(levels, dtype=float)
+    step = 2 ** max(0, int(math.ceil(math.log2(max(coarse_spacing / spacing, 1.0)))))
+    n = step * max(1, int(math.ceil(2 * half_extent / (spacing * step))))
+    width = n + 1
+    origin = -n * spacing / 2
+
+    cache = _SampleCache(evaluate, origin, spacing, width, max_points)
+
+    ci, cj = np.meshgrid(np.arange(0, n, step, dtype=np.int64), np.arange(0, n, step, dtype=np.int64))
+    ci, cj = ci.ravel(), cj.ravel()
+
+    while True:
+        if deadline is not None and time.monotonic() > deadline:
+            raise ComputeBudgetExceeded("Adaptive evaluation exceeded its time budget.")
+        base = cj * width + ci
+        corners = cache.lookup(np.concatenate((base, base + step, base + step * width + step, base + step * width)))
+        a, b, c, d = np.split(corners, 4)
+
+        vmin = np.minimum(np.minimum(a, b), np.minimum(c, d))
+        vmax = np.maximum(np.maximum(a, b), np.maximum(c, d))
+        margin = (vmax - vmin) * (REFINE_MARGIN if step > 1 else 0.0)
+        straddle = ((vmin - margin)[:, None] < levels) & ((vmax + margin)[:, None] >= levels)
+        keep = straddle.any(axis=1)
+
+        if step == 1:
+            ci, cj = ci[keep], cj[keep]
+            a, b, c, d = a[keep], b[keep], c[keep], d[keep]
+            break
+
+        half = step // 2
+        ci = (ci[keep][:, None] + np.array([0, half, 0, half])).ravel()
+        cj = (cj[keep][:, None] + np.array([0, 0, half, half])).ravel()
+        step = half
+
+    level_paths = []
+    for level in levels:
+        k1, k2, p1, p2, _ = cell_segments(ci, cj, a, b, c, d, level, width)
+        level_paths.append([origin + path * spacing for path in stitch_segments(k1, k2, p1, p2)])
+
+    return level_paths, cache.size
@@ -0,0 +1,104 @@
+import io
+import struct
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from matplotlib.path import Path
+
+
+# Binary grid layout (little endian): this header, then ny rows of nx float32
+# values, row 0 at y0. Cell (i, j) sits at (x0 + i * dx, y0 + j * dy).
+GRID_MAGIC = b"LDPGRID1"
+GRID_HEADER = struct.Struct("<8sIIdddd16s")
+
+# Values per streamed chunk (binary) and rows per chunk (CSV).
+BINARY_CHUNK_VALUES = 1 << 18
+CSV_CHUNK_POINTS = 1 << 16
+
+
+def grid_statistics(values: np.ndarray) -> Dict[str, Optional[float]]:
+    """Average, max, min and the avg/min and max/min uniformity ratios of a set of points."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return {"points": 0, "avg": None, "max": None, "min": None, "avgMin": None, "maxMin": None}
+
+    e_avg = float(values.mean(dtype=np.float64))
+    e_max = float(values.max())
+    e_min = float(values.min())
+    return {
+        "points": int(values.size),
+        "avg": e_avg,
+        "max": e_max,
+        "min": e_min,
+        # Uniformity ratios are undefined with a dark point
+        "avgMin": e_avg / e_min if e_min > 0 else None,
+        "maxMin": e_max / e_min if e_min > 0 else None,
+    }
+
+
+def area_values(x: np.ndarray, y: np.ndarray, values: np.ndarray, polygon: Sequence[Sequence[float]]) -> np.ndarray:
+    """Grid values whose points fall inside `polygon` (list of at least 3 [x, y] vertices)."""
+    poly = np.asarray(polygon, dtype=float)
+    if poly.ndim != 2 or poly.shape[1] != 2 or len(poly) < 3:
+        raise ValueError("polygon needs at least 3 [x, y] vertices.")
+    # Only test the points inside the polygon's bounding box
+    cols = slice(np.searchsorted(x, poly[:, 0].min(), side="left"), np.searchsorted(x, poly[:, 0].max(), side="right"))
+    rows = slice(np.searchsorted(y, poly[:, 1].min(), side="left"), np.searchsorted(y, poly[:, 1].max(), side="right"))
+    sub = values[rows, cols]
+    if sub.size == 0:
+        return sub.ravel()
+
+    # Orient counter-clockwise so a small positive radius keeps points lying
+    # exactly on the boundary (e.g. rectangular areas drawn on grid lines)
+    signed_area = np.sum(poly[:, 0] * np.roll(poly[:, 1], -1) - np.roll(poly[:, 0], -1) * poly[:, 1])
+    if signed_area < 0:
+        poly = poly[::-1]
+
+    xx, yy = np.meshgrid(x[cols], y[rows])
+    inside = Path(poly).contains_points(np.column_stack((xx.ravel(), yy.ravel())), radius=1e-9)
+    return sub.ravel()[inside]
+
+
+def iter_grid_binary(x: np.ndarray, y: np.ndarray, values: np.ndarray, units: str) -> Iterator[bytes]:
+    """Stream a uniform grid as GRID_HEADER followed by float32 rows."""
+    ny, nx = values.shape
+    dx = float(x[1] - x[0]) if nx > 1 else 0.0
+    dy = float(y[1] - y[0]) if ny > 1 else 0.0
+    yield GRID_HEADER.pack(GRID_MAGIC, nx, ny, float(x[0]), float(y[0]), dx, dy, units.encode("ascii", "ignore")[:16])
+
+    rows_per_chunk = max(1, BINARY_CHUNK_VALUES // max(nx, 1))
+    for r0 in range(0, ny, rows_per_chunk):
+        yield np.ascontiguousarray(values[r0:r0 + rows_per_chunk], dtype="<f4").tobytes()
+
+
+def iter_grid_csv(x: np.ndarray, y: np.ndarray, values: np.ndarray, units: str) -> Iterator[bytes]:
+    """Stream a grid as point-by-point `x,y,E` CSV rows, a few thousand at a time."""
+    ny, nx = values.shape
+    yield f"x,y,E_{units}\n".encode("ascii")
+
+    rows_per_chunk = max(1, CSV_CHUNK_POINTS // max(nx, 1))
+    for r0 in range(0, ny, rows_per_chunk):
+        block = values[r0:r0 + rows_per_chunk]
+        xx, yy = np.meshgrid(x, y[r0:r0 + block.shape[0]])
+        buffer = io.StringIO()
+        np.savetxt(buffer, np.column_stack((xx.ravel(), yy.ravel(), block.ravel())), fmt=["%.4f", "%.4f", "%.4g"], delimiter=",")
+        yield buffer.getvalue().encode("ascii")
+
+
+def calc_area_statistics(
+    x: np.ndarray, y: np.ndarray, values: np.ndarray, areas: List[Dict]
+) -> List[Dict]:
+    """
+    Statistics for each named calc area ({"name": ..., "polygon": [[x, y], ...]}).
+    Raises ValueError for a polygon with fewer than 3 vertices.
+    """
+    results = []
+    for area in areas:
+        try:
+            inside = area_values(x, y, values, area["polygon"])
+        except ValueError as e:
+            raise ValueError(f"Calc area {area['name']!r}: {e}")
+        stats = grid_statistics(inside)
+        stats["name"] = area["name"]
+        results.append(stats)
+    return results
@@ -0,0 +1,126 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, Iterator, Optional
+
+class ComparisonSession:
+    """
+    Both PDFs of a plan-set comparison, spooled to a private directory, plus the
+    sheet number -> page index map of each and the changed regions of revised
+    sheets, so previews and crops never re-upload or re-scan.
+    """
+    def __init__(self, session_id: str, directory: str, prev_path: str, curr_path: str,
+                 prev_pages: Dict[str, int], curr_pages: Dict[str, int]):
+        self.id = session_id
+        self.directory = directory
+        self.prev_path = prev_path
+        self.curr_path = curr_path
+        self.prev_pages = prev_pages
+        self.curr_pages = curr_pages
+        self.regions: Dict[str, list] = {}
+        self.size_bytes = os.path.getsize(prev_path) + os.path.getsize(curr_path)
+        self.created_at = time.time()
+        self.last_accessed_at = self.created_at
+        # Renders reading the PDFs; a session removed meanwhile is closed by the last one
+        self.users = 0
+        self.removed = False
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class ComparisonStore:
+    def __init__(self, max_sessions: int = 32, session_ttl_seconds: int = 3600,
+                 max_bytes: int = 2048 * 1024 * 1024):
+        self._sessions: Dict[str, ComparisonSession] = {}
+        self._max_sessions = max_sessions
+        self._session_ttl_seconds = session_ttl_seconds
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+
+    def _remove(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        if session.users:
+            session.removed = True
+        else:
+            session.close()
+
+    def _cleanup_expired_sessions(self):
+        now = time.time()
+        expired_ids = [
+            session_id
+            for session_id, session in self._sessions.items()
+            if (now - session.last_accessed_at) > self._session_ttl_seconds
+        ]
+        for session_id in expired_ids:
+            self._remove(session_id)
+
+    def _evict_if_needed(self, incoming_bytes: int):
+        while self._sessions and (
+            len(self._sessions) >= self._max_sessions
+            or sum(session.size_bytes for session in self._sessions.values()) + incoming_bytes > self._max_bytes
+        ):
+            oldest_session_id = min(
+                self._sessions,
+                key=lambda session_id: self._sessions[session_id].last_accessed_at
+            )
+            self._remove(oldest_session_id)
+
+    def add_session(self, session: ComparisonSession) -> ComparisonSession:
+        """
+        Stores `session` and returns it. Ids are content hashes, so if the same
+        pair is already stored that session is kept (it may be in use) and the
+        new one's files are deleted.
+        """
+        with self._lock:
+            self._cleanup_expired_sessions()
+            existing = self._sessions.get(session.id)
+            if existing:
+                session.close()
+                existing.last_accessed_at = time.time()
+                return existing
+            self._evict_if_needed(session.size_bytes)
+            self._sessions[session.id] = session
+            return session
+
+    def get_session(self, session_id: str) -> Optional[ComparisonSession]:
+        with self._lock:
+            self._cleanup_expired_sessions()
+            session = self._sessions.get(session_id)
+            if session:
+                session.last_accessed_at = time.time()
+            return session
+
+    @contextmanager
+    def use_session(self, session_id: str) -> Iterator[Optional[ComparisonSession]]:
+        """
+        Like get_session, but the session's files are kept on disk until the
+        block exits even if the session is evicted or expires meanwhile.
+        """
+        with self._lock:
+            self._cleanup_expired_sessions()
+            session = self._sessions.get(session_id)
+            if session:
+                session.last_accessed_at = time.time()
+                session.users += 1
+        try:
+            yield session
+        finally:
+            if session:
+                with self._lock:
+                    session.users -= 1
+                    if session.removed and not session.users:
+                        session.close()
+
+    def remove_session(self, session_id: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+# Global instance
+comparison_store = ComparisonStore(
+    max_sessions=int(os.getenv("CHANGE_NARRATIVE_MAX_SESSIONS", "32")),
+    session_ttl_seconds=int(os.getenv("CHANGE_NARRATIVE_SESSION_TTL", "3600")),
+    max_bytes=int(float(os.getenv("CHANGE_NARRATIVE_SESSION_MB", "2048")) * 1024 * 1024)
+)
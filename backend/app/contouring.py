@@ -0,0 +1,248 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+# Marching-squares segment table. Corners are a=(i, j), b=(i+1, j), c=(i+1, j+1),
+# d=(i, j+1); edges are 0=a-b (bottom), 1=b-c (right), 2=d-c (top), 3=a-d (left).
+# Case bit k is set when corner k (a, b, c, d) is at or above the level.
+# Saddles (5, 10) are listed as (center below, center above).
+_CASE_SEGMENTS = {
+    1: [(3, 0)],
+    2: [(0, 1)],
+    3: [(3, 1)],
+    4: [(1, 2)],
+    6: [(0, 2)],
+    7: [(3, 2)],
+    8: [(2, 3)],
+    9: [(0, 2)],
+    11: [(1, 2)],
+    12: [(3, 1)],
+    13: [(0, 1)],
+    14: [(3, 0)],
+}
+_SADDLE_SEGMENTS = {
+    5: ([(3, 0), (1, 2)], [(0, 1), (2, 3)]),
+    10: ([(0, 1), (2, 3)], [(3, 0), (1, 2)]),
+}
+
+
+def _edge_crossings(p: np.ndarray, q: np.ndarray, level: float) -> np.ndarray:
+    """Fractional position of the level crossing along an edge from p to q."""
+    denom = q - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(denom != 0, (level - p) / denom, 0.5)
+    return np.clip(t, 0.0, 1.0)
+
+
+# Cell rows per tile when contouring dense grids.
+TILE_ROWS = 256
+
+
+def cell_segments(ci, cj, a, b, c, d, level, width: int):
+    """
+    Vectorized marching squares over an arbitrary set of unit lattice cells.
+
+    ci, cj are the integer lattice coordinates of each cell's lower-left corner
+    and a, b, c, d its corner values. `level` is a scalar or one level per cell. `width` is the number of lattice points
+    per row and is only used to build globally unique edge keys, so segments
+    from neighbouring cells share endpoint keys and can be stitched exactly.
+
+    Returns (k1, k2, p1, p2, src): the edge keys and lattice-space (x, y)
+    endpoints of every segment, and the index of the input cell it came from.
+    """
+    case = (
+        (a >= level).astype(np.uint8)
+        | ((b >= level).astype(np.uint8) << 1)
+        | ((c >= level).astype(np.uint8) << 2)
+        | ((d >= level).astype(np.uint8) << 3)
+    )
+
+    # Edge points are computed in the canonical direction of each lattice edge
+    # (low index -> high index) so both neighbouring cells produce identical values.
+    base = cj * width + ci
+    keys = (
+        2 * base,                   # 0: horizontal edge at (i, j)
+        2 * (base + 1) + 1,         # 1: vertical edge at (i+1, j)
+        2 * (base + width),         # 2: horizontal edge at (i, j+1)
+        2 * base + 1,               # 3: vertical edge at (i, j)
+    )
+    fx = ci.astype(float)
+    fy = cj.astype(float)
+    xs = (fx + _edge_crossings(a, b, level), fx + 1.0, fx + _edge_crossings(d, c, level), fx)
+    ys = (fy, fy + _edge_crossings(b, c, level), fy + 1.0, fy + _edge_crossings(a, d, level))
+
+    k1, k2, p1, p2, src = [], [], [], [], []
+
+    def emit(sel, pairs):
+        idx = np.nonzero(sel)[0]
+        for e1, e2 in pairs:
+            src.append(idx)
+            k1.append(keys[e1][sel])
+            k2.append(keys[e2][sel])
+            p1.append(np.column_stack((xs[e1][sel], ys[e1][sel])))
+            p2.append(np.column_stack((xs[e2][sel], ys[e2][sel])))
+
+    for case_id, pairs in _CASE_SEGMENTS.items():
+        sel = case == case_id
+        if sel.any():
+            emit(sel, pairs)
+
+    center_above = (a + b + c + d) * 0.25 >= level
+    for case_id, (below, above) in _SADDLE_SEGMENTS.items():
+        sel = case == case_id
+        if sel.any():
+            emit(sel & ~center_above, below)
+            emit(sel & center_above, above)
+
+    if not k1:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros((0, 2)), np.zeros((0, 2)), empty
+    return (
+        np.concatenate(k1), np.concatenate(k2),
+        np.concatenate(p1), np.concatenate(p2),
+        np.concatenate(src)
+    )
+
+
+def stitch_segments(k1: np.ndarray, k2: np.ndarray, p1: np.ndarray, p2: np.ndarray) -> List[np.ndarray]:
+    """
+    Join unordered two-point segments into polylines by their shared edge keys.
+    Each lattice edge is crossed at most once per level, so every key joins at
+    most two segments. Closed rings end on a copy of their first vertex.
+    """
+    m = len(k1)
+    if m == 0:
+        return []
+
+    # Endpoint e belongs to segment e % m; its other end is (e + m) % (2m).
+    keys = np.concatenate((k1, k2))
+    pts = np.concatenate((p1, p2))
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    shared = np.nonzero(sorted_keys[1:] == sorted_keys[:-1])[0]
+    partner = np.full(2 * m, -1, dtype=np.int64)
+    partner[order[shared]] = order[shared + 1]
+    partner[order[shared + 1]] = order[shared]
+
+    partner_l = partner.tolist()
+    visited = bytearray(m)
+    paths = []
+
+    def walk(start):
+        chain = [start]
+        e = start
+        while True:
+            seg = e % m
+            visited[seg] = 1
+            other = (e + m) % (2 * m)
+            chain.append(other)
+            nxt = partner_l[other]
+            if nxt < 0 or visited[nxt % m]:
+                return chain
+            e = nxt
+
+    # Open chains start at an endpoint without a partner
+    for e in np.nonzero(partner < 0)[0].tolist():
+        if not visited[e % m]:
+            chain = walk(e)
+            paths.append(pts[chain])
+
+    # Everything left forms closed rings; the walk ends on the start point's twin
+    for seg in range(m):
+        if not visited[seg]:
+            chain = walk(seg)
+            paths.append(pts[chain])
+
+    return paths
+
+
+def _tile_segments(z: np.ndarray, levels: np.ndarray, row0: int, row1: int):
+    """Segments of every level crossing the cell rows [row0, row1) of a dense grid."""
+    a = z[row0:row1, :-1]
+    b = z[row0:row1, 1:]
+    c = z[row0 + 1:row1 + 1, 1:]
+    d = z[row0 + 1:row1 + 1, :-1]
+
+    # One pass over the tile: a cell crosses levels[lo:hi], i.e. vmin < level <= vmax
+    vmin = np.minimum(np.minimum(a, b), np.minimum(c, d)).ravel()
+    vmax = np.maximum(np.maximum(a, b), np.maximum(c, d)).ravel()
+    lo = np.searchsorted(levels, vmin, side="right")
+    hi = np.searchsorted(levels, vmax, side="right")
+    cells = np.nonzero(hi > lo)[0]
+    if len(cells) == 0:
+        return None
+
+    # Expand to one (cell, level) pair per crossing
+    counts = (hi - lo)[cells]
+    pair_cell = np.repeat(cells, counts)
+    pair_level = lo[pair_cell] + np.arange(len(pair_cell)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    cj, ci = np.divmod(pair_cell, z.shape[1] - 1)
+    k1, k2, p1, p2, src = cell_segments(
+        ci, cj + row0,
+        a.ravel()[pair_cell], b.ravel()[pair_cell], c.ravel()[pair_cell], d.ravel()[pair_cell],
+        levels[pair_level], z.shape[1]
+    )
+    return k1, k2, p1, p2, pair_level[src]
+
+
+def contour_grid(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    levels: Sequence[float],
+    max_workers: Optional[int] = None,
+) -> List[List[np.ndarray]]:
+    """
+    Contour a dense (ny, nx) grid at several levels without matplotlib.
+
+    x (nx,) and y (ny,) are the monotonic axis coordinates of z's columns and rows.
+    Row tiles are scanned for crossing cells of all levels at once and run on a
+    thread pool (the numpy work releases the GIL); tile seams need no special
+    handling because edge keys are global. Holds no shared state, so it is safe
+    to call concurrently. Returns one list of (N, 2) paths per entry of `levels`.
+    """
+    z = np.asarray(z)
+    if z.dtype.kind != "f":
+        z = z.astype(float)
+    levels = np.asarray(levels, dtype=float)
+    if z.ndim != 2 or min(z.shape) < 2 or len(levels) == 0:
+        return [[] for _ in levels]
+
+    # Deduplicate and sort so each cell's crossings form a contiguous range
+    uniq_levels, level_index = np.unique(levels, return_inverse=True)
+
+    n_rows = z.shape[0] - 1
+    bounds = [(r, min(r + TILE_ROWS, n_rows)) for r in range(0, n_rows, TILE_ROWS)]
+    if len(bounds) == 1:
+        tiles = [_tile_segments(z, uniq_levels, *bounds[0])]
+    else:
+        workers = max_workers or min(len(bounds), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            tiles = list(pool.map(lambda b: _tile_segments(z, uniq_levels, *b), bounds))
+    tiles = [t for t in tiles if t is not None]
+    if not tiles:
+        return [[] for _ in levels]
+
+    k1, k2, p1, p2, seg_level = (np.concatenate(parts) for parts in zip(*tiles))
+
+    # Lattice -> world coordinates (handles non-uniform axes too)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    lattice_x = np.arange(len(x))
+    lattice_y = np.arange(len(y))
+
+    def to_world(path):
+        return np.column_stack((np.interp(path[:, 0], lattice_x, x), np.interp(path[:, 1], lattice_y, y)))
+
+    order = np.argsort(seg_level, kind="stable")
+    splits = np.searchsorted(seg_level[order], np.arange(1, len(uniq_levels)))
+    per_level = []
+    for sel in np.split(order, splits):
+        paths = stitch_segments(k1[sel], k2[sel], p1[sel], p2[sel])
+        per_level.append([to_world(path) for path in paths])
+
+    return [per_level[i] for i in level_index.ravel()]
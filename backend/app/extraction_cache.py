@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+# Bump when the extractor's output changes so older entries are ignored.
+EXTRACTION_VERSION = 2
+
+class ExtractionCache:
+    """
+    On-disk, content-addressed store of per-page extraction results of whole PDFs
+    (text blocks, sheet number/title/kind, page fingerprints), keyed by the SHA-1
+    of the file. One JSON file per document; the least recently used files are
+    pruned once the directory grows beyond `max_bytes`.
+    """
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self._directory, f"{file_hash}.json")
+
+    def get(self, file_hash: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(file_hash)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != EXTRACTION_VERSION:
+            return None
+        # Access time drives pruning; mtime is kept as the write time
+        try:
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except OSError:
+            pass
+        return entry["pages"]
+
+    def put(self, file_hash: str, pages: List[Dict[str, Any]]):
+        os.makedirs(self._directory, exist_ok=True)
+        # Write to a temporary file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": EXTRACTION_VERSION, "pages": pages}, f, separators=(",", ":"))
+            os.replace(tmp_path, self._path(file_hash))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._prune()
+
+    def _prune(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self._directory):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self._max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+# Global instance
+extraction_cache = ExtractionCache(
+    os.getenv("CHANGE_NARRATIVE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "change-narrative-cache")),
+    max_bytes=int(float(os.getenv("CHANGE_NARRATIVE_CACHE_MB", "512")) * 1024 * 1024)
+)
@@ -0,0 +1,124 @@
+import os
+import uuid
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+import numpy as np
+
+class GridResult:
+    def __init__(self, key: Optional[Hashable], x: np.ndarray, y: np.ndarray, values: np.ndarray, meta: Dict[str, Any]):
+        self.id = str(uuid.uuid4())
+        self.key = key
+        self.x = x
+        self.y = y
+        self.values = values
+        # Response fields (units, extents, ...) needed to rebuild a ComputeResponse
+        self.meta = meta
+        self.created_at = time.time()
+        self.last_accessed_at = self.created_at
+
+    @property
+    def nbytes(self) -> int:
+        return self.x.nbytes + self.y.nbytes + self.values.nbytes
+
+class GridStore:
+    """
+    Memory-bounded LRU of computed illuminance grids, addressable both by result id
+    and by the inputs that produced them, so unchanged inputs never recompute.
+    """
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, result_ttl_seconds: int = 3600):
+        self._results: Dict[str, GridResult] = {}
+        self._by_key: Dict[Hashable, str] = {}
+        self._max_bytes = max_bytes
+        self._result_ttl_seconds = result_ttl_seconds
+        self._bytes = 0
+        self._lock = Lock()
+
+    def _remove(self, result_id: str):
+        result = self._results.pop(result_id)
+        self._bytes -= result.nbytes
+        if result.key is not None and self._by_key.get(result.key) == result_id:
+            del self._by_key[result.key]
+
+    def _cleanup_expired_results(self):
+        now = time.time()
+        expired_ids = [
+            result_id
+            for result_id, result in self._results.items()
+            if (now - result.last_accessed_at) > self._result_ttl_seconds
+        ]
+        for result_id in expired_ids:
+            self._remove(result_id)
+
+    def _evict_if_needed(self, incoming_bytes: int):
+        while self._results and self._bytes + incoming_bytes > self._max_bytes:
+            oldest_result_id = min(
+                self._results,
+                key=lambda result_id: self._results[result_id].last_accessed_at
+            )
+            self._remove(oldest_result_id)
+
+    def add_result(self, key: Optional[Hashable], x: np.ndarray, y: np.ndarray, values: np.ndarray, meta: Dict[str, Any]) -> str:
+        # Cached grids are shared between requests, so make them read-only
+        values.setflags(write=False)
+        with self._lock:
+            self._cleanup_expired_results()
+            if key is not None and key in self._by_key:
+                self._remove(self._by_key[key])
+            result = GridResult(key, x, y, values, meta)
+            if result.nbytes > self._max_bytes:
+                return result.id
+            self._evict_if_needed(result.nbytes)
+            self._results[result.id] = result
+            self._bytes += result.nbytes
+            if key is not None:
+                self._by_key[key] = result.id
+            return result.id
+
+    def get_result(self, result_id: str) -> Optional[GridResult]:
+        with self._lock:
+            self._cleanup_expired_results()
+            result = self._results.get(result_id)
+            if result:
+                result.last_accessed_at = time.time()
+            return result
+
+    def find_result(self, key: Hashable) -> Optional[GridResult]:
+        with self._lock:
+            self._cleanup_expired_results()
+            result_id = self._by_key.get(key)
+            result = self._results.get(result_id) if result_id else None
+            if result:
+                result.last_accessed_at = time.time()
+            return result
+
+# Global instance
+grid_store = GridStore(max_bytes=int(float(os.getenv("ISOLINE_CACHE_MB", "512")) * 1024 * 1024))
+
+class ExportCache:
+    """Memory-bounded LRU of rendered export files (PDF/PNG bytes) keyed by a request hash."""
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self._files: "OrderedDict[str, bytes]" = OrderedDict()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._files.get(key)
+            if data is not None:
+                self._files.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            if key in self._files or len(data) > self._max_bytes:
+                return
+            self._files[key] = data
+            self._bytes += len(data)
+            while self._bytes > self._max_bytes:
+                _, evicted = self._files.popitem(last=False)
+                self._bytes -= len(evicted)
+
+export_cache = ExportCache(max_bytes=int(float(os.getenv("ISOLINE_EXPORT_CACHE_MB", "128")) * 1024 * 1024))
@@ -0,0 +1,581 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+
+# Grid spacing (in project units) for each detail level of the UI selector.
+DETAIL_SPACING = {"low": 2.0, "medium": 1.0, "high": 0.5}
+
+
+def grid_spacing(detail_level: str) -> float:
+    return DETAIL_SPACING.get(detail_level, DETAIL_SPACING["medium"])
+
+
+def photometry_hash(content: bytes) -> str:
+    """Content hash of an uploaded photometric file, used as a cache key."""
+    return hashlib.sha1(content).hexdigest()
+
+
+def rotation_matrix_x(angle_deg):
+    rad = np.radians(angle_deg)
+    c, s = np.cos(rad), np.sin(rad)
+    return np.array([
+        [1, 0, 0],
+        [0, c, -s],
+        [0, s, c]
+    ])
+
+
+def rotation_matrix_y(angle_deg):
+    rad = np.radians(angle_deg)
+    c, s = np.cos(rad), np.sin(rad)
+    return np.array([
+        [c, 0, s],
+        [0, 1, 0],
+        [-s, 0, c]
+    ])
+
+
+def rotation_matrix_z(angle_deg):
+    rad = np.radians(angle_deg)
+    c, s = np.cos(rad), np.sin(rad)
+    return np.array([
+        [c, -s, 0],
+        [s, c, 0],
+        [0, 0, 1]
+    ])
+
+
+def inverse_rotation(rot_x: float = 0.0, rot_y: float = 0.0, rot_z: float = 0.0) -> np.ndarray:
+    """
+    Global -> luminaire-local rotation.
+    The luminaire is tilted about X, then rolled about Y, then oriented about Z,
+    so v_global = Rz * Ry * Rx * v_local and v_local = Rx' * Ry' * Rz' * v_global.
+    """
+    return rotation_matrix_x(-rot_x) @ (rotation_matrix_y(-rot_y) @ rotation_matrix_z(-rot_z))
+
+
+def build_candela_interpolator(ies_data: Dict) -> RegularGridInterpolator:
+    """Bilinear (H, V) candela lookup for a parsed IES distribution."""
+    interp_h_angles = ies_data["horiz_angles"]
+    interp_cd_matrix = ies_data["candela_matrix"]
+
+    # Type V / rotational symmetry (single horizontal angle): expand to [0, 360]
+    # so the interpolator has a valid grid and returns a constant H lookup.
+    if len(interp_h_angles) == 1:
+        interp_h_angles = np.array([0.0, 360.0])
+        interp_cd_matrix = np.vstack((interp_cd_matrix, interp_cd_matrix))
+
+    return RegularGridInterpolator(
+        (interp_h_angles, ies_data["vert_angles"]),
+        interp_cd_matrix,
+        bounds_error=False,
+        fill_value=0  # If out of bounds of V (e.g. >90 for direct), assume 0
+    )
+
+
+def fold_horizontal_angles(h_angles: np.ndarray, ies_horiz_angles: np.ndarray) -> np.ndarray:
+    """Map [0, 360) horizontal angles into the range covered by symmetric IES data (in place)."""
+    if len(ies_horiz_angles) > 1:
+        original_max_h = ies_horiz_angles[-1]
+        if np.isclose(original_max_h, 90):
+            # Quadrilateral
+            mask1 = (h_angles > 90) & (h_angles <= 180)
+            h_angles[mask1] = 180 - h_angles[mask1]
+            mask2 = (h_angles > 180) & (h_angles <= 270)
+            h_angles[mask2] = h_angles[mask2] - 180
+            mask3 = (h_angles > 270)
+            h_angles[mask3] = 360 - h_angles[mask3]
+        elif np.isclose(original_max_h, 180):
+            # Bilateral
+            mask = h_angles > 180
+            h_angles[mask] = 360 - h_angles[mask]
+    return h_angles
+
+
+def illuminance_at_points(
+    ies_data: Dict,
+    px: np.ndarray,
+    py: np.ndarray,
+    mh: float,
+    calc_plane: float,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+    interp: Optional[RegularGridInterpolator] = None,
+) -> np.ndarray:
+    """
+    Horizontal illuminance at arbitrary calc-plane points (px, py) from a single
+    luminaire at (0, 0, mh). Returns a flat array with one value per point.
+    """
+    px = np.asarray(px, dtype=float).ravel()
+    py = np.asarray(py, dtype=float).ravel()
+
+    dz = mh - calc_plane
+    if dz <= 0:
+        return np.zeros(px.size)
+
+    if interp is None:
+        interp = build_candela_interpolator(ies_data)
+
+    # Vector from luminaire (0, 0, mh) to the grid points (px, py, calc_plane)
+    v_global = np.vstack((px, py, np.full(px.size, -dz)))
+    v_local = inverse_rotation(rot_x, rot_y, rot_z) @ v_global
+
+    lx = v_local[0, :]
+    ly = v_local[1, :]
+    lz = v_local[2, :]
+
+    # Distance is invariant under the rotation
+    d = np.sqrt(lx**2 + ly**2 + lz**2)
+    d[d == 0] = 1e-9
+
+    # Type C: vertical angle measured from nadir (0, 0, -1) in the local frame
+    cos_theta = np.clip(-lz / d, -1.0, 1.0)
+    v_angles = np.degrees(np.arccos(cos_theta))
+
+    h_angles = np.degrees(np.arctan2(ly, lx))
+    h_angles = (h_angles + 360) % 360
+    fold_horizontal_angles(h_angles, ies_data["horiz_angles"])
+
+    cd_values = interp(np.column_stack((h_angles, v_angles)))
+
+    # E = I * cos(incidence) / d^2, and the (unrotated) plane gives cos = dz / d
+    illuminance = (cd_values * dz) / (d**3)
+    illuminance *= llf
+    return illuminance
+
+
+# Points per tile of the streamed grid kernel; scratch memory is ~15 float32 buffers of this size.
+TILE_POINTS = 65536
+
+
+class ComputeBudgetExceeded(RuntimeError):
+    pass
+
+
+class CandelaTable:
+    """
+    float32 bilinear candela lookup equivalent to build_candela_interpolator,
+    written against caller-provided buffers so the grid kernel can reuse them.
+    """
+
+    def __init__(self, ies_data: Dict):
+        h_angles = np.asarray(ies_data["horiz_angles"], dtype=np.float64)
+        table = np.asarray(ies_data["candela_matrix"], dtype=np.float64)
+        if len(h_angles) == 1:
+            h_angles = np.array([0.0, 360.0])
+            table = np.vstack((table, table))
+
+        self.h_axis = h_angles.astype(np.float32)
+        self.v_axis = np.asarray(ies_data["vert_angles"], dtype=np.float32)
+        self.h_inv = self._inverse_steps(h_angles)
+        self.v_inv = self._inverse_steps(np.asarray(ies_data["vert_angles"], dtype=np.float64))
+        self.nv = len(self.v_axis)
+        self.flat = np.ascontiguousarray(table, dtype=np.float32).ravel()
+        self.fold = None
+        if len(ies_data["horiz_angles"]) > 1:
+            max_h = ies_data["horiz_angles"][-1]
+            if np.isclose(max_h, 90):
+                self.fold = "quadrilateral"
+            elif np.isclose(max_h, 180):
+                self.fold = "bilateral"
+
+    @staticmethod
+    def _inverse_steps(axis: np.ndarray) -> np.ndarray:
+        steps = np.diff(axis)
+        inv = np.divide(1.0, steps, out=np.zeros_like(steps), where=steps != 0)
+        return np.append(inv, 0.0).astype(np.float32)
+
+    def fold_in_place(self, h: np.ndarray):
+        """Same mapping as fold_horizontal_angles, for h in [0, 360), without masks."""
+        if self.fold is None:
+            return
+        # Bilateral: h -> 180 - |180 - h|; quadrilateral folds that again about 90
+        np.subtract(h, 180.0, out=h)
+        np.abs(h, out=h)
+        np.subtract(180.0, h, out=h)
+        if self.fold == "quadrilateral":
+            np.subtract(h, 90.0, out=h)
+            np.abs(h, out=h)
+            np.subtract(90.0, h, out=h)
+
+    def _axis_weights(self, axis, inv, values, index_out, weight_out):
+        idx = np.searchsorted(axis, values, side="right") - 1
+        np.clip(idx, 0, max(len(axis) - 2, 0), out=idx)
+        index_out[:] = idx
+        np.subtract(values, axis[idx], out=weight_out)
+        np.multiply(weight_out, inv[idx], out=weight_out)
+
+    def lookup(self, h: np.ndarray, v: np.ndarray, out: np.ndarray, scratch: Dict[str, np.ndarray]):
+        """Candela at (h, v) into `out`; zero outside the photometric web like the interpolator."""
+        ih, iv = scratch["ih"], scratch["iv"]
+        th, tv = scratch["th"], scratch["tv"]
+        c0, c1 = scratch["c0"], scratch["c1"]
+        self._axis_weights(self.h_axis, self.h_inv, h, ih, th)
+        self._axis_weights(self.v_axis, self.v_inv, v, iv, tv)
+
+        # Flat index of the lower-left table entry
+        np.multiply(ih, self.nv, out=ih)
+        np.add(ih, iv, out=ih)
+        upper = iv  # reuse: iv is folded into ih now
+        np.add(ih, 1 if self.nv > 1 else 0, out=upper)
+
+        # Interpolate along V on both H rows, then along H
+        np.take(self.flat, ih, out=c0)
+        np.take(self.flat, upper, out=c1)
+        np.subtract(c1, c0, out=c1)
+        np.multiply(c1, tv, out=c1)
+        np.add(c0, c1, out=out)
+
+        np.add(ih, self.nv, out=ih)
+        np.add(upper, self.nv, out=upper)
+        np.take(self.flat, ih, out=c0, mode="clip")
+        np.take(self.flat, upper, out=c1, mode="clip")
+        np.subtract(c1, c0, out=c1)
+        np.multiply(c1, tv, out=c1)
+        np.add(c0, c1, out=c0)
+
+        np.subtract(c0, out, out=c0)
+        np.multiply(c0, th, out=c0)
+        np.add(out, c0, out=out)
+
+        outside = (v < self.v_axis[0]) | (v > self.v_axis[-1]) | (h < self.h_axis[0]) | (h > self.h_axis[-1])
+        out[outside] = 0.0
+        return out
+
+
+# Candela tables kept for the most recently used photometry files.
+CANDELA_TABLE_CACHE_SIZE = 16
+
+_candela_tables: "OrderedDict[str, CandelaTable]" = OrderedDict()
+_candela_tables_lock = Lock()
+
+
+def candela_table(photometry_key: str, ies_data: Dict) -> CandelaTable:
+    """CandelaTable of a parsed file, shared by every request for the same photometry_hash."""
+    with _candela_tables_lock:
+        table = _candela_tables.get(photometry_key)
+        if table is not None:
+            _candela_tables.move_to_end(photometry_key)
+            return table
+    table = CandelaTable(ies_data)
+    with _candela_tables_lock:
+        _candela_tables[photometry_key] = table
+        while len(_candela_tables) > CANDELA_TABLE_CACHE_SIZE:
+            _candela_tables.popitem(last=False)
+    return table
+
+
+def grid_axes(radius: float, spacing: float):
+    """Axis coordinates of the square calc grid used by compute_grid."""
+    x = np.arange(-radius, radius + spacing, spacing)
+    return x, x.copy()
+
+
+def grid_memory_bytes(nx: int, ny: int) -> int:
+    """Peak bytes of a streamed grid evaluation: the float32 output plus one tile of scratch."""
+    return nx * ny * 4 + TILE_POINTS * 4 * 16
+
+
+def plane_basis(origin, u_axis, v_axis):
+    """
+    (origin, u, v, normal) of a calc plane spanned by `u_axis` and `v_axis`: u is
+    normalized, v is made orthogonal to it, and the lit side faces u x v.
+    """
+    origin = np.asarray(origin, dtype=np.float64)
+    u = np.asarray(u_axis, dtype=np.float64)
+    v = np.asarray(v_axis, dtype=np.float64)
+    u_len = np.linalg.norm(u)
+    if u_len == 0:
+        raise ValueError("Plane axes must not be zero.")
+    u = u / u_len
+    v = v - np.dot(v, u) * u
+    v_len = np.linalg.norm(v)
+    if v_len < 1e-9:
+        raise ValueError("Plane axes must not be parallel.")
+    v = v / v_len
+    return origin, u, v, np.cross(u, v)
+
+
+def _tile_buffers(points: int) -> Dict[str, np.ndarray]:
+    """Flat scratch buffers for tiles of up to `points` points."""
+    buf = {name: np.empty(points, dtype=np.float32) for name in ("lx", "ly", "lz", "a", "b", "th", "tv", "c0", "c1")}
+    buf["ih"] = np.empty(points, dtype=np.intp)
+    buf["iv"] = np.empty(points, dtype=np.intp)
+    return buf
+
+
+def _tile_points(ns: int, nt: int) -> int:
+    """Points per tile of an (nt, ns) plane: whole rows, about TILE_POINTS."""
+    return min(max(1, TILE_POINTS // max(ns, 1)), nt) * ns
+
+
+def compute_plane_tiled(
+    ies_data: Dict,
+    s: np.ndarray,
+    t: np.ndarray,
+    origin,
+    u_axis,
+    v_axis,
+    luminaire,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+    out: Optional[np.ndarray] = None,
+    deadline: Optional[float] = None,
+    table: Optional[CandelaTable] = None,
+    scratch: Optional[Dict[str, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Illuminance of a luminaire at `luminaire` (x, y, z) on the plane points
+    origin + s * u + t * v for s (ns,) by t (nt,), as a float32 (nt, ns) array.
+    The plane is lit from its u x v side (see plane_basis); a luminaire behind
+    it contributes nothing.
+
+    Rows are evaluated in tiles of about TILE_POINTS points using one set of
+    preallocated float32 scratch buffers (`scratch`, see _tile_buffers), so
+    peak memory is the output plus a constant. `deadline` (a time.monotonic() value) is checked between tiles and raises
+    ComputeBudgetExceeded once passed.
+    """
+    import time
+
+    s = np.asarray(s, dtype=np.float32)
+    t = np.asarray(t, dtype=np.float32)
+    ns, nt = len(s), len(t)
+    if out is None:
+        out = np.empty((nt, ns), dtype=np.float32)
+
+    origin, u, v, normal = plane_basis(origin, u_axis, v_axis)
+    to_plane = origin - np.asarray(luminaire, dtype=np.float64)
+    # E = I * cos(incidence) / d^2 with cos = (L - o) . n / d: the numerator is
+    # the luminaire's height above the plane, the same for every point
+    height = -float(np.dot(to_plane, normal))
+    if height <= 0:
+        out[:] = 0.0
+        return out
+
+    if table is None:
+        table = CandelaTable(ies_data)
+    r = inverse_rotation(rot_x, rot_y, rot_z)
+    # v_local = R_inv @ (o - L + s * u + t * v): a constant, a column and a row term
+    base = (r @ to_plane).astype(np.float32)
+    r_u = (r @ u).astype(np.float32)
+    r_v = (r @ v).astype(np.float32)
+    scale = np.float32(height * llf)
+
+    rows_per_tile = max(1, _tile_points(ns, nt) // max(ns, 1))
+    if scratch is None or scratch["lx"].size < rows_per_tile * ns:
+        scratch = _tile_buffers(rows_per_tile * ns)
+    buf = {name: arr[:rows_per_tile * ns].reshape(rows_per_tile, ns) for name, arr in scratch.items()}
+
+    # Column terms of the rotated vectors are shared by every tile
+    col_terms = [r_u[k] * s[None, :] for k in range(3)]
+
+    for r0 in range(0, nt, rows_per_tile):
+        if deadline is not None and time.monotonic() > deadline:
+            raise ComputeBudgetExceeded("Grid evaluation exceeded its time budget.")
+
+        rows = min(rows_per_tile, nt - r0)
+        view = {name: arr[:rows] for name, arr in buf.items()}
+        lx, ly, lz, a, b = view["lx"], view["ly"], view["lz"], view["a"], view["b"]
+        tc = t[r0:r0 + rows, None]
+
+        for k, target in enumerate((lx, ly, lz)):
+            np.add(col_terms[k], r_v[k] * tc + base[k], out=target)
+
+        # Vertical angle from nadir and horizontal angle, in degrees
+        np.hypot(lx, ly, out=a)
+        np.negative(lz, out=b)
+        np.arctan2(a, b, out=a)
+        np.degrees(a, out=a)
+        np.arctan2(ly, lx, out=b)
+        np.degrees(b, out=b)
+        np.add(b, 360.0, out=b)
+        np.mod(b, 360.0, out=b)
+        table.fold_in_place(b)
+
+        # d^2 into lz (lx, ly are no longer needed after this)
+        np.multiply(lz, lz, out=lz)
+        np.multiply(lx, lx, out=lx)
+        np.add(lz, lx, out=lz)
+        np.multiply(ly, ly, out=ly)
+        np.add(lz, ly, out=lz)
+        np.maximum(lz, np.float32(1e-18), out=lz)
+
+        target = out[r0:r0 + rows]
+        table.lookup(b, a, target, view)
+
+        # E = I * height / d^3
+        np.sqrt(lz, out=lx)
+        np.multiply(lx, lz, out=lx)
+        np.divide(target, lx, out=target)
+        np.multiply(target, scale, out=target)
+
+    return out
+
+
+def compute_grid_tiled(
+    ies_data: Dict,
+    x: np.ndarray,
+    y: np.ndarray,
+    mh: float,
+    calc_plane: float,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+    out: Optional[np.ndarray] = None,
+    deadline: Optional[float] = None,
+    table: Optional[CandelaTable] = None,
+) -> np.ndarray:
+    """
+    Horizontal illuminance of a luminaire at (0, 0, mh) on the rectilinear grid
+    x (nx,) by y (ny,), as a float32 (ny, nx) array: compute_plane_tiled on the
+    upward-facing plane z = calc_plane.
+    """
+    return compute_plane_tiled(
+        ies_data, x, y, (0.0, 0.0, calc_plane), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, mh), llf,
+        rot_x, rot_y, rot_z, out=out, deadline=deadline, table=table
+    )
+
+
+def compute_planes_tiled(
+    ies_data: Dict,
+    planes: Sequence[Dict],
+    luminaire,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+    deadline: Optional[float] = None,
+    table: Optional[CandelaTable] = None,
+) -> List[np.ndarray]:
+    """
+    Illuminance on a batch of planes ({"origin", "uAxis", "vAxis", "s", "t"}, see
+    compute_plane_tiled), e.g. the faces of a building elevation. All planes share
+    one candela table and one set of scratch buffers.
+    """
+    if table is None:
+        table = CandelaTable(ies_data)
+    scratch = _tile_buffers(max((_tile_points(len(plane["s"]), len(plane["t"])) for plane in planes), default=1))
+    return [
+        compute_plane_tiled(
+            ies_data, plane["s"], plane["t"], plane["origin"], plane["uAxis"], plane["vAxis"], luminaire, llf,
+            rot_x, rot_y, rot_z, deadline=deadline, table=table, scratch=scratch
+        )
+        for plane in planes
+    ]
+
+
+def compute_surface_tiled(
+    ies_data: Dict,
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    normals: np.ndarray,
+    luminaire,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+    out: Optional[np.ndarray] = None,
+    deadline: Optional[float] = None,
+    table: Optional[CandelaTable] = None,
+) -> np.ndarray:
+    """
+    Illuminance of a luminaire at `luminaire` (x, y, z) on a surface sampled at
+    x (nx,) by y (ny,) with elevations z (ny, nx) and unit normals (3, ny, nx),
+    e.g. a terrain.TerrainSurface. Every point has its own distance and
+    incidence cos = (L - P) . n / d; points facing away receive zero.
+
+    Tiled like compute_plane_tiled; only the photometric lookup depends on the
+    luminaire, so the surface geometry can be prepared once and reused.
+    """
+    import time
+
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    nx, ny = len(x), len(y)
+    if out is None:
+        out = np.empty((ny, nx), dtype=np.float32)
+    if table is None:
+        table = CandelaTable(ies_data)
+
+    r = inverse_rotation(rot_x, rot_y, rot_z).astype(np.float32)
+    lum = np.asarray(luminaire, dtype=np.float32)
+    dx = x - lum[0]
+    dy = y - lum[1]
+
+    rows_per_tile = max(1, _tile_points(nx, ny) // max(nx, 1))
+    flat = _tile_buffers(rows_per_tile * nx)
+    for name in ("gx", "gy", "gz"):
+        flat[name] = np.empty(rows_per_tile * nx, dtype=np.float32)
+    buf = {name: arr.reshape(rows_per_tile, nx) for name, arr in flat.items()}
+
+    for r0 in range(0, ny, rows_per_tile):
+        if deadline is not None and time.monotonic() > deadline:
+            raise ComputeBudgetExceeded("Grid evaluation exceeded its time budget.")
+
+        rows = min(rows_per_tile, ny - r0)
+        view = {name: arr[:rows] for name, arr in buf.items()}
+        gx, gy, gz = view["gx"], view["gy"], view["gz"]
+        lx, ly, lz, a, b = view["lx"], view["ly"], view["lz"], view["a"], view["b"]
+
+        # Global vector from the luminaire to each surface point
+        gx[:] = dx[None, :]
+        gy[:] = dy[r0:r0 + rows, None]
+        np.subtract(z[r0:r0 + rows], lum[2], out=gz)
+        for k, target in enumerate((lx, ly, lz)):
+            np.multiply(gx, r[k, 0], out=target)
+            np.multiply(gy, r[k, 1], out=a)
+            np.add(target, a, out=target)
+            np.multiply(gz, r[k, 2], out=a)
+            np.add(target, a, out=target)
+
+        # Incidence numerator (L - P) . n into gz, clamped at zero for back faces
+        n = normals[:, r0:r0 + rows]
+        np.multiply(gz, n[2], out=gz)
+        np.multiply(gx, n[0], out=gx)
+        np.add(gz, gx, out=gz)
+        np.multiply(gy, n[1], out=gy)
+        np.add(gz, gy, out=gz)
+        np.negative(gz, out=gz)
+        np.maximum(gz, 0.0, out=gz)
+
+        # Vertical angle from nadir and horizontal angle, in degrees
+        np.hypot(lx, ly, out=a)
+        np.negative(lz, out=b)
+        np.arctan2(a, b, out=a)
+        np.degrees(a, out=a)
+        np.arctan2(ly, lx, out=b)
+        np.degrees(b, out=b)
+        np.add(b, 360.0, out=b)
+        np.mod(b, 360.0, out=b)
+        table.fold_in_place(b)
+
+        # d^2 into lz
+        np.multiply(lz, lz, out=lz)
+        np.multiply(lx, lx, out=lx)
+        np.add(lz, lx, out=lz)
+        np.multiply(ly, ly, out=ly)
+        np.add(lz, ly, out=lz)
+        np.maximum(lz, np.float32(1e-18), out=lz)
+
+        target = out[r0:r0 + rows]
+        table.lookup(b, a, target, view)
+
+        # E = I * ((L - P) . n) / d^3
+        np.sqrt(lz, out=lx)
+        np.multiply(lx, lz, out=lx)
+        np.divide(gz, lx, out=gz)
+        np.multiply(target, gz, out=target)
+        np.multiply(target, np.float32(llf), out=target)
+
+    return out
@@ -0,0 +1,150 @@
+from functools import lru_cache
+from typing import Dict, Sequence, Tuple
+
+import cv2
+import numpy as np
+from matplotlib import font_manager
+from matplotlib.colors import to_rgb
+from PIL import ImageFont
+
+
+# Long side of the exported image; the matplotlib export drew a 7.7 in square
+# axes at 300 dpi.
+RASTER_SIZE = 2310
+RASTER_DPI = 300
+# Sub-pixel precision of cv2 polyline vertices (fractional bits).
+SUBPIXEL_SHIFT = 4
+
+
+def points_to_px(points: float) -> float:
+    return points * RASTER_DPI / 72.0
+
+
+class GlyphAtlas:
+    """Alpha masks and advances of individual characters, rendered once per font size."""
+
+    def __init__(self, size_px: int):
+        self.font = ImageFont.truetype(font_manager.findfont("DejaVu Sans"), size_px)
+        self.ascent = self.font.getmetrics()[0]
+        self._glyphs: Dict[str, Tuple[np.ndarray, int, int, float]] = {}
+
+    def glyph(self, char: str) -> Tuple[np.ndarray, int, int, float]:
+        """(alpha mask, x offset, y offset from the line top, advance) of `char`."""
+        cached = self._glyphs.get(char)
+        if cached is None:
+            mask, (off_x, off_y) = self.font.getmask2(char, mode="L")
+            alpha = np.asarray(mask, dtype=np.uint8).reshape(mask.size[1], mask.size[0])
+            cached = (alpha, off_x, off_y, self.font.getlength(char))
+            self._glyphs[char] = cached
+        return cached
+
+
+@lru_cache(maxsize=8)
+def glyph_atlas(size_px: int) -> GlyphAtlas:
+    return GlyphAtlas(size_px)
+
+
+def _rgba(color: str) -> Tuple[int, int, int, int]:
+    r, g, b = to_rgb(color)
+    return int(round(r * 255)), int(round(g * 255)), int(round(b * 255)), 255
+
+
+class IsolineRaster:
+    """
+    Anti-aliased RGBA canvas in data coordinates (y up). Pixels are kept with
+    premultiplied alpha, which is what cv2's anti-aliased drawing produces on a
+    transparent background, and un-premultiplied once when encoding.
+    """
+
+    def __init__(self, extents: Dict[str, float], size: int = RASTER_SIZE):
+        self.min_x, self.max_y = extents["minX"], extents["maxY"]
+        data_w = extents["maxX"] - extents["minX"]
+        data_h = extents["maxY"] - extents["minY"]
+        self.scale = size / max(data_w, data_h)
+        self.width = max(1, int(round(data_w * self.scale)))
+        self.height = max(1, int(round(data_h * self.scale)))
+        self.image = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+
+    def to_px(self, x, y):
+        return (np.asarray(x) - self.min_x) * self.scale, (self.max_y - np.asarray(y)) * self.scale
+
+    def polylines(self, paths: Sequence[Sequence[Sequence[float]]], color: str, width_pt: float):
+        """Every path of one color in a single cv2.polylines call."""
+        pts = []
+        for path in paths:
+            if len(path) < 2:
+                continue
+            v = np.asarray(path, dtype=float)
+            px, py = self.to_px(v[:, 0], v[:, 1])
+            pts.append(np.rint(np.column_stack((px, py)) * (1 << SUBPIXEL_SHIFT)).astype(np.int32))
+        if pts:
+            # cv2's anti-aliased strokes cover about one pixel more than `thickness`
+            thickness = max(1, int(round(points_to_px(width_pt) - 1)))
+            cv2.polylines(self.image, pts, False, _rgba(color), thickness, cv2.LINE_AA, SUBPIXEL_SHIFT)
+
+    def line(self, x0: float, y0: float, x1: float, y1: float, color: str, width_pt: float):
+        self.polylines([[(x0, y0), (x1, y1)]], color, width_pt)
+
+    def _composite(self, rows: slice, cols: slice, alpha: np.ndarray, color: Tuple[int, int, int, int]):
+        """Premultiplied "over" of a solid color with coverage `alpha` (0-255) into a region."""
+        region = self.image[rows, cols].astype(np.float32)
+        f = alpha.astype(np.float32)[..., None] / 255.0
+        region *= 1.0 - f
+        region += f * np.asarray(color, dtype=np.float32)
+        self.image[rows, cols] = np.rint(region).astype(np.uint8)
+
+    def dotted_grid(self, xs: Sequence[float], ys: Sequence[float], color: str, width_pt: float):
+        """Axis-aligned dotted lines, drawn as one coverage mask."""
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        half = max(1, int(round(points_to_px(width_pt)))) / 2.0
+        # matplotlib's ":" pattern is about 1 on, 1.65 off in line widths
+        period = max(2, int(round(points_to_px(width_pt) * 2.65)))
+        on = max(1, period * 10 // 26)
+        dots_v = (np.arange(self.height) % period) < on
+        dots_h = (np.arange(self.width) % period) < on
+        px, _ = self.to_px(np.asarray(xs, dtype=float), 0.0)
+        _, py = self.to_px(0.0, np.asarray(ys, dtype=float))
+        for c in px.tolist():
+            c0, c1 = max(int(round(c - half)), 0), min(int(round(c + half)), self.width)
+            mask[dots_v, c0:c1] = True
+        for r in py.tolist():
+            r0, r1 = max(int(round(r - half)), 0), min(int(round(r + half)), self.height)
+            mask[r0:r1, dots_h] = True
+        self.image[mask] = _rgba(color)
+
+    def text(self, x: float, y: float, text: str, color: str, size_pt: float):
+        """Text with its left baseline point at data (x, y), composed from the glyph atlas."""
+        atlas = glyph_atlas(int(round(points_to_px(size_pt))))
+        rgba = _rgba(color)
+        px, py = self.to_px(x, y)
+        pen_x = float(px)
+        top = int(round(float(py))) - atlas.ascent
+        for char in text:
+            alpha, off_x, off_y, advance = atlas.glyph(char)
+            x0 = int(round(pen_x)) + off_x
+            y0 = top + off_y
+            pen_x += advance
+            h, w = alpha.shape
+            # Clip the glyph box to the canvas
+            gx0, gy0 = max(0, -x0), max(0, -y0)
+            gx1, gy1 = min(w, self.width - x0), min(h, self.height - y0)
+            if gx0 >= gx1 or gy0 >= gy1:
+                continue
+            self._composite(
+                slice(y0 + gy0, y0 + gy1), slice(x0 + gx0, x0 + gx1),
+                alpha[gy0:gy1, gx0:gx1], rgba
+            )
+
+    def encode_png(self) -> bytes:
+        bgra = cv2.cvtColor(self.image, cv2.COLOR_RGBA2BGRA)
+        # Un-premultiply the partially covered (anti-aliased edge) pixels only;
+        # opaque and fully transparent ones are already correct
+        alpha = bgra[..., 3]
+        edge = np.nonzero((alpha > 0) & (alpha < 255))
+        a = alpha[edge].astype(np.uint32)[:, None]
+        color = bgra[edge][:, :3].astype(np.uint32)
+        bgra[edge[0], edge[1], :3] = np.minimum((color * 255 + a // 2) // a, 255).astype(np.uint8)
+        ok, encoded = cv2.imencode(".png", bgra)
+        if not ok:
+            raise RuntimeError("PNG encoding failed")
+        return encoded.tobytes()
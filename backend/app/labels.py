@@ -0,0 +1,81 @@
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+# Labels of any level closer than this fraction of the label interval are dropped.
+LABEL_CLEARANCE_FRACTION = 0.25
+
+
+def label_positions(paths: Sequence[np.ndarray], interval: float) -> np.ndarray:
+    """
+    Points every `interval` of arc length along each path (not at its start),
+    for all paths in one pass: cumulative arc length over the concatenated
+    vertices, then `searchsorted` for the target lengths. Returns (K, 2).
+    """
+    paths = [np.asarray(v, dtype=float) for v in paths if len(v) > 1]
+    if not paths or interval <= 0:
+        return np.zeros((0, 2))
+
+    lengths = np.array([len(v) for v in paths])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    pts = np.concatenate(paths)
+
+    seg = np.hypot(*np.diff(pts, axis=0).T)
+    # Zero the jumps between consecutive paths so arc length restarts per path
+    seg[starts[1:] - 1] = 0.0
+    arc = np.concatenate(([0.0], np.cumsum(seg)))
+
+    path_start = arc[starts]
+    path_length = arc[starts + lengths - 1] - path_start
+    counts = np.ceil(path_length / interval).astype(np.int64) - 1
+    counts = np.maximum(counts, 0)
+    if counts.sum() == 0:
+        return np.zeros((0, 2))
+
+    # k * interval for k = 1..counts[p], offset by each path's starting arc length
+    owner = np.repeat(np.arange(len(paths)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    target = path_start[owner] + k * interval
+
+    # Vertex index ending the segment that contains each target
+    end = np.searchsorted(arc, target, side="left")
+    end = np.clip(end, starts[owner] + 1, starts[owner] + lengths[owner] - 1)
+    span = arc[end] - arc[end - 1]
+    t = np.divide(target - arc[end - 1], span, out=np.zeros_like(target), where=span > 0)
+    return pts[end - 1] + (pts[end] - pts[end - 1]) * t[:, None]
+
+
+def avoid_collisions(positions: Sequence[np.ndarray], clearance: float) -> List[np.ndarray]:
+    """
+    Greedily drop labels within `clearance` of an already kept one, taking the
+    position arrays in order (one per level). A spatial hash with cells of
+    `clearance` limits each check to the nine neighbouring cells.
+    """
+    if clearance <= 0:
+        return [np.asarray(p) for p in positions]
+
+    cells: Dict[Tuple[int, int], List[Tuple[float, float]]] = {}
+    limit = clearance * clearance
+    kept_per_level = []
+    for level_positions in positions:
+        keep = []
+        for px, py in np.asarray(level_positions).tolist():
+            cx, cy = math.floor(px / clearance), math.floor(py / clearance)
+            clear = True
+            for nx in (cx - 1, cx, cx + 1):
+                for ny in (cy - 1, cy, cy + 1):
+                    for qx, qy in cells.get((nx, ny), ()):
+                        if (px - qx) ** 2 + (py - qy) ** 2 < limit:
+                            clear = False
+                            break
+                    if not clear:
+                        break
+                if not clear:
+                    break
+            keep.append(clear)
+            if clear:
+                cells.setdefault((cx, cy), []).append((px, py))
+        kept_per_level.append(np.asarray(level_positions).reshape(-1, 2)[np.array(keep, dtype=bool)])
+    return kept_per_level
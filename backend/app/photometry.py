@@ -0,0 +1,287 @@
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Width of the zonal lumen bands, in degrees of vertical angle.
+ZONE_STEP_DEG = 10.0
+
+# Cumulative zones of the classic zonal lumen summary (vertical angles, degrees).
+SUMMARY_ZONES = [(0, 30), (0, 40), (0, 60), (60, 90), (0, 90), (90, 120), (90, 180), (0, 180)]
+
+# IES TM-15-11 secondary solid angles: vertical angle bounds of each BUG zone.
+# Front is the street side (Type C horizontal angles 0-180), back the house side.
+BUG_ZONES = {
+    "L": (0, 30),
+    "M": (30, 60),
+    "H": (60, 80),
+    "VH": (80, 90),
+    "UL": (90, 100),
+    "UH": (100, 180),
+}
+
+# TM-15-11 Addendum A maximum zonal lumens for ratings 0 to 4; anything above is 5.
+BACKLIGHT_LIMITS = {"BH": [110, 500, 1000, 2500, 5000], "BM": [220, 1000, 2500, 5000, 8500], "BL": [110, 500, 1000, 2500, 5000]}
+UPLIGHT_LIMITS = {"UH": [0, 10, 50, 500, 1000], "UL": [0, 10, 50, 500, 1000]}
+GLARE_LIMITS = {
+    "FVH": [10, 100, 225, 350, 500],
+    "BVH": [10, 100, 225, 350, 500],
+    "FH": [660, 1800, 5000, 7500, 12000],
+    "BH": [110, 500, 1000, 2500, 5000],
+}
+
+# Intensity fractions of the peak that bound the beam and field spreads.
+BEAM_FRACTION = 0.5
+FIELD_FRACTION = 0.1
+
+# Type C vertical planes drawn on the polar plot and measured for beam spread.
+POLAR_PLANES = (0.0, 90.0)
+
+
+def unfold_distribution(ies_data: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Horizontal angles covering [0, 360], vertical angles and the (nh, nv)
+    candela table of a parsed IES file, with its symmetry expanded.
+    """
+    h = np.asarray(ies_data["horiz_angles"], dtype=float)
+    v = np.asarray(ies_data["vert_angles"], dtype=float)
+    cd = np.asarray(ies_data["candela_matrix"], dtype=float).reshape(len(h), len(v))
+
+    if len(h) == 1:
+        return np.array([0.0, 360.0]), v, np.vstack((cd, cd))
+    if np.isclose(h[-1], 90):
+        # Quadrilateral: mirror about 90, then about 180
+        h, cd = np.concatenate((h, 180 - h[-2::-1])), np.vstack((cd, cd[-2::-1]))
+    if np.isclose(h[-1], 180):
+        h, cd = np.concatenate((h, 360 - h[-2::-1])), np.vstack((cd, cd[-2::-1]))
+    if not np.isclose(h[-1], 360):
+        # Full distribution without the closing plane: it repeats the 0 plane
+        h, cd = np.append(h, h[0] + 360), np.vstack((cd, cd[:1]))
+    return h, v, cd
+
+
+def _insert_breaks(axis: np.ndarray, table: np.ndarray, breaks: np.ndarray, along: int):
+    """Add `breaks` inside `axis` to the table, linearly interpolated along axis `along`."""
+    inner = breaks[(breaks > axis[0]) & (breaks < axis[-1])]
+    new_axis = np.union1d(axis, inner)
+    idx = np.clip(np.searchsorted(axis, new_axis, side="right") - 1, 0, len(axis) - 2)
+    step = axis[idx + 1] - axis[idx]
+    t = np.divide(new_axis - axis[idx], step, out=np.zeros_like(new_axis), where=step > 0)
+    lo = np.take(table, idx, axis=along)
+    hi = np.take(table, idx + 1, axis=along)
+    shape = [1, 1]
+    shape[along] = -1
+    return new_axis, lo + (hi - lo) * t.reshape(shape)
+
+
+def zonal_lumens(ies_data: Dict) -> np.ndarray:
+    """
+    Lumens of every (90 degree horizontal quadrant, ZONE_STEP_DEG vertical band)
+    zone, shape (4, 180 / ZONE_STEP_DEG).
+
+    The candela table is bilinear between its angles, so the flux integral of
+    I(h, v) sin(v) over each table cell is exact in closed form: trapezoid
+    weights in h and the integrals of the two linear basis functions times
+    sin(v) in v. Zone boundaries are inserted into the table first so every cell
+    falls in one zone. Intensity outside the measured vertical range is zero.
+    """
+    h, v, cd = unfold_distribution(ies_data)
+    h, cd = _insert_breaks(h, cd, np.array([90.0, 180.0, 270.0]), along=0)
+    v, cd = _insert_breaks(v, cd, np.arange(ZONE_STEP_DEG, 180.0, ZONE_STEP_DEG), along=1)
+
+    a, b = np.radians(v[:-1]), np.radians(v[1:])
+    width = b - a
+    safe = np.where(width > 0, width, 1.0)
+    # Integrals over [a, b] of the upper and lower linear basis times sin(v)
+    upper = np.where(width > 0, (np.sin(b) - np.sin(a)) / safe - np.cos(b), 0.0)
+    lower = np.cos(a) - np.cos(b) - upper
+    half_dh = np.radians(np.diff(h)) / 2.0
+
+    h_sum = cd[:-1] + cd[1:]
+    cells = half_dh[:, None] * (h_sum[:, :-1] * lower[None, :] + h_sum[:, 1:] * upper[None, :])
+
+    n_bands = int(round(180.0 / ZONE_STEP_DEG))
+    quadrant = np.clip(((h[:-1] + h[1:]) / 2 // 90).astype(int), 0, 3)
+    band = np.clip(((v[:-1] + v[1:]) / 2 // ZONE_STEP_DEG).astype(int), 0, n_bands - 1)
+    zones = np.zeros((4, n_bands))
+    np.add.at(zones, (quadrant[:, None], band[None, :]), cells)
+    return zones
+
+
+def _zone_sum(zones: np.ndarray, quadrants, v_range) -> float:
+    first, last = (int(round(angle / ZONE_STEP_DEG)) for angle in v_range)
+    return float(zones[list(quadrants), first:last].sum())
+
+
+def _rating(values: Dict[str, float], limits: Dict[str, List[float]]) -> int:
+    """Lowest rating whose limits every zone meets (the highest rating is the number of limits)."""
+    rating = 0
+    for zone, zone_limits in limits.items():
+        # Small tolerance so a zone that is zero up to rounding meets a zero limit
+        over = [limit for limit in zone_limits if values[zone] > limit + 1e-6]
+        rating = max(rating, len(over))
+    return rating
+
+
+def bug_rating(zones: np.ndarray) -> Dict:
+    """TM-15-11 backlight, uplight and glare ratings from zonal_lumens."""
+    front, back = (0, 1), (2, 3)
+    lumens = {}
+    for name, v_range in BUG_ZONES.items():
+        if name.startswith("U"):
+            lumens[name] = _zone_sum(zones, front + back, v_range)
+        else:
+            lumens["F" + name] = _zone_sum(zones, front, v_range)
+            lumens["B" + name] = _zone_sum(zones, back, v_range)
+
+    backlight = _rating(lumens, BACKLIGHT_LIMITS)
+    uplight = _rating(lumens, UPLIGHT_LIMITS)
+    glare = _rating(lumens, GLARE_LIMITS)
+    return {
+        "rating": f"B{backlight}-U{uplight}-G{glare}",
+        "backlight": backlight,
+        "uplight": uplight,
+        "glare": glare,
+        "zoneLumens": lumens,
+    }
+
+
+def plane_profile(ies_data: Dict, h_angle: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intensity across the vertical plane through `h_angle` and `h_angle` + 180, as
+    (signed angle from nadir in [-180, 180], candela); negative angles lie in the
+    opposite half-plane.
+    """
+    h, v, cd = unfold_distribution(ies_data)
+
+    def half(angle):
+        angle = angle % 360.0
+        i = int(np.clip(np.searchsorted(h, angle, side="right") - 1, 0, len(h) - 2))
+        t = (angle - h[i]) / (h[i + 1] - h[i]) if h[i + 1] > h[i] else 0.0
+        return cd[i] + (cd[i + 1] - cd[i]) * t
+
+    near, far = half(h_angle), half(h_angle + 180.0)
+    angles = np.concatenate((-v[::-1], v))
+    values = np.concatenate((far[::-1], near))
+    return angles, values
+
+
+def _spread(angles: np.ndarray, values: np.ndarray, fraction: float) -> Optional[float]:
+    """Angular width around the peak where intensity stays at or above `fraction` of it."""
+    peak = int(np.argmax(values))
+    threshold = values[peak] * fraction
+    if values[peak] <= 0:
+        return None
+
+    def crossing(indices):
+        prev = peak
+        for i in indices:
+            if values[i] < threshold:
+                t = (values[prev] - threshold) / (values[prev] - values[i])
+                return angles[prev] + (angles[i] - angles[prev]) * t
+            prev = i
+        return angles[prev]
+
+    right = crossing(range(peak + 1, len(values)))
+    left = crossing(range(peak - 1, -1, -1))
+    return float(right - left)
+
+
+def beam_spreads(ies_data: Dict) -> List[Dict]:
+    """Beam (50%) and field (10%) spreads in each of the POLAR_PLANES."""
+    spreads = []
+    for h_angle in POLAR_PLANES:
+        angles, values = plane_profile(ies_data, h_angle)
+        spreads.append({
+            "plane": f"{h_angle:g}-{h_angle + 180:g}",
+            "beamAngle": _spread(angles, values, BEAM_FRACTION),
+            "fieldAngle": _spread(angles, values, FIELD_FRACTION),
+        })
+    return spreads
+
+
+def photometric_report(ies_data: Dict) -> Dict:
+    """Total and zonal lumens, BUG rating, peak intensity and beam spreads of a distribution."""
+    zones = zonal_lumens(ies_data)
+    total = float(zones.sum())
+    bands = zones.sum(axis=0)
+
+    def percent(lumens):
+        return lumens / total * 100.0 if total > 0 else 0.0
+
+    h, v, cd = unfold_distribution(ies_data)
+    peak_h, peak_v = np.unravel_index(int(np.argmax(cd)), cd.shape)
+    return {
+        "totalLumens": total,
+        "downwardLumens": float(bands[:len(bands) // 2].sum()),
+        "upwardLumens": float(bands[len(bands) // 2:].sum()),
+        "maxCandela": float(cd[peak_h, peak_v]),
+        "maxCandelaAngles": {"horizontal": float(h[peak_h]), "vertical": float(v[peak_v])},
+        "zones": [
+            {"start": i * ZONE_STEP_DEG, "end": (i + 1) * ZONE_STEP_DEG, "lumens": float(lm), "percent": percent(float(lm))}
+            for i, lm in enumerate(bands)
+        ],
+        "summary": [
+            {"start": float(lo), "end": float(hi), "lumens": lm, "percent": percent(lm)}
+            for lo, hi in SUMMARY_ZONES
+            for lm in [_zone_sum(zones, range(4), (lo, hi))]
+        ],
+        "bug": bug_rating(zones),
+        "beamSpreads": beam_spreads(ies_data),
+    }
+
+
+def render_polar_plot(ies_data: Dict, image_format: str = "png", title: str = "") -> bytes:
+    """
+    Polar candela plot of the POLAR_PLANES, nadir down, as PNG or SVG bytes.
+    Built on a standalone Figure (no pyplot global state), so it is safe to run
+    in the threadpool.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(projection="polar")
+    ax.set_theta_zero_location("S")
+    for h_angle, color in zip(POLAR_PLANES, ("#d62728", "#1f77b4")):
+        angles, values = plane_profile(ies_data, h_angle)
+        ax.plot(np.radians(angles), values, color=color, linewidth=1.5, label=f"{h_angle:g}-{h_angle + 180:g}°")
+    ax.set_thetagrids(range(0, 360, 30), [f"{a if a <= 180 else 360 - a}°" for a in range(0, 360, 30)])
+    ax.set_rlabel_position(100)
+    ax.tick_params(labelsize=8)
+    ax.legend(loc="upper right", bbox_to_anchor=(1.12, 1.1), fontsize=8, frameon=False)
+    ax.set_title(title or "Candela distribution (cd)", fontsize=10, pad=18)
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format=image_format, dpi=150, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+class ReportCache:
+    """LRU of photometric reports keyed by photometry_hash; reports are small, so bounded by count."""
+
+    def __init__(self, max_entries: int = 256):
+        self._reports: "OrderedDict[str, Dict]" = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            report = self._reports.get(key)
+            if report is not None:
+                self._reports.move_to_end(key)
+            return report
+
+    def put(self, key: str, report: Dict):
+        with self._lock:
+            self._reports[key] = report
+            self._reports.move_to_end(key)
+            while len(self._reports) > self._max_entries:
+                self._reports.popitem(last=False)
+
+
+report_cache = ReportCache()
@@ -0,0 +1,143 @@
+import base64
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# Default simplification tolerance as a fraction of the grid spacing. Contour
+# vertices are linearly interpolated between grid points anyway, so deviations
+# this small are far below both the model accuracy and plotting resolution.
+SIMPLIFY_FRACTION = 0.1
+# Quantization step of the "delta" encoding relative to the simplification tolerance.
+QUANTUM_FRACTION = 0.5
+
+PATH_ENCODINGS = ("json", "delta", "float32")
+
+
+def simplify_path(v: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of an (N, 2) polyline; closed rings stay closed."""
+    return simplify_paths([v], tolerance)[0]
+
+
+def simplify_paths(paths: Sequence[np.ndarray], tolerance: float) -> List[np.ndarray]:
+    """
+    Douglas-Peucker simplification of many polylines at once. The recursion
+    runs breadth-first over the concatenated vertices: every pass measures all
+    open intervals of all paths in a few array operations and splits each at
+    its farthest vertex, so the Python overhead is per pass, not per interval.
+    """
+    paths = [np.asarray(v, dtype=float).reshape(-1, 2) for v in paths if len(v)]
+    if tolerance <= 0 or not paths:
+        return paths
+
+    lengths = np.array([len(v) for v in paths])
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    pts = np.concatenate(paths)
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[starts] = True
+    keep[ends - 1] = True
+    first, last = starts, ends - 1
+
+    while True:
+        open_ = last - first >= 2
+        first, last = first[open_], last[open_]
+        if len(first) == 0:
+            break
+
+        # Interior vertex indices of every interval, grouped by interval
+        counts = last - first - 1
+        group_start = np.cumsum(counts) - counts
+        idx = np.arange(counts.sum()) + np.repeat(first + 1 - group_start, counts)
+        p = pts[idx]
+
+        # Distance to each interval's chord as |n . p - c| with the unit normal
+        # n and offset c computed once per interval
+        start = pts[first]
+        chord = pts[last] - start
+        chord_len = np.hypot(chord[:, 0], chord[:, 1])
+        degenerate = chord_len == 0
+        chord_len[degenerate] = 1.0
+        nx = -chord[:, 1] / chord_len
+        ny = chord[:, 0] / chord_len
+        c = nx * start[:, 0] + ny * start[:, 1]
+        dist = np.abs(p[:, 0] * np.repeat(nx, counts) + p[:, 1] * np.repeat(ny, counts) - np.repeat(c, counts))
+        if degenerate.any():
+            # Closed rings have a zero chord: measure from the shared start/end point
+            ring = np.repeat(degenerate, counts)
+            rel = p[ring] - np.repeat(start[degenerate], counts[degenerate], axis=0)
+            dist[ring] = np.hypot(rel[:, 0], rel[:, 1])
+
+        max_dist = np.maximum.reduceat(dist, group_start)
+        # First vertex reaching its interval's maximum
+        at_max = np.flatnonzero(dist == np.repeat(max_dist, counts))
+        owner = np.searchsorted(group_start, at_max, side="right") - 1
+        at_max = at_max[np.r_[True, owner[1:] != owner[:-1]]]
+        split = idx[at_max]
+
+        far = max_dist > tolerance
+        keep[split[far]] = True
+        first = np.concatenate((first[far], split[far]))
+        last = np.concatenate((split[far], last[far]))
+
+    return [pts[s:e][keep[s:e]] for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+def encode_paths(paths: Sequence[np.ndarray], encoding: str, quantum: Optional[float] = None) -> Dict:
+    """
+    Pack polylines into one flat buffer with per-path vertex offsets.
+
+    "delta": coordinates rounded to multiples of `quantum`; each path stores its
+    first vertex as integers and then the integer steps between vertices, all
+    interleaved x, y. "float32": base64 of little-endian float32 x, y pairs.
+    `offsets[i]:offsets[i + 1]` is the vertex range of path i.
+    """
+    paths = [np.asarray(v, dtype=float).reshape(-1, 2) for v in paths]
+    if encoding == "float32":
+        offsets = np.cumsum([0] + [len(v) for v in paths])
+        flat = np.concatenate(paths) if paths else np.zeros((0, 2))
+        return {
+            "encoding": "float32",
+            "quantum": None,
+            "offsets": offsets.tolist(),
+            "data": base64.b64encode(flat.astype("<f4").tobytes()).decode("ascii"),
+        }
+
+    if encoding != "delta":
+        raise ValueError(f"Unknown path encoding: {encoding}")
+    if not quantum or quantum <= 0:
+        raise ValueError("Delta encoding needs a positive quantum.")
+
+    steps = []
+    lengths = []
+    for v in paths:
+        q = np.rint(v / quantum).astype(np.int64)
+        d = np.diff(q, axis=0)
+        # Rounding can merge neighbouring vertices; drop the repeats
+        d = d[np.any(d != 0, axis=1)]
+        steps.append(q[:1])
+        steps.append(d)
+        lengths.append(len(d) + 1)
+    flat = np.concatenate(steps) if steps else np.zeros((0, 2), dtype=np.int64)
+    return {
+        "encoding": "delta",
+        "quantum": quantum,
+        "offsets": np.cumsum([0] + lengths).tolist(),
+        "data": flat.ravel().tolist(),
+    }
+
+
+def decode_paths(encoded: Dict) -> List[np.ndarray]:
+    """Inverse of encode_paths."""
+    offsets = np.asarray(encoded["offsets"], dtype=np.int64)
+    if encoded["encoding"] == "float32":
+        flat = np.frombuffer(base64.b64decode(encoded["data"]), dtype="<f4").astype(float).reshape(-1, 2)
+    else:
+        steps = np.asarray(encoded["data"], dtype=np.int64).reshape(-1, 2)
+        # A running sum over the whole buffer, less its value just before each
+        # path, restores the absolute integer vertices of every path at once
+        total = np.cumsum(steps, axis=0)
+        before = np.vstack([np.zeros((1, 2), dtype=np.int64), total])[offsets[:-1]]
+        flat = (total - np.repeat(before, np.diff(offsets), axis=0)) * encoded["quantum"]
+    return [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
@@ -0,0 +1,26 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Optional
+
+# Workers are started by a forkserver rather than forked from the server: the
+# pool is first created from a threadpool worker of a multithreaded process, and
+# a fork would copy locks held by other threads (logging, the stores) and native
+# library state (MuPDF) into the children.
+START_METHOD = "forkserver"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The process pool (cpu_count workers) shared by every CPU-bound handler, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        return _pool
@@ -1,17 +1,51 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Form
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional, Set, Dict, Any
+from typing import List, Optional, Set, Dict, Any, Tuple
 # import fitz  # PyMuPDF (Lazy loaded)
 import re
 import base64
 # import numpy as np (Lazy loaded)
 import logging
-from io import BytesIO
 import gc
 from enum import Enum
+import os
+import shutil
+import tempfile
+
+from ..comparison_store import ComparisonSession, comparison_store
+from ..extraction_cache import extraction_cache
+from ..process_pool import get_pool
 
 router = APIRouter(prefix="/api/change-narrative", tags=["change-narrative"])
 
+# Pages per worker task: small enough to balance uneven sheets, large enough
+# to amortize each worker opening the PDF.
+PAGES_PER_TASK = 8
+# Below this many pages (both documents) the process pool costs more than it saves.
+MIN_PARALLEL_PAGES = 16
+# Zoom of the visual diff (~144 dpi); diff scores are mean sample differences at this zoom.
+DIFF_ZOOM = 2.0
+# Zoom of the coarse render that locates changed regions (~36 dpi).
+COARSE_DIFF_ZOOM = 0.5
+# Tile edge in coarse pixels; only changed tiles are rendered at DIFF_ZOOM.
+DIFF_TILE_PX = 64
+# Extra full-resolution pixels rendered around each changed run and cropped off.
+DIFF_CLIP_MARGIN_PX = 8
+# Past this fraction of changed tiles, or this many changed runs, one full
+# render is cheaper than the clips.
+DIFF_MAX_TILE_FRACTION = 0.25
+DIFF_MAX_CLIP_RUNS = 64
+# Changed regions: coarse pixels per block of the diff map, and gaps (in blocks)
+# bridged when clustering changed blocks into one region.
+REGION_BLOCK_PX = 8
+REGION_MERGE_BLOCKS = 2
+# Region crops: points of context around a region, zoom (~288 dpi) and pixel
+# budget per crop (larger regions are rendered at a lower zoom).
+REGION_CROP_PADDING_PT = 18.0
+REGION_CROP_ZOOM = 4.0
+REGION_CROP_MAX_PIXELS = 8_000_000
+
 # --- Models ---
 
 class SheetStatus(str, Enum):
@@ -25,10 +59,33 @@ class SheetKind(str, Enum):
     LIGHTING_SCHEDULES = "lighting_schedules"
     SYMBOLS_LEGEND = "symbols_legend"
     OTHER = "other"
+class TextEdit(BaseModel):
+    # One run of replaced words ("" for a pure insertion or deletion)
+    previous: str
+    current: str
+
 class ChangeItem(BaseModel):
     text: str
-    type: str # "ADDED" | "REMOVED"
+    type: str # "ADDED" | "REMOVED" | "MOVED" | "EDITED"
     location_context: Optional[str] = None # e.g. "WOMENS 122"
+    previousText: Optional[str] = None # EDITED: text before the edit
+    previousLocationContext: Optional[str] = None # MOVED: where it was
+    edits: List[TextEdit] = [] # EDITED: word-level changes
+
+class ChangedRegion(BaseModel):
+    # Page points, origin top-left as in the previews (divide preview pixels by the zoom)
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+
+class DrawingChange(BaseModel):
+    # A group of added, removed or moved vector paths (e.g. a fixture symbol)
+    type: str # "ADDED" | "REMOVED" | "MOVED"
+    bbox: ChangedRegion # current position (previous one for REMOVED)
+    previousBbox: Optional[ChangedRegion] = None # MOVED: where it was
+    pathCount: int
+    location_context: Optional[str] = None # nearest room label
 
 class SheetData(BaseModel):
     sheetId: str
@@ -41,6 +98,8 @@ class SheetData(BaseModel):
     currentPreviewBase64: Optional[str] = None
     warningsForSheet: List[str] = []
     changes: List[ChangeItem] = []
+    changedRegions: List[ChangedRegion] = []
+    drawingChanges: List[DrawingChange] = []
 
 class TagConsistencyReport(BaseModel):
     # Keeping empty structure for compatibility if frontend still expects specific fields
@@ -50,6 +109,7 @@ class TagConsistencyReport(BaseModel):
 class ComparisonResponse(BaseModel):
     sheets: List[SheetData]
     tagConsistency: TagConsistencyReport
+    sessionId: Optional[str] = None # for /preview
 
 def clean_text(text: str) -> str:
     return " ".join(text.split())
@@ -57,56 +117,95 @@ def clean_text(text: str) -> str:
 def calc_dist(p1, p2):
     return ((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2)**0.5
 
+# Text diff: blocks with the same text within this distance (points) are
+# unchanged; further apart they have moved, up to TEXT_MOVE_MAX_DIST (3 in on
+# the sheet). Beyond that they are a removal plus an addition.
+TEXT_MOVE_TOLERANCE = 2.0
+TEXT_MOVE_MAX_DIST = 216.0
+# Blocks with different text whose centers are this close (points) are paired
+# as an edit when their word-level similarity reaches TEXT_EDIT_MIN_SIMILARITY.
+TEXT_EDIT_MAX_DIST = 36.0
+TEXT_EDIT_MIN_SIMILARITY = 0.5
+# Moved items (text or graphics) are paired with one of this many nearest
+# candidates of the same text/shape before falling back to list order.
+MOVE_PAIR_NEIGHBOURS = 8
+# Vector diff: path coordinates are quantized to this many points before
+# hashing; paths of the same shape within DRAWING_MOVE_TOLERANCE (points) are
+# unchanged, and changed paths closer than DRAWING_GROUP_GAP are one graphic.
+DRAWING_QUANTUM = 0.25
+DRAWING_MOVE_TOLERANCE = 1.0
+# Identical graphics further apart than this (points, 3 in on the sheet) are a
+# removal plus an addition rather than a move.
+DRAWING_MOVE_MAX_DIST = 216.0
+DRAWING_GROUP_GAP = 2.0
+# Grid cell (points) of the index used to group changed paths.
+DRAWING_GROUP_CELL = 64.0
+# Room labels are looked up within this distance (points) of a change.
+ROOM_LABEL_MAX_DIST = 300
+_CIRCUIT_TAG = re.compile(r'\d+/[A-Z0-9]+')
+_FIXTURE_TYPE = re.compile(r'^[A-Z][A-Z0-9]{0,3}$')
+
+def is_room_label(text: str) -> bool:
+    """
+    Whether a (stripped) text block looks like a Room Name/Number:
+    - Uppercase, or containing digits ("Office 101")
+    - Not too short
+    - Not a circuit/relay tag, fixture type or general note
+    """
+    if len(text) < 3: return False # Too short
+    if not text.isupper() and not any(c.isdigit() for c in text):
+        return False
+    # Exclude Circuit/Relay Tags (e.g. 71/R13, M1, P-1)
+    if _CIRCUIT_TAG.search(text): return False # Circuit/Relay (71/R13)
+    if _FIXTURE_TYPE.match(text): return False # Fixture Types (A, F1)
+    if "NOTE" in text.upper(): return False # General Notes
+    return True
+
+class RoomLabelIndex:
+    """
+    Room-label candidates of one page, filtered once and kept in a KD-tree so
+    each nearest-label lookup is logarithmic in the number of labels.
+    """
+    def __init__(self, text_blocks):
+        self._has_blocks = bool(text_blocks)
+        self._labels = []
+        self._centers = []
+        for block in text_blocks or []:
+            text = block['text'].strip()
+            if text and is_room_label(text):
+                bbox = block['bbox']
+                self._labels.append(text)
+                self._centers.append(((bbox[0] + bbox[2])/2, (bbox[1] + bbox[3])/2))
+        self._tree = None
+        if self._centers:
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(self._centers)
+
+    def nearest(self, target_rect) -> Optional[str]:
+        """Closest room label to the center of target_rect ("General" if none is near)."""
+        if not target_rect or not self._has_blocks:
+            return None
+        if self._tree is None:
+            return "General"
+
+        center = ((target_rect[0] + target_rect[2])/2, (target_rect[1] + target_rect[3])/2)
+        dist, _ = self._tree.query(center, distance_upper_bound=ROOM_LABEL_MAX_DIST)
+        if dist >= ROOM_LABEL_MAX_DIST:
+            return "General"
+        # Equidistant labels go to the first on the page, as a stable sort would
+        ties = self._tree.query_ball_point(center, dist * (1 + 1e-9) + 1e-9)
+        best = min(ties, key=lambda i: (calc_dist(center, self._centers[i]), i))
+        if calc_dist(center, self._centers[best]) >= ROOM_LABEL_MAX_DIST:
+            return "General"
+        return self._labels[best]
+
 def find_nearest_room_label(target_rect, text_blocks):
     """
-    Finds the nearest text block that looks like a Room Name/Number.
-    Heuristics:
-    - Uppercase
-    - Often contains digits
-    - Not too long
-    - Closest Euclidean distance to target_rect center
+    Finds the nearest text block that looks like a Room Name/Number (see
+    is_room_label), by Euclidean distance to the target_rect center.
+    Use RoomLabelIndex directly for repeated lookups on one page.
     """
-    if not target_rect or not text_blocks:
-        return None
-        
-    tx, ty = (target_rect[0] + target_rect[2])/2, (target_rect[1] + target_rect[3])/2
-    
-    candidates = []
-    
-    for block in text_blocks:
-        text = block['text'].strip()
-        if not text: continue
-        if len(text) < 3: continue # Too short
-        
-        # Check if it looks like a room label
-        # Heuristic: mostly uppercase, maybe digits. 
-        # Exclude common notes phrases if possible.
-        if not text.isupper() and not any(c.isdigit() for c in text):    
-            # Allow Title Case rooms if they look like "Office 101"
-             if not re.search(r'\d', text):
-                 continue
-
-        # FILTER: Exclude Circuit/Relay Tags (e.g. 71/R13, M1, P-1)
-        # These are usually short and contain forward slashes or are just fixture types
-        if re.search(r'\d+/[A-Z0-9]+', text): continue # Circuit/Relay (71/R13)
-        if re.match(r'^[A-Z][A-Z0-9]{0,3}$', text): continue # Fixture Types (A, F1)
-        if "NOTE" in text.upper(): continue # General Notes
-
-
-        # Get center of block
-        bx, by = (block['bbox'][0] + block['bbox'][2])/2, (block['bbox'][1] + block['bbox'][3])/2
-        dist = calc_dist((tx, ty), (bx, by))
-        
-        # Filter mostly by distance first, say within 200 pts (approx 3 inches)
-        if dist < 300: 
-            candidates.append((dist, text))
-            
-    if not candidates:
-        return "General"
-        
-    # Sort by distance
-    candidates.sort(key=lambda x: x[0])
-    return candidates[0][1]
+    return RoomLabelIndex(text_blocks).nearest(target_rect)
 
 def extract_sheet_info_spatial(page, page_index: int) -> Dict[str, Any]:
     """
@@ -313,104 +412,740 @@ def extract_sheet_info_spatial(page, page_index: int) -> Dict[str, Any]:
         "kind": kind
     }
 
-def render_page_base64(page, zoom=1.0) -> str:
+def render_page_base64(page, zoom=1.0, clip=None) -> str:
     import fitz
     mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat)
+    pix = page.get_pixmap(matrix=mat, clip=clip)
     # Convert to PNG in memory
     img_data = pix.tobytes("png")
     return base64.b64encode(img_data).decode('utf-8')
 
 def compute_diff_score(page1, page2) -> float:
+    """
+    Mean absolute sample difference of both pages rendered at DIFF_ZOOM (1.0 when
+    their sizes differ). A coarse render locates the changed tiles and only those
+    are rasterized at full resolution; the rest is identical and adds nothing.
+    All renders replay one display list per page; widespread changes fall back
+    to a single full render.
+    """
+    return diff_pages(page1, page2)[0]
+
+def diff_pages(page1, page2):
+    """compute_diff_score plus the coarse change mask (None when nothing changed or sizes differ)."""
     import fitz
     import numpy as np
-    import gc
-    # Render both at high resolution (2.0 = ~144dpi) as requested
-    pix1 = page1.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-    pix2 = page2.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-    
-    # Simple check: dimensions
-    if pix1.width != pix2.width or pix1.height != pix2.height:
-        return 1.0 # different dimensions = changed
-    
-    if pix1.samples == pix2.samples:
-        return 0.0
-    
+    full = fitz.Matrix(DIFF_ZOOM, DIFF_ZOOM)
+    size1, size2 = (page1.rect * full).irect, (page2.rect * full).irect
+    if (size1.width, size1.height) != (size2.width, size2.height):
+        return 1.0, None # different dimensions = changed
+
     try:
-        # CRITICAL MEMORY OPTIMIZATION:
-        # Avoid the default 'astype(int)' which uses 64-bit integers.
-        # For a large sheet, 64-bit diffs take ~432MB. 
-        # Using int16 takes only ~108MB.
-        arr1 = np.frombuffer(pix1.samples, dtype=np.uint8)
-        arr2 = np.frombuffer(pix2.samples, dtype=np.uint8)
-        
-        # Mean absolute difference using smaller bit-depth
-        diff = np.abs(arr1.astype(np.int16) - arr2.astype(np.int16))
-        mean_diff = np.mean(diff)
-        
-        # Cleanup immediately
-        del pix1, pix2, arr1, arr2, diff
-        gc.collect()
-        
-        return float(mean_diff)
+        # Each page is interpreted once; every render below replays its display list
+        lists = (page1.get_displaylist(), page2.get_displaylist())
+        coarse = fitz.Matrix(COARSE_DIFF_ZOOM, COARSE_DIFF_ZOOM)
+        pix1 = lists[0].get_pixmap(matrix=coarse)
+        pix2 = lists[1].get_pixmap(matrix=coarse)
+        if pix1.samples == pix2.samples:
+            return 0.0, None
+
+        # Changed coarse pixels, grown by one pixel so that anti-aliasing
+        # spilling over a tile edge still marks the neighbouring tile
+        arr1 = np.frombuffer(pix1.samples, dtype=np.uint8).reshape(pix1.height, pix1.width, pix1.n)
+        arr2 = np.frombuffer(pix2.samples, dtype=np.uint8).reshape(pix2.height, pix2.width, pix2.n)
+        changed = np.pad((arr1 != arr2).any(axis=2), 1)
+        changed = (
+            changed[:-2, 1:-1] | changed[1:-1, 1:-1] | changed[2:, 1:-1] |
+            changed[1:-1, :-2] | changed[1:-1, 2:]
+        )
+
+        tile = DIFF_TILE_PX
+        rows, cols = -(-pix1.height // tile), -(-pix1.width // tile)
+        padded = np.zeros((rows * tile, cols * tile), dtype=bool)
+        padded[:pix1.height, :pix1.width] = changed
+        tiles = padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+        # Runs of changed tiles in a row, as (row, start, stop)
+        runs = []
+        for row in range(rows):
+            flags = np.concatenate(([False], tiles[row], [False]))
+            edges = np.flatnonzero(flags[1:] != flags[:-1])
+            runs.extend((row, start, stop) for start, stop in zip(edges[::2], edges[1::2]))
+
+        if tiles.mean() > DIFF_MAX_TILE_FRACTION or len(runs) > DIFF_MAX_CLIP_RUNS:
+            full1, full2 = (dl.get_pixmap(matrix=full) for dl in lists)
+            diff = np.abs(
+                np.frombuffer(full1.samples, dtype=np.uint8).astype(np.int16) -
+                np.frombuffer(full2.samples, dtype=np.uint8).astype(np.int16)
+            )
+            return int(diff.sum()) / (size1.width * size1.height * pix1.n), changed
+
+        # Rasterize each run as one clip. Pixels at a clip edge are anti-aliased
+        # differently from a full render, so the clip gets a margin that is
+        # cropped off again.
+        step = tile / COARSE_DIFF_ZOOM
+        total = 0
+        for row, start, stop in runs:
+            region = (fitz.Rect(start * step, row * step, stop * step, (row + 1) * step) & page1.rect) * full
+            clip = (region + (-DIFF_CLIP_MARGIN_PX, -DIFF_CLIP_MARGIN_PX, DIFF_CLIP_MARGIN_PX, DIFF_CLIP_MARGIN_PX)) * ~full
+            crops = []
+            for dl in lists:
+                pix = dl.get_pixmap(matrix=full, clip=clip)
+                crop = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+                x0, y0 = int(region.x0) - pix.x, int(region.y0) - pix.y
+                crops.append(crop[y0:y0 + int(region.height), x0:x0 + int(region.width)])
+            total += int(np.abs(crops[0].astype(np.int16) - crops[1].astype(np.int16)).sum())
+
+        return total / (size1.width * size1.height * pix1.n), changed
     except Exception as e:
         logging.error(f"Diff error: {e}")
-        return 1.0
+        return 1.0, None
+
+def changed_regions(mask) -> List[ChangedRegion]:
+    """
+    Bounding boxes (page points) of the changes in a coarse change mask: the mask
+    is reduced to a block-wise diff map, changed blocks closer than
+    REGION_MERGE_BLOCKS are clustered, and each cluster is boxed tightly around
+    its changed pixels. Regions are in reading order.
+    """
+    import numpy as np
+    from scipy import ndimage
+    if mask is None:
+        return []
+    block = REGION_BLOCK_PX
+    height, width = mask.shape
+    rows, cols = -(-height // block), -(-width // block)
+    padded = np.zeros((rows * block, cols * block), dtype=bool)
+    padded[:height, :width] = mask
+    blocks = padded.reshape(rows, block, cols, block).any(axis=(1, 3))
+
+    clusters = ndimage.binary_dilation(blocks, iterations=REGION_MERGE_BLOCKS) if REGION_MERGE_BLOCKS else blocks
+    labels, _ = ndimage.label(clusters)
+    pixel_labels = np.repeat(np.repeat(labels, block, axis=0), block, axis=1)[:height, :width]
+    boxes = [
+        [found[1].start, found[0].start, found[1].stop, found[0].stop]
+        for found in ndimage.find_objects(np.where(mask, pixel_labels, 0)) if found is not None
+    ]
+
+    # Separate clusters can still have overlapping boxes (one nested in another's); merge those
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(len(boxes) - 1, i, -1):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+
+    return [
+        ChangedRegion(
+            x0=x0 / COARSE_DIFF_ZOOM, y0=y0 / COARSE_DIFF_ZOOM,
+            x1=x1 / COARSE_DIFF_ZOOM, y1=y1 / COARSE_DIFF_ZOOM
+        )
+        for x0, y0, x1, y1 in boxes
+    ]
+
+def _block_center(block):
+    bbox = block['bbox']
+    return ((bbox[0] + bbox[2])/2, (bbox[1] + bbox[3])/2)
+
+def _reading_order(block):
+    return (block['bbox'][1], block['bbox'][0])
+
+def pair_nearest(prev_points, curr_points, max_dist: Optional[float] = None) -> List[Tuple[int, int]]:
+    """
+    Pairs two lists of points, closest pairs first (candidates are each previous
+    point's MOVE_PAIR_NEIGHBOURS nearest current points, from a KD-tree); points
+    left over after that are paired in list order. With `max_dist`, no pair is
+    further apart than that and points without a partner in reach stay unpaired.
+    """
+    if not prev_points or not curr_points:
+        return []
+    import numpy as np
+    from scipy.spatial import cKDTree
+    bound = np.inf if max_dist is None else max_dist
+    k = min(len(curr_points), MOVE_PAIR_NEIGHBOURS)
+    dists, neighbours = cKDTree(curr_points).query(prev_points, k=k, distance_upper_bound=bound)
+    if k == 1:
+        dists, neighbours = dists[:, None], neighbours[:, None]
+    # Neighbours out of reach come back with an infinite distance
+    candidates = sorted(
+        (dists[i, n], i, int(neighbours[i, n]))
+        for i in range(len(prev_points)) for n in range(k) if np.isfinite(dists[i, n])
+    )
+
+    pairs = []
+    prev_used, curr_used = set(), set()
+    for _, i, j in candidates:
+        if i not in prev_used and j not in curr_used:
+            pairs.append((i, j))
+            prev_used.add(i)
+            curr_used.add(j)
+    pairs.extend(
+        (i, j) for i, j in zip(
+            (i for i in range(len(prev_points)) if i not in prev_used),
+            (j for j in range(len(curr_points)) if j not in curr_used)
+        )
+        if max_dist is None or calc_dist(prev_points[i], curr_points[j]) <= max_dist
+    )
+    return pairs
+
+class _GridIndex:
+    """Uniform grid of points; near() yields the items in the 3x3 cells around a point."""
+    def __init__(self, cell: float):
+        self._cell = cell
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def _key(self, point):
+        return (int(point[0] // self._cell), int(point[1] // self._cell))
+
+    def add(self, point, item: int):
+        self._cells.setdefault(self._key(point), []).append(item)
+
+    def near(self, point):
+        cx, cy = self._key(point)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                yield from self._cells.get((cx + dx, cy + dy), ())
+
+def match_text_blocks(prev_blocks, curr_blocks):
+    """
+    Pairs the text blocks of two revisions of a page:
+    1. same text within TEXT_MOVE_TOLERANCE -> unchanged
+    2. same text elsewhere within TEXT_MOVE_MAX_DIST -> moved, nearest pairs
+       first (see pair_nearest), any left over in reading order
+    3. different text nearby and similar enough word-wise -> edited
+    Returns (moved pairs, edited pairs, added curr indices, removed prev indices).
+    Exact text goes through hashes and nearby blocks through grid indexes, so
+    this stays near-linear in the number of blocks.
+    """
+    from difflib import SequenceMatcher
+    prev_centers = [_block_center(b) for b in prev_blocks]
+    curr_centers = [_block_center(b) for b in curr_blocks]
+    prev_done = [False] * len(prev_blocks)
+    curr_done = [False] * len(curr_blocks)
+
+    # 1. Unchanged
+    grid = _GridIndex(TEXT_MOVE_TOLERANCE)
+    for j, center in enumerate(curr_centers):
+        grid.add(center, j)
+    for i, block in enumerate(prev_blocks):
+        best = None
+        for j in grid.near(prev_centers[i]):
+            if curr_done[j] or curr_blocks[j]['text'] != block['text']:
+                continue
+            dist = calc_dist(prev_centers[i], curr_centers[j])
+            if dist <= TEXT_MOVE_TOLERANCE and (best is None or dist < best[0]):
+                best = (dist, j)
+        if best:
+            prev_done[i] = curr_done[best[1]] = True
+
+    # 2. Moved
+    curr_by_text: Dict[str, List[int]] = {}
+    for j, block in enumerate(curr_blocks):
+        if not curr_done[j]:
+            curr_by_text.setdefault(block['text'], []).append(j)
+    prev_by_text: Dict[str, List[int]] = {}
+    for i, block in enumerate(prev_blocks):
+        if not prev_done[i] and block['text'] in curr_by_text:
+            prev_by_text.setdefault(block['text'], []).append(i)
+    moved = []
+    for text, prev_indices in prev_by_text.items():
+        prev_indices.sort(key=lambda i: _reading_order(prev_blocks[i]))
+        curr_indices = sorted(curr_by_text[text], key=lambda j: _reading_order(curr_blocks[j]))
+        pairs = pair_nearest(
+            [prev_centers[i] for i in prev_indices], [curr_centers[j] for j in curr_indices], TEXT_MOVE_MAX_DIST
+        )
+        for a, b in pairs:
+            i, j = prev_indices[a], curr_indices[b]
+            moved.append((i, j))
+            prev_done[i] = curr_done[j] = True
+
+    # 3. Edited
+    grid = _GridIndex(TEXT_EDIT_MAX_DIST)
+    curr_words = {}
+    for j, center in enumerate(curr_centers):
+        if not curr_done[j]:
+            grid.add(center, j)
+            curr_words[j] = curr_blocks[j]['text'].split()
+    edited = []
+    for i, block in enumerate(prev_blocks):
+        if prev_done[i]:
+            continue
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq1(block['text'].split())
+        best = None
+        for j in grid.near(prev_centers[i]):
+            if curr_done[j] or calc_dist(prev_centers[i], curr_centers[j]) > TEXT_EDIT_MAX_DIST:
+                continue
+            matcher.set_seq2(curr_words[j])
+            if matcher.real_quick_ratio() < TEXT_EDIT_MIN_SIMILARITY or matcher.quick_ratio() < TEXT_EDIT_MIN_SIMILARITY:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= TEXT_EDIT_MIN_SIMILARITY and (best is None or ratio > best[0]):
+                best = (ratio, j)
+        if best:
+            edited.append((i, best[1]))
+            prev_done[i] = curr_done[best[1]] = True
+
+    added = [j for j, done in enumerate(curr_done) if not done]
+    removed = [i for i, done in enumerate(prev_done) if not done]
+    return moved, edited, added, removed
+
+def word_edits(previous: str, current: str) -> List[TextEdit]:
+    """Word-level differences between two versions of a text."""
+    from difflib import SequenceMatcher
+    a, b = previous.split(), current.split()
+    return [
+        TextEdit(previous=" ".join(a[i1:i2]), current=" ".join(b[j1:j2]))
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        if tag != "equal"
+    ]
 
 def compute_spatial_diff(prev_blocks, curr_blocks) -> List[ChangeItem]:
     """
-    Compares text blocks to find added/removed content.
+    Compares text blocks to find added, removed, moved and edited content.
     Attaches spatial context (nearest room) to changes.
     """
+    moved, edited, added, removed = match_text_blocks(prev_blocks, curr_blocks)
+
+    # Room labels of each page are indexed once, on first use
+    indexes = {}
+    def room_label(bbox, side, blocks):
+        if side not in indexes:
+            indexes[side] = RoomLabelIndex(blocks)
+        return indexes[side].nearest(bbox)
+
     # Temporary list to store (y, x, item) for sorting
-    raw_changes = [] 
-    
-    # simplify to set of text strings for equality check
-    # But we need to map back to BBox for context.
-    
-    # Map: text -> List[bbox] (word could appear multiple times)
-    prev_map = {}
-    for b in prev_blocks:
-        t = b['text']
-        if t not in prev_map: prev_map[t] = []
-        prev_map[t].append(b['bbox'])
-        
-    curr_map = {}
-    for b in curr_blocks:
-        t = b['text']
-        if t not in curr_map: curr_map[t] = []
-        curr_map[t].append(b['bbox'])
-        
-    # Added
-    for t, boxes in curr_map.items():
-        if t not in prev_map:
-            for bbox in boxes:
-                ctx = find_nearest_room_label(bbox, curr_blocks)
-                item = ChangeItem(text=t, type="ADDED", location_context=ctx)
-                # Use y (bbox[1]) then x (bbox[0]) for sort order
-                raw_changes.append((bbox[1], bbox[0], item))
-            
-    # Removed
-    for t, boxes in prev_map.items():
-        if t not in curr_map:
-            for bbox in boxes:
-                ctx = find_nearest_room_label(bbox, prev_blocks)
-                item = ChangeItem(text=t, type="REMOVED", location_context=ctx)
-                raw_changes.append((bbox[1], bbox[0], item))
-                
+    raw_changes = []
+
+    for j in added:
+        block = curr_blocks[j]
+        ctx = room_label(block['bbox'], "current", curr_blocks)
+        item = ChangeItem(text=block['text'], type="ADDED", location_context=ctx)
+        # Use y (bbox[1]) then x (bbox[0]) for sort order
+        raw_changes.append((block['bbox'][1], block['bbox'][0], item))
+
+    for i in removed:
+        block = prev_blocks[i]
+        ctx = room_label(block['bbox'], "previous", prev_blocks)
+        item = ChangeItem(text=block['text'], type="REMOVED", location_context=ctx)
+        raw_changes.append((block['bbox'][1], block['bbox'][0], item))
+
+    for i, j in moved:
+        prev, curr = prev_blocks[i], curr_blocks[j]
+        item = ChangeItem(
+            text=curr['text'], type="MOVED",
+            location_context=room_label(curr['bbox'], "current", curr_blocks),
+            previousLocationContext=room_label(prev['bbox'], "previous", prev_blocks)
+        )
+        raw_changes.append((curr['bbox'][1], curr['bbox'][0], item))
+
+    for i, j in edited:
+        prev, curr = prev_blocks[i], curr_blocks[j]
+        item = ChangeItem(
+            text=curr['text'], type="EDITED",
+            location_context=room_label(curr['bbox'], "current", curr_blocks),
+            previousText=prev['text'],
+            edits=word_edits(prev['text'], curr['text'])
+        )
+        raw_changes.append((curr['bbox'][1], curr['bbox'][0], item))
+
     # Sort by Y (top to bottom), then X (left to right)
     raw_changes.sort(key=lambda x: (x[0], x[1]))
-    
+
     return [item for _, _, item in raw_changes]
 
-def get_session_id(prev_pdf: bytes, curr_pdf: bytes) -> str:
-    """Generate a stable session ID based on file contents."""
+def _quantize_color(color):
+    return tuple(round(c, 3) for c in color) if color else None
+
+def page_drawings(page) -> List[Tuple[tuple, Tuple[float, float, float, float]]]:
+    """
+    (shape key, bbox) of every vector path on a page. The key is the path's style
+    and segment types plus its geometry relative to its bbox origin, quantized
+    to DRAWING_QUANTUM, so the same symbol has the same key wherever it is placed.
+    """
+    import numpy as np
+    styles, rects, counts, coords = [], [], [], []
+    # get_cdrawings: the same paths as get_drawings, as plain tuples
+    for drawing in page.get_cdrawings():
+        style = [
+            drawing.get("type"), _quantize_color(drawing.get("color")), _quantize_color(drawing.get("fill")),
+            round((drawing.get("width") or 0) / DRAWING_QUANTUM), drawing.get("closePath"), drawing.get("dashes")
+        ]
+        start = len(coords)
+        for item in drawing["items"]:
+            style.append(item[0])
+            for value in item[1:]:
+                if not isinstance(value, tuple):
+                    style.append(value) # rectangle orientation
+                # Points, rects (x0, y0, x1, y1) and quads (four points) as x, y, x, y...
+                elif isinstance(value[0], tuple):
+                    for point in value:
+                        coords.extend(point)
+                else:
+                    coords.extend(value)
+        styles.append(tuple(style))
+        rects.append(tuple(drawing["rect"]))
+        counts.append((len(coords) - start) // 2)
+    if not styles:
+        return []
+
+    # Quantize every path's points relative to its bbox origin in one go
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    origins = np.repeat(np.asarray(rects, dtype=np.float64)[:, :2], counts, axis=0)
+    quantized = np.rint((points - origins) / DRAWING_QUANTUM).astype(np.int32)
+    ends = np.cumsum(counts)
+    return [
+        ((style, quantized[end - count:end].tobytes()), rect)
+        for style, rect, count, end in zip(styles, rects, counts, ends)
+    ]
+
+def match_drawings(prev_paths, curr_paths):
+    """
+    Pairs the paths of two revisions of a page by shape key: the same shape
+    within DRAWING_MOVE_TOLERANCE is unchanged, elsewhere within
+    DRAWING_MOVE_MAX_DIST it has moved (nearest pairs first, see pair_nearest,
+    any left over in reading order). Returns (moved pairs, added curr indices,
+    removed prev indices).
+    """
+    prev_done = [False] * len(prev_paths)
+    curr_done = [False] * len(curr_paths)
+
+    grid = _GridIndex(DRAWING_MOVE_TOLERANCE)
+    for j, (_, bbox) in enumerate(curr_paths):
+        grid.add(bbox[:2], j)
+    for i, (shape, bbox) in enumerate(prev_paths):
+        best = None
+        for j in grid.near(bbox[:2]):
+            if curr_done[j] or curr_paths[j][0] != shape:
+                continue
+            dist = calc_dist(bbox[:2], curr_paths[j][1][:2])
+            if dist <= DRAWING_MOVE_TOLERANCE and (best is None or dist < best[0]):
+                best = (dist, j)
+        if best:
+            prev_done[i] = curr_done[best[1]] = True
+
+    curr_by_shape: Dict[tuple, List[int]] = {}
+    for j, (shape, _) in enumerate(curr_paths):
+        if not curr_done[j]:
+            curr_by_shape.setdefault(shape, []).append(j)
+    prev_by_shape: Dict[tuple, List[int]] = {}
+    for i, (shape, _) in enumerate(prev_paths):
+        if not prev_done[i] and shape in curr_by_shape:
+            prev_by_shape.setdefault(shape, []).append(i)
+    moved = []
+    for shape, prev_indices in prev_by_shape.items():
+        prev_indices.sort(key=lambda i: (prev_paths[i][1][1], prev_paths[i][1][0]))
+        curr_indices = sorted(curr_by_shape[shape], key=lambda j: (curr_paths[j][1][1], curr_paths[j][1][0]))
+        pairs = pair_nearest(
+            [prev_paths[i][1][:2] for i in prev_indices], [curr_paths[j][1][:2] for j in curr_indices],
+            DRAWING_MOVE_MAX_DIST
+        )
+        for a, b in pairs:
+            i, j = prev_indices[a], curr_indices[b]
+            moved.append((i, j))
+            prev_done[i] = curr_done[j] = True
+
+    added = [j for j, done in enumerate(curr_done) if not done]
+    removed = [i for i, done in enumerate(prev_done) if not done]
+    return moved, added, removed
+
+def group_boxes(boxes) -> List[List[int]]:
+    """Indices of boxes grouped transitively when they are within DRAWING_GROUP_GAP of each other."""
+    parent = list(range(len(boxes)))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    gap = DRAWING_GROUP_GAP
+    cell = DRAWING_GROUP_CELL
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for i, (x0, y0, x1, y1) in enumerate(boxes):
+        for cx in range(int((x0 - gap) // cell), int((x1 + gap) // cell) + 1):
+            for cy in range(int((y0 - gap) // cell), int((y1 + gap) // cell) + 1):
+                for j in cells.get((cx, cy), ()):
+                    a, b = boxes[i], boxes[j]
+                    if a[0] - gap <= b[2] and b[0] - gap <= a[2] and a[1] - gap <= b[3] and b[1] - gap <= a[3]:
+                        parent[find(i)] = find(j)
+                cells.setdefault((cx, cy), []).append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+def _union_box(boxes) -> ChangedRegion:
+    return ChangedRegion(
+        x0=min(b[0] for b in boxes), y0=min(b[1] for b in boxes),
+        x1=max(b[2] for b in boxes), y1=max(b[3] for b in boxes)
+    )
+
+def compute_drawing_diff(prev_page, curr_page, prev_blocks, curr_blocks) -> List[DrawingChange]:
+    """
+    Added, removed and moved graphics between two revisions of a page, from
+    their vector paths (no rasterization). Changed paths that touch are grouped,
+    so a moved fixture symbol is one change; changes are in reading order.
+    """
+    prev_paths, curr_paths = page_drawings(prev_page), page_drawings(curr_page)
+    moved, added, removed = match_drawings(prev_paths, curr_paths)
+
+    # Room labels of each page are indexed once, on first use
+    indexes = {}
+    def room_label(box, side, blocks):
+        if side not in indexes:
+            indexes[side] = RoomLabelIndex(blocks)
+        return indexes[side].nearest((box.x0, box.y0, box.x1, box.y1))
+
+    changes = []
+    for kind, paths, indices, side, blocks in (
+        ("ADDED", curr_paths, added, "current", curr_blocks),
+        ("REMOVED", prev_paths, removed, "previous", prev_blocks),
+    ):
+        for group in group_boxes([paths[k][1] for k in indices]):
+            box = _union_box([paths[indices[k]][1] for k in group])
+            changes.append(DrawingChange(
+                type=kind, bbox=box, pathCount=len(group), location_context=room_label(box, side, blocks)
+            ))
+    for group in group_boxes([curr_paths[j][1] for _, j in moved]):
+        box = _union_box([curr_paths[moved[k][1]][1] for k in group])
+        changes.append(DrawingChange(
+            type="MOVED", bbox=box, pathCount=len(group),
+            previousBbox=_union_box([prev_paths[moved[k][0]][1] for k in group]),
+            location_context=room_label(box, "current", curr_blocks)
+        ))
+
+    changes.sort(key=lambda change: (change.bbox.y0, change.bbox.x0))
+    return changes
+
+# Bytes per read when spooling uploads to disk.
+SPOOL_CHUNK_BYTES = 1 << 20
+
+def spool_upload(upload: UploadFile, path: str) -> str:
+    """Copies an upload to `path` in chunks and returns the SHA-1 of its contents."""
     import hashlib
-    h = hashlib.md5()
-    h.update(prev_pdf[:1000]) # First 1000 bytes for speed
-    h.update(curr_pdf[:1000])
+    h = hashlib.sha1()
+    upload.file.seek(0)
+    with open(path, "wb") as f:
+        while True:
+            chunk = upload.file.read(SPOOL_CHUNK_BYTES)
+            if not chunk:
+                break
+            h.update(chunk)
+            f.write(chunk)
     return h.hexdigest()
 
+def get_session_id(prev_hash: str, curr_hash: str) -> str:
+    """Stable session ID from the content hashes of both PDFs (order matters)."""
+    import hashlib
+    return hashlib.sha1(f"{prev_hash}:{curr_hash}".encode("ascii")).hexdigest()
+
+# --- Parallel pipeline ---
+# PyMuPDF documents can't be shared across threads or processes, so every
+# task opens its own copy of the PDF from a temporary file.
+
+_BACK_REFERENCE = re.compile(r"/(?:Parent|P)\s+\d+\s+0\s+R")
+_REFERENCE = re.compile(r"(\d+)\s+0\s+R")
+
+def _inherited_key(doc, xref: int, key: str) -> str:
+    """Value of a page attribute, looked up the page tree if the page inherits it."""
+    while True:
+        kind, value = doc.xref_get_key(xref, key)
+        if kind != "null":
+            return value
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            return ""
+        xref = int(parent.split()[0])
+
+def page_fingerprint(doc, page) -> str:
+    """
+    Hash of everything a page draws: its geometry, content streams, and every
+    object reachable from its resources and annotations (fonts, images, form
+    XObjects...), with object numbers normalized away so that the same page
+    saved in another file hashes the same. Equal fingerprints render identically.
+    """
+    import hashlib
+    h = hashlib.sha1(f"{tuple(page.rect)}|{page.rotation}".encode("ascii"))
+    h.update(page.read_contents())
+
+    seen = set()
+    sources = [_inherited_key(doc, page.xref, "Resources"), _inherited_key(doc, page.xref, "Annots")]
+    while sources:
+        source = _BACK_REFERENCE.sub("", sources.pop())
+        h.update(_REFERENCE.sub("R", source).encode("utf-8", "surrogateescape"))
+        children = []
+        for match in _REFERENCE.finditer(source):
+            xref = int(match.group(1))
+            if xref in seen:
+                continue
+            seen.add(xref)
+            if doc.xref_is_stream(xref):
+                h.update(doc.xref_stream_raw(xref) or b"")
+            children.append(doc.xref_object(xref, compressed=True))
+        sources.extend(reversed(children))
+    return h.hexdigest()
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    """extract_sheet_info_spatial (plus the page fingerprint) for pages [start, stop) of a PDF on disk."""
+    import fitz
+    infos = []
+    with fitz.open(pdf_path) as doc:
+        for i in range(start, stop):
+            info = extract_sheet_info_spatial(doc[i], i)
+            info["fingerprint"] = page_fingerprint(doc, doc[i])
+            infos.append(info)
+    return infos
+
+def load_extraction(file_hash: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """Cached per-page infos of the PDF with this content hash, if it was extracted before."""
+    infos = extraction_cache.get(file_hash) if file_hash else None
+    if infos is not None:
+        for info in infos:
+            info["kind"] = SheetKind(info["kind"])
+    return infos
+
+def diff_page_pairs(prev_path: str, curr_path: str, pairs: List[Tuple]) -> List[Tuple[float, List[ChangeItem], List[ChangedRegion], List[DrawingChange]]]:
+    """Diff score, text changes, changed regions and graphics changes of (prev page, curr page, prev blocks, curr blocks) pairs."""
+    import fitz
+    results = []
+    with fitz.open(prev_path) as doc_prev, fitz.open(curr_path) as doc_curr:
+        for prev_index, curr_index, prev_blocks, curr_blocks in pairs:
+            prev_page, curr_page = doc_prev[prev_index], doc_curr[curr_index]
+            score, mask = diff_pages(prev_page, curr_page)
+            results.append((
+                score, compute_spatial_diff(prev_blocks, curr_blocks), changed_regions(mask),
+                compute_drawing_diff(prev_page, curr_page, prev_blocks, curr_blocks)
+            ))
+    return results
+
+def _task_size(count: int, workers: int) -> int:
+    return max(1, min(PAGES_PER_TASK, -(-count // workers)))
+
+def _run_tasks(fn, tasks: List[Tuple], parallel: bool) -> List:
+    """Results of fn(*task) for every task, concatenated in task order."""
+    if parallel:
+        futures = [get_pool().submit(fn, *task) for task in tasks]
+        chunks = [future.result() for future in futures]
+    else:
+        chunks = [fn(*task) for task in tasks]
+    return [item for chunk in chunks for item in chunk]
+
+def compare_documents(prev_path: str, curr_path: str, max_workers: Optional[int] = None,
+                      prev_hash: Optional[str] = None, curr_hash: Optional[str] = None):
+    """
+    Sheet-by-sheet comparison of two PDFs on disk. Page ranges of both documents
+    are extracted in a shared process pool, sheets are matched by number, and the
+    matched pairs are diffed in ranges in the pool; results keep sheet order.
+    Documents whose content hash is given are extracted once and then served from
+    the extraction cache.
+    Returns (sheets, previous sheet -> page index, current sheet -> page index).
+    """
+    import fitz
+    with fitz.open(prev_path) as doc:
+        prev_count = doc.page_count
+    with fitz.open(curr_path) as doc:
+        curr_count = doc.page_count
+
+    workers = max_workers or os.cpu_count() or 1
+    parallel = workers > 1 and prev_count + curr_count >= MIN_PARALLEL_PAGES
+
+    # 1. Sheet numbers, titles, text blocks and fingerprints of every page
+    # (metadata phase); documents seen before come from the extraction cache
+    prev_infos = load_extraction(prev_hash)
+    curr_infos = load_extraction(curr_hash)
+    pending = [(path, count) for path, count, infos in (
+        (prev_path, prev_count, prev_infos), (curr_path, curr_count, curr_infos)
+    ) if infos is None]
+    pending_pages = sum(count for _, count in pending)
+    step = _task_size(pending_pages, workers)
+    tasks = [(path, i, min(i + step, count)) for path, count in pending for i in range(0, count, step)]
+    infos = _run_tasks(extract_page_range, tasks, workers > 1 and pending_pages >= MIN_PARALLEL_PAGES)
+
+    if prev_infos is None:
+        prev_infos, infos = infos[:prev_count], infos[prev_count:]
+        if prev_hash:
+            extraction_cache.put(prev_hash, prev_infos)
+    if curr_infos is None:
+        curr_infos = infos
+        if curr_hash:
+            extraction_cache.put(curr_hash, curr_infos)
+
+    prev_sheets = {}
+    for i, info in enumerate(prev_infos):
+        prev_sheets[info['sheetNumber']] = {'info': info, 'page_index': i}
+    curr_sheets = {}
+    for i, info in enumerate(curr_infos):
+        curr_sheets[info['sheetNumber']] = {'info': info, 'page_index': i}
+
+    all_nums = sorted(set(prev_sheets.keys()) | set(curr_sheets.keys()))
+
+    # 2. Diff the sheets present in both (math phase - NO IMAGES); sheets whose
+    # pages have the same fingerprint are unchanged without rendering anything
+    diffs = {}
+    matched = []
+    for num in all_nums:
+        if num in prev_sheets and num in curr_sheets:
+            if prev_sheets[num]['info']['fingerprint'] == curr_sheets[num]['info']['fingerprint']:
+                diffs[num] = (0.0, [], [], [])
+            else:
+                matched.append(num)
+    pairs = [(
+        prev_sheets[num]['page_index'], curr_sheets[num]['page_index'],
+        prev_sheets[num]['info']['textBlocks'], curr_sheets[num]['info']['textBlocks']
+    ) for num in matched]
+    step = _task_size(len(pairs), workers)
+    tasks = [(prev_path, curr_path, pairs[i:i + step]) for i in range(0, len(pairs), step)]
+    diffs.update(zip(matched, _run_tasks(diff_page_pairs, tasks, parallel and len(pairs) > 1)))
+
+    sheet_results = []
+    for num in all_nums:
+        prev = prev_sheets.get(num)
+        curr = curr_sheets.get(num)
+
+        status = SheetStatus.UNCHANGED
+        diff_score = 0.0
+        sheet_changes = []
+        regions = []
+        drawing_changes = []
+
+        if prev and curr:
+            kind = curr['info']['kind']
+            sheet_title = curr['info']['sheetTitle']
+            diff_score, sheet_changes, regions, drawing_changes = diffs[num]
+            if diff_score > 0.001 or len(sheet_changes) > 0 or len(drawing_changes) > 0:
+                status = SheetStatus.REVISED
+        elif prev:
+            status = SheetStatus.REMOVED
+            kind = prev['info']['kind']
+            sheet_title = prev['info']['sheetTitle']
+        else:
+            status = SheetStatus.NEW
+            kind = curr['info']['kind']
+            sheet_title = curr['info']['sheetTitle']
+
+        sheet_results.append(SheetData(
+            sheetId=f"{num}-{status}",
+            sheetNumber=num,
+            sheetTitle=sheet_title,
+            status=status,
+            sheetKind=kind,
+            diffScore=diff_score if status == SheetStatus.REVISED else None,
+            previousPreviewBase64=None, # STRIPPED
+            currentPreviewBase64=None,  # STRIPPED
+            warningsForSheet=[],
+            changes=sheet_changes,
+            changedRegions=regions if status == SheetStatus.REVISED else [],
+            drawingChanges=drawing_changes if status == SheetStatus.REVISED else []
+        ))
+
+    prev_pages = {num: sheet['page_index'] for num, sheet in prev_sheets.items()}
+    curr_pages = {num: sheet['page_index'] for num, sheet in curr_sheets.items()}
+    return sheet_results, prev_pages, curr_pages
+
 # --- Endpoint ---
 
 @router.post("/compare", response_model=ComparisonResponse)
@@ -419,129 +1154,105 @@ async def compare_pdfs(
     currentPdf: UploadFile = File(...)
 ):
     try:
-        prev_bytes = await previousPdf.read()
-        curr_bytes = await currentPdf.read()
-        
-        import fitz
-        import gc
+        # Both PDFs stay on disk for the session's previews
+        directory = tempfile.mkdtemp(prefix="change-narrative-")
+        prev_path = os.path.join(directory, "previous.pdf")
+        curr_path = os.path.join(directory, "current.pdf")
+        # The session is only stored once the comparison succeeded, so a failed
+        # comparison leaves nothing behind and a stored one is never evicted mid-read
+        try:
+            prev_hash = await run_in_threadpool(spool_upload, previousPdf, prev_path)
+            curr_hash = await run_in_threadpool(spool_upload, currentPdf, curr_path)
+            sheet_results, prev_pages, curr_pages = await run_in_threadpool(
+                compare_documents, prev_path, curr_path,
+                prev_hash=prev_hash, curr_hash=curr_hash
+            )
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
 
-        doc_prev = fitz.open(stream=BytesIO(prev_bytes), filetype="pdf")
-        doc_curr = fitz.open(stream=BytesIO(curr_bytes), filetype="pdf")
-        
-        # 1. Quickly extract sheet numbers and titles (Metadata phase)
-        prev_sheets = {}
-        for i, page in enumerate(doc_prev):
-            info = extract_sheet_info_spatial(page, i)
-            prev_sheets[info['sheetNumber']] = {'info': info, 'page_index': i}
-            
-        curr_sheets = {}
-        for i, page in enumerate(doc_curr):
-            info = extract_sheet_info_spatial(page, i)
-            curr_sheets[info['sheetNumber']] = {'info': info, 'page_index': i}
-            
-        all_nums = sorted(set(prev_sheets.keys()) | set(curr_sheets.keys()))
-        sheet_results = []
-        
-        # 2. Compare sheets (Math phase - NO IMAGES)
-        for num in all_nums:
-            prev = prev_sheets.get(num)
-            curr = curr_sheets.get(num)
-            
-            status = SheetStatus.UNCHANGED
-            diff_score = 0.0
-            sheet_changes = []
-            kind = SheetKind.OTHER
-            sheet_title = ""
-
-            if prev and curr:
-                kind = curr['info']['kind']
-                sheet_title = curr['info']['sheetTitle']
-                
-                # Perform the math for diffing (High res but temporary)
-                page_prev = doc_prev[prev['page_index']]
-                page_curr = doc_curr[curr['page_index']]
-                
-                diff_score = compute_diff_score(page_prev, page_curr)
-                sheet_changes = compute_spatial_diff(prev['info']['textBlocks'], curr['info']['textBlocks'])
-                
-                if diff_score > 0.001 or len(sheet_changes) > 0:
-                    status = SheetStatus.REVISED
-                
-            elif prev and not curr:
-                status = SheetStatus.REMOVED
-                kind = prev['info']['kind']
-                sheet_title = prev['info']['sheetTitle']
-                
-            elif not prev and curr:
-                status = SheetStatus.NEW
-                kind = curr['info']['kind']
-                sheet_title = curr['info']['sheetTitle']
-                
-            sheet_results.append(SheetData(
-                sheetId=f"{num}-{status}",
-                sheetNumber=num,
-                sheetTitle=sheet_title,
-                status=status,
-                sheetKind=kind,
-                diffScore=diff_score if status == SheetStatus.REVISED else None,
-                previousPreviewBase64=None, # STRIPPED
-                currentPreviewBase64=None,  # STRIPPED
-                warningsForSheet=[],
-                changes=sheet_changes
-            ))
-            
-            # Flush memory after each page pair
-            gc.collect()
+        session = comparison_store.add_session(ComparisonSession(
+            get_session_id(prev_hash, curr_hash), directory, prev_path, curr_path, prev_pages, curr_pages
+        ))
+        session.regions = {sheet.sheetNumber: sheet.changedRegions for sheet in sheet_results if sheet.changedRegions}
 
-        doc_prev.close()
-        doc_curr.close()
-        
         return ComparisonResponse(
             sheets=sheet_results,
-            tagConsistency=TagConsistencyReport(warnings=[])
+            tagConsistency=TagConsistencyReport(warnings=[]),
+            sessionId=session.id
         )
 
     except Exception as e:
         logging.error(f"Comparison Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def render_sheet_previews(session: ComparisonSession, sheet_number: str) -> Dict[str, Optional[str]]:
+    """High-res previews of one sheet in both documents (None where it is absent)."""
+    import fitz
+    previews = {}
+    for key, path, pages in (
+        ("previous", session.prev_path, session.prev_pages),
+        ("current", session.curr_path, session.curr_pages),
+    ):
+        previews[key] = None
+        if sheet_number in pages:
+            with fitz.open(path) as doc:
+                previews[key] = render_page_base64(doc[pages[sheet_number]], 2.0) # High Res
+    return previews
+
 @router.post("/preview")
 async def get_preview(
+    sessionId: str = Form(...),
+    sheetNumber: str = Form(...)
+):
+    """Specific high-res preview for a single sheet of a comparison session, on-demand."""
+    # Held for the whole render so eviction cannot delete the PDFs under it
+    with comparison_store.use_session(sessionId) as session:
+        if session is None:
+            raise HTTPException(status_code=404, detail="Comparison session not found. Please compare the PDFs again.")
+        if sheetNumber not in session.prev_pages and sheetNumber not in session.curr_pages:
+            raise HTTPException(status_code=404, detail=f"Sheet {sheetNumber} not found")
+
+        try:
+            return await run_in_threadpool(render_sheet_previews, session, sheetNumber)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+def render_region_crops(session: ComparisonSession, sheet_number: str, region: ChangedRegion) -> Dict[str, Optional[str]]:
+    """High-res crops of one changed region (plus some context) in both documents."""
+    import fitz
+    crops = {}
+    for key, path, pages in (
+        ("previous", session.prev_path, session.prev_pages),
+        ("current", session.curr_path, session.curr_pages),
+    ):
+        crops[key] = None
+        if sheet_number in pages:
+            with fitz.open(path) as doc:
+                page = doc[pages[sheet_number]]
+                clip = fitz.Rect(region.x0, region.y0, region.x1, region.y1)
+                clip = (clip + (-REGION_CROP_PADDING_PT, -REGION_CROP_PADDING_PT, REGION_CROP_PADDING_PT, REGION_CROP_PADDING_PT)) & page.rect
+                if clip.is_empty:
+                    continue
+                zoom = min(REGION_CROP_ZOOM, (REGION_CROP_MAX_PIXELS / (clip.width * clip.height)) ** 0.5)
+                crops[key] = render_page_base64(page, zoom, clip)
+    return crops
+
+@router.post("/region-crop")
+async def get_region_crop(
+    sessionId: str = Form(...),
     sheetNumber: str = Form(...),
-    previousPdf: UploadFile = File(...),
-    currentPdf: UploadFile = File(...)
+    regionIndex: int = Form(...)
 ):
-    """Specific high-res preview for a single sheet, on-demand."""
-    try:
-        prev_bytes = await previousPdf.read()
-        curr_bytes = await currentPdf.read()
-        
-        import fitz
-        doc_prev = fitz.open(stream=BytesIO(prev_bytes), filetype="pdf")
-        doc_curr = fitz.open(stream=BytesIO(curr_bytes), filetype="pdf")
-        
-        prev_b64 = None
-        curr_b64 = None
-        
-        # Find the specific sheet in both
-        for page in doc_prev:
-            info = extract_sheet_info_spatial(page, page.number)
-            if info['sheetNumber'] == sheetNumber:
-                prev_b64 = render_page_base64(page, 2.0) # High Res
-                break
-                
-        for page in doc_curr:
-            info = extract_sheet_info_spatial(page, page.number)
-            if info['sheetNumber'] == sheetNumber:
-                curr_b64 = render_page_base64(page, 2.0) # High Res
-                break
-        
-        doc_prev.close()
-        doc_curr.close()
-        
-        return {
-            "previous": prev_b64,
-            "current": curr_b64
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """High-res crops of one changed region of a revised sheet, rendered on demand."""
+    with comparison_store.use_session(sessionId) as session:
+        if session is None:
+            raise HTTPException(status_code=404, detail="Comparison session not found. Please compare the PDFs again.")
+        regions = session.regions.get(sheetNumber, [])
+        if not 0 <= regionIndex < len(regions):
+            raise HTTPException(status_code=404, detail=f"Region {regionIndex} of sheet {sheetNumber} not found")
+
+        try:
+            return await run_in_threadpool(render_region_crops, session, sheetNumber, regions[regionIndex])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
@@ -1,29 +1,75 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import numpy as np
-from scipy.interpolate import RegularGridInterpolator
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import matplotlib.tri as tri
 from io import BytesIO
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
+from reportlab import rl_config
 import tempfile
+import hashlib
 import os
 import re
 
+from ..illuminance import (
+    grid_spacing, illuminance_at_points, build_candela_interpolator, candela_table, plane_basis,
+    grid_axes, grid_memory_bytes, compute_grid_tiled, compute_planes_tiled, compute_surface_tiled, ComputeBudgetExceeded, photometry_hash
+)
+from ..grid_store import grid_store, export_cache
+from ..adaptive_grid import adaptive_isolines
+from ..contouring import contour_grid
+from ..site_layout import layout_illuminance, layout_memory_bytes, array_illuminance, array_memory_bytes
+from ..isoline_raster import IsolineRaster
+from ..vector_export import (
+    PDF_PLOT_TOLERANCE_PT, iter_svg, iter_dxf, pdf_polyline_operators, pdf_grid_operators
+)
+from ..sweep import MAX_SWEEP_COMBINATIONS, sweep_combinations, run_sweep
+from ..photometry import photometric_report, render_polar_plot, report_cache
+from ..terrain import heightmap_surface, tin_surface, terrain_store
+from ..calc_grid import grid_statistics, calc_area_statistics, iter_grid_binary, iter_grid_csv
+from ..labels import LABEL_CLEARANCE_FRACTION, label_positions, avoid_collisions
+from ..polyline import (
+    SIMPLIFY_FRACTION, QUANTUM_FRACTION, PATH_ENCODINGS, simplify_paths, encode_paths, decode_paths
+)
+
 router = APIRouter(prefix="/isoline", tags=["isoline"])
 
+# Write compressed PDF streams as binary; the ASCII85 wrapping is 25% larger and,
+# without reportlab's C accelerator, takes longer than generating the page.
+rl_config.useA85 = 0
+
+# Adaptive mode starts from cells of this fraction of the luminaire height above
+# the calc plane; distributions don't have features much finer than that.
+ADAPTIVE_COARSE_FRACTION = 0.25
+# Adaptive mode keeps every sample (int64 key, float64 value) and evaluates each
+# refinement step untiled, at about this many bytes per evaluated point.
+ADAPTIVE_BYTES_PER_POINT = 256
+
+# Dense grids are bounded by memory and wall time rather than a fixed point count.
+GRID_MEMORY_BUDGET_MB = float(os.getenv("ISOLINE_GRID_MEMORY_MB", "512"))
+COMPUTE_TIME_BUDGET_S = float(os.getenv("ISOLINE_COMPUTE_SECONDS", "60"))
+
+# Request fields that only shape the returned geometry, not the computed grid
+OUTPUT_FIELDS = {"isoLevels", "simplifyTolerance", "pathEncoding", "avoidLabelCollisions"}
+
 # --- Data Models ---
 
 class IsolineLevel(BaseModel):
     value: float
     color: str
 
-class ComputeRequest(BaseModel):
+class PathOptions(BaseModel):
+    simplifyTolerance: Optional[float] = None # project units; default is a fraction of the grid spacing, 0 keeps every vertex
+    pathEncoding: str = "json" # "json" | "delta" | "float32", see IsolineLevelResult.encodedPaths
+    avoidLabelCollisions: bool = False # opt-in: drop labels crowding a label of this or another level
+
+class ComputeRequest(PathOptions):
     units: str = "ft"
     mountingHeight: float
     calcPlaneHeight: float = 0.0
@@ -35,17 +81,25 @@ class ComputeRequest(BaseModel):
     rotationX: float = 0.0
     rotationY: float = 0.0
     rotationZ: float = 0.0
+    evaluationMode: str = "grid" # "grid" | "adaptive"
 
 class IsolineLabel(BaseModel):
     x: float
     y: float
     text: str
 
+class EncodedPaths(BaseModel):
+    encoding: str # "delta" | "float32"
+    quantum: Optional[float] = None # delta: coordinate = integer * quantum
+    offsets: List[int] # path i spans vertices offsets[i]:offsets[i + 1]
+    data: Union[List[int], str] # delta: interleaved integer x, y steps; float32: base64 x, y pairs
+
 class IsolineLevelResult(BaseModel):
     value: float
     color: str
     paths: List[List[List[float]]] 
     labels: List[IsolineLabel]
+    encodedPaths: Optional[EncodedPaths] = None # replaces `paths` when a compact encoding was requested
 
 class ComputeResponse(BaseModel):
     units: str
@@ -56,6 +110,12 @@ class ComputeResponse(BaseModel):
     extents: Dict[str, float]
     scaleBar: Dict[str, Any]
     levels: List[IsolineLevelResult]
+    evaluatedPoints: Optional[int] = None
+    resultId: Optional[str] = None # cached grid, see /isoline/recontour
+
+class RecontourRequest(PathOptions):
+    resultId: str
+    isoLevels: List[IsolineLevel]
 
 class ExportOptions(BaseModel):
     format: str = "pdf"
@@ -66,14 +126,239 @@ class ExportOptions(BaseModel):
     gridSpacing: Optional[float] = None
     scaleBarLength: float = 50.0
     fileName: Optional[str] = None
+    simplifyForPlot: bool = True # PDF: drop vertices closer than the plot tolerance
 
-class ExportPdfRequest(BaseModel):
-    isolineData: ComputeResponse
+class ExportPdfRequest(PathOptions):
+    # Either the full result, or the id of a cached result plus the levels to draw
+    isolineData: Optional[ComputeResponse] = None
+    resultId: Optional[str] = None
+    isoLevels: List[IsolineLevel] = []
     options: ExportOptions
 
-class ExportPngRequest(BaseModel):
-    isolineData: ComputeResponse
-    options: ExportOptions
+class ExportPngRequest(ExportPdfRequest):
+    pass
+
+class LayoutLuminaire(BaseModel):
+    x: float
+    y: float
+    mountingHeight: float
+    rotationX: float = 0.0
+    rotationY: float = 0.0
+    rotationZ: float = 0.0
+    photometryId: str # filename of one of the uploaded IES files
+    llf: float = 1.0
+    cutoffDistance: Optional[float] = None # ignore contributions beyond this distance
+
+class CalcGrid(BaseModel):
+    minX: float
+    maxX: float
+    minY: float
+    maxY: float
+    spacing: float = 1.0
+    calcPlaneHeight: float = 0.0
+
+class CalcArea(BaseModel):
+    name: str
+    polygon: List[List[float]] # [[x, y], ...] in project units
+
+class CalcGridRequest(ComputeRequest):
+    isoLevels: List[IsolineLevel] = []
+    calcAreas: List[CalcArea] = []
+    outputFormat: str = "stats" # "stats" | "binary" | "csv"
+
+class CalcGridStatistics(BaseModel):
+    name: Optional[str] = None
+    points: int
+    avg: Optional[float] = None
+    max: Optional[float] = None
+    min: Optional[float] = None
+    avgMin: Optional[float] = None
+    maxMin: Optional[float] = None
+
+class CalcGridResponse(BaseModel):
+    units: str
+    illuminanceUnits: str
+    extents: Dict[str, float]
+    spacing: float
+    nx: int
+    ny: int
+    resultId: Optional[str] = None
+    summary: CalcGridStatistics
+    areas: List[CalcGridStatistics]
+
+class PoleArray(BaseModel):
+    originX: float = 0.0
+    originY: float = 0.0
+    spacingX: float
+    spacingY: float
+    countX: int
+    countY: int
+
+class ArrayComputeRequest(PathOptions):
+    units: str = "ft"
+    illuminanceUnits: str = "fc"
+    mountingHeight: float
+    llf: float = 1.0
+    rotationX: float = 0.0
+    rotationY: float = 0.0
+    rotationZ: float = 0.0
+    array: PoleArray
+    grid: CalcGrid
+    kernelRadius: Optional[float] = None # truncate each luminaire's contribution
+    method: str = "auto" # "auto" | "fft" | "shift"
+    isoLevels: List[IsolineLevel]
+
+class SweepRequest(ComputeRequest):
+    # Values to sweep; an empty list keeps the single value of the base fields
+    mountingHeights: List[float] = []
+    rotationsX: List[float] = []
+    rotationsY: List[float] = []
+    rotationsZ: List[float] = []
+    llfs: List[float] = []
+    includeContours: bool = False
+
+class SweepLevelCoverage(BaseModel):
+    value: float
+    area: float # project units squared at or above the level
+
+class SweepCombination(BaseModel):
+    mountingHeight: float
+    rotationX: float
+    rotationY: float
+    rotationZ: float
+    llf: float
+    statistics: CalcGridStatistics # points at or above the lowest iso level
+    coverage: List[SweepLevelCoverage]
+    levels: Optional[List[IsolineLevelResult]] = None
+
+class SweepResponse(BaseModel):
+    units: str
+    illuminanceUnits: str
+    calcPlaneHeight: float
+    extents: Dict[str, float]
+    spacing: float
+    nx: int
+    ny: int
+    combinations: List[SweepCombination]
+
+class CalcPlane(BaseModel):
+    name: str
+    origin: List[float] # [x, y, z] of the plane's (s, t) = (0, 0) corner
+    uAxis: List[float] = [1.0, 0.0, 0.0] # direction of s
+    vAxis: List[float] = [0.0, 1.0, 0.0] # direction of t; the lit side faces uAxis x vAxis
+    width: float # extent along uAxis
+    height: float # extent along vAxis
+    spacing: Optional[float] = None # default: the detailLevel spacing
+
+class PlaneComputeRequest(PathOptions):
+    units: str = "ft"
+    illuminanceUnits: str = "fc"
+    luminaireX: float = 0.0
+    luminaireY: float = 0.0
+    mountingHeight: float
+    llf: float = 1.0
+    rotationX: float = 0.0
+    rotationY: float = 0.0
+    rotationZ: float = 0.0
+    detailLevel: str = "medium"
+    planes: List[CalcPlane]
+    isoLevels: List[IsolineLevel] = []
+    includeValues: bool = False
+
+class PlaneResult(BaseModel):
+    name: str
+    normal: List[float] # unit normal of the lit side
+    spacing: float
+    ns: int # points along uAxis
+    nt: int # points along vAxis
+    summary: CalcGridStatistics
+    levels: List[IsolineLevelResult] # in plane (s, t) coordinates
+    values: Optional[List[List[float]]] = None # nt rows of ns values
+
+class PlaneComputeResponse(BaseModel):
+    units: str
+    illuminanceUnits: str
+    planes: List[PlaneResult]
+
+class ZoneLumens(BaseModel):
+    start: float # vertical angle, degrees from nadir
+    end: float
+    lumens: float
+    percent: float # of total lumens
+
+class BugRating(BaseModel):
+    rating: str # e.g. "B2-U0-G1"
+    backlight: int
+    uplight: int
+    glare: int
+    zoneLumens: Dict[str, float] # TM-15 zones: FL, BL, FM, ..., UL, UH
+
+class BeamSpread(BaseModel):
+    plane: str # Type C vertical plane pair, e.g. "0-180"
+    beamAngle: Optional[float] = None # degrees at or above 50% of the peak
+    fieldAngle: Optional[float] = None # degrees at or above 10% of the peak
+
+class PhotometryReport(BaseModel):
+    photometryId: str # content hash of the file
+    totalLumens: float
+    downwardLumens: float
+    upwardLumens: float
+    maxCandela: float
+    maxCandelaAngles: Dict[str, float]
+    zones: List[ZoneLumens]
+    summary: List[ZoneLumens]
+    bug: BugRating
+    beamSpreads: List[BeamSpread]
+
+class PolarPlotRequest(BaseModel):
+    format: str = "png" # "png" | "svg"
+    title: Optional[str] = None
+
+class Heightmap(BaseModel):
+    originX: float = 0.0
+    originY: float = 0.0
+    spacing: float
+    elevations: List[List[Optional[float]]] # rows along +y of columns along +x; null for no data
+
+class Tin(BaseModel):
+    vertices: List[List[float]] # [[x, y, z], ...]
+    triangles: List[List[int]] # [[i, j, k], ...] vertex indices
+    spacing: float = 1.0 # sampling interval of the calc points
+
+class TerrainRequest(BaseModel):
+    # Exactly one of the two
+    heightmap: Optional[Heightmap] = None
+    tin: Optional[Tin] = None
+
+class TerrainResponse(BaseModel):
+    terrainId: str # content hash, see /isoline/compute-terrain
+    extents: Dict[str, float]
+    spacing: float
+    nx: int
+    ny: int
+    minElevation: float
+    maxElevation: float
+
+class TerrainComputeRequest(PathOptions):
+    terrainId: str
+    units: str = "ft"
+    illuminanceUnits: str = "fc"
+    luminaireX: float = 0.0
+    luminaireY: float = 0.0
+    mountingHeight: float # above grade at the pole
+    calcHeight: float = 0.0 # calc points above grade
+    llf: float = 1.0
+    rotationX: float = 0.0
+    rotationY: float = 0.0
+    rotationZ: float = 0.0
+    isoLevels: List[IsolineLevel]
+
+class LayoutComputeRequest(PathOptions):
+    units: str = "ft"
+    illuminanceUnits: str = "fc"
+    luminaires: List[LayoutLuminaire]
+    grid: CalcGrid
+    isoLevels: List[IsolineLevel]
 
 def parse_ies(content: str):
     lines = content.split('\n')
@@ -157,225 +442,105 @@ def parse_ies(content: str):
         "candela_matrix": candela_matrix
     }
 
-def rotation_matrix_x(angle_deg):
-    rad = np.radians(angle_deg)
-    c, s = np.cos(rad), np.sin(rad)
-    return np.array([
-        [1, 0, 0],
-        [0, c, -s],
-        [0, s, c]
-    ])
-
-def rotation_matrix_y(angle_deg):
-    rad = np.radians(angle_deg)
-    c, s = np.cos(rad), np.sin(rad)
-    return np.array([
-        [c, 0, s],
-        [0, 1, 0],
-        [-s, 0, c]
-    ])
-
-def rotation_matrix_z(angle_deg):
-    rad = np.radians(angle_deg)
-    c, s = np.cos(rad), np.sin(rad)
-    return np.array([
-        [c, -s, 0],
-        [s, c, 0],
-        [0, 0, 1]
-    ])
-
 def compute_grid(ies_data, mh, calc_plane, radius, detail_level, llf, rot_x=0.0, rot_y=0.0, rot_z=0.0):
-    # Determine grid spacing
-    if detail_level == "low":
-        spacing = 2.0
-    elif detail_level == "high":
-        spacing = 0.5
-    else: # medium
-        spacing = 1.0
-        
-    # Grid extents
-    min_x, max_x = -radius, radius
-    min_y, max_y = -radius, radius
-    
-    x = np.arange(min_x, max_x + spacing, spacing)
-    y = np.arange(min_y, max_y + spacing, spacing)
-    
+    x, y = grid_axes(radius, grid_spacing(detail_level))
+    illuminance = compute_grid_tiled(ies_data, x, y, mh, calc_plane, llf, rot_x, rot_y, rot_z)
     xx, yy = np.meshgrid(x, y)
-    
-    # Calculate vector from luminaire (0,0,mh) to grid points (xx, yy, calc_plane)
-    # v = P_grid - P_lum
-    # P_grid = (xx, yy, calc_plane)
-    # P_lum = (0, 0, mh)
-    # v = (xx, yy, calc_plane - mh)
-    # v = (xx, yy, -dz)
-    
-    dz = mh - calc_plane
-    if dz <= 0:
-        return xx, yy, np.zeros_like(xx)
-        
-    # Vectors in global frame
-    # We flatten for matrix multiplication
-    num_pts = xx.size
-    vx = xx.flatten()
-    vy = yy.flatten()
-    vz = np.full(num_pts, -dz)
-    
-    # Stack array for rotation (3, N)
-    v_global = np.vstack((vx, vy, vz))
-    
-    # Calculate Rotation Matrix R = Rz * Ry * Rx
-    # We want to transform Global to Local, so we apply inverse rotation.
-    # v_local = R_inv * v_global
-    # R_inv = (Rz * Ry * Rx)^-1 = Rx^-1 * Ry^-1 * Rz^-1
-    # Note: Rotation by -angle gives inverse.
-    
-    rx_inv = rotation_matrix_x(-rot_x)
-    ry_inv = rotation_matrix_y(-rot_y)
-    rz_inv = rotation_matrix_z(-rot_z)
-    
-    # Combined inverse rotation matrix
-    # Order matters: first undo Z, then Y, then X for "intrinsic" rotations? 
-    # Or if we assume rot = rot_z(rot_y(rot_x(v))), then inverse is inv_x(inv_y(inv_z(v)))
-    # Let's assume standard Euler (Z-Y-X or similar). 
-    # Let's apply in reverse order of application.
-    # Typically: Rotate X (Tilt), then Y (Roll), then Z (Orientation).
-    # So v_global = Rz * Ry * Rx * v_local
-    # v_local = Rx' * Ry' * Rz' * v_global
-    
-    r_comb_inv = rx_inv @ (ry_inv @ rz_inv)
-    
-    # Apply rotation
-    v_local = r_comb_inv @ v_global
-    
-    # Extract local components
-    lx = v_local[0, :]
-    ly = v_local[1, :]
-    lz = v_local[2, :]
-    
-    # Calculate spherical coordinates in local frame
-    d2 = lx**2 + ly**2 + lz**2
-    d = np.sqrt(d2)
-    
-    # Avoid div by zero
-    d[d == 0] = 1e-9
-    
-    # Vertical angle (from nadir)
-    # in local frame, nadir is -Z axis (0, 0, -1)
-    # theta = arccos( dot(v, nadir) / |v| )
-    # v . nadir = -lz
-    # But Type C vertical angles:
-    # 0 is down (-Z in standard, or is it?)
-    # Usually in IES, 0 is nadir, 90 is horizontal, 180 is zenith.
-    # So we want angle between vector and (0,0,-1).
-    # cos(theta) = -lz / d
-    # Wait, if lz is negative (down), -lz is positive. cos(0)=1. Correct.
-    
-    # Clip for arccos stability
-    cos_theta = np.clip(-lz / d, -1.0, 1.0)
-    v_angles = np.degrees(np.arccos(cos_theta))
-    
-    # Horizontal angle
-    # In Type C, 0 degrees horizontal plane.
-    # Usually defines plane containing the beam?
-    # Standard: 0 is +X axis ?
-    # atan2(y, x)
-    h_angles = np.degrees(np.arctan2(ly, lx))
-    h_angles = (h_angles + 360) % 360
-    
-    # Original distance (from source to point) is 'd' (magnitude remains same after rotation)
-    # Used for inverse square law: E = I * cos(incidence) / d^2
-    # Incidence angle is angle between light ray and normal to surface.
-    # Surface normal is (0,0,1) in global frame.
-    # Light ray vector is v_global = (vx, vy, vz). vz is -dz.
-    # cos(incidence) = dot(-v_global, normal) / d
-    # -v_global = (-vx, -vy, dz)
-    # normal = (0, 0, 1)
-    # dot = dz
-    # So cos(incidence) = dz / d
-    # This remains dz / d regardless of luminaire rotation!
-    # Because surface didn't rotate.
-    
-    # BUT 'd' is calculated from grid point to luminaire, which is same.
-    # So we use Global d and Global dz for illuminance calculation.
-    # We use Local angles for Intensity lookup.
-    
-    # For d calculation, I can use the d derived from local vector (magnitude invariant).
-    # For dz, I use the original dz (mh - calc_plane).
-    
-    # Reshape for interpolation
-    # ...
+    return xx, yy, illuminance
 
-    
-    # Interpolate candela
-    # We need to flatten to pass to interpolator
-    h_flat = h_angles.flatten()
-    v_flat = v_angles.flatten()
-    
-    # Setup interpolator
-    
-    # Handle Type V / Rotational Symmetry (single horizontal angle)
-    # If there is only 1 horizontal angle, we assume it applies to all H.
-    # We expand the grid to [0, 360] to satisfy interpolation and provide constant H lookup.
-    
-    interp_h_angles = ies_data["horiz_angles"]
-    interp_cd_matrix = ies_data["candela_matrix"]
-    
-    if len(interp_h_angles) == 1:
-        # Replicate to 0 and 360
-        val = interp_h_angles[0]
-        interp_h_angles = np.array([0.0, 360.0])
-        # Stack the single column twice: (1, V) -> (2, V)
-        # Note: candela_matrix is (H, V)
-        # We need to stack rows.
-        interp_cd_matrix = np.vstack((interp_cd_matrix, interp_cd_matrix))
-        
-    interp = RegularGridInterpolator(
-        (interp_h_angles, ies_data["vert_angles"]), 
-        interp_cd_matrix, 
-        bounds_error=False, 
-        fill_value=0 # If out of bounds of V (e.g. >90 for direct), assume 0
+def check_grid_budget(nx, ny, bytes_per_point=4):
+    """Reject grids whose evaluation would not fit the memory budget."""
+    needed_mb = (grid_memory_bytes(nx, ny) * bytes_per_point / 4) / (1024 * 1024)
+    if needed_mb > GRID_MEMORY_BUDGET_MB:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Grid too large ({nx * ny} points, ~{needed_mb:.0f} MB). Please reduce Radius or Detail Level, or use adaptive evaluation."
+        )
+
+def compute_deadline():
+    import time
+    return time.monotonic() + COMPUTE_TIME_BUDGET_S
+
+def illuminance_unit_scale(units, illuminance_units):
+    # Distances in ft give fc, in m give lux; convert if the other is requested
+    grid_units = "fc" if units == "ft" else "lux"
+    if grid_units == "fc" and illuminance_units == "lux":
+        return 10.7639
+    elif grid_units == "lux" and illuminance_units == "fc":
+        return 1.0 / 10.7639
+    return 1.0
+
+def path_geometry(options, spacing):
+    """(tolerance, encoding, quantum) for the output paths of a grid with `spacing`."""
+    if options.pathEncoding not in PATH_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"Unknown pathEncoding: {options.pathEncoding}")
+    tolerance = options.simplifyTolerance
+    if tolerance is None:
+        tolerance = spacing * SIMPLIFY_FRACTION
+    quantum = (tolerance if tolerance > 0 else spacing * SIMPLIFY_FRACTION) * QUANTUM_FRACTION
+    return max(tolerance, 0.0), options.pathEncoding, quantum
+
+def level_geometry(paths_per_level, units, tolerance, avoid_label_collisions=True):
+    """Simplified numpy paths and label positions of each level."""
+    label_interval = 40.0 if units == "ft" else 12.0
+    simplified = [simplify_paths(paths, tolerance) for paths in paths_per_level]
+
+    # Sparse labels every label_interval of arc length along each path
+    positions = [label_positions(paths, label_interval) for paths in simplified]
+    if avoid_label_collisions:
+        positions = avoid_collisions(positions, label_interval * LABEL_CLEARANCE_FRACTION)
+    return simplified, positions
+
+def level_result(iso, points, illuminance_units, paths=(), encoded=None):
+    text = f"{iso.value} {illuminance_units}"
+    return IsolineLevelResult(
+        value=iso.value,
+        color=iso.color,
+        paths=[v.tolist() for v in paths],
+        labels=[{"x": px, "y": py, "text": text} for px, py in points.tolist()],
+        encodedPaths=encoded
     )
-    
-    # Handle symmetry for interpolation inputs
-    # (This logic duplicates get_candela but vectorized)
-    max_h = interp_h_angles[-1]
-    
-    h_input = h_flat.copy()
-    
-    # If we manually expanded to 360, max_h is 360. We don't need further symmetry mapping 
-    # because the grid covers the full range (constant).
-    # But checking if original data implied symmetry
-    original_max_h = ies_data["horiz_angles"][-1]
-    
-    if len(ies_data["horiz_angles"]) > 1:
-        if np.isclose(original_max_h, 90):
-            # Quadrilateral
-            mask1 = (h_input > 90) & (h_input <= 180)
-            h_input[mask1] = 180 - h_input[mask1]
-            mask2 = (h_input > 180) & (h_input <= 270)
-            h_input[mask2] = h_input[mask2] - 180
-            mask3 = (h_input > 270)
-            h_input[mask3] = 360 - h_input[mask3]
-        elif np.isclose(original_max_h, 180):
-            # Bilateral
-            mask = h_input > 180
-            h_input[mask] = 360 - h_input[mask]
-        
-    pts = np.column_stack((h_input, v_flat))
-    cd_values = interp(pts)
-    cd_values = cd_values.reshape(xx.shape)
-    
-    d = d.reshape(xx.shape)
-    
-    # Calculate illuminance
-    # E = (I * cos(theta)) / d^2
-    # cos(theta) = dz / d
-    # E = (I * dz) / d^3
-    
-    illuminance = (cd_values * dz) / (d**3)
-    illuminance *= llf
-    
-    return xx, yy, illuminance
+
+def build_level_results(iso_levels, paths_per_level, units, illuminance_units, geometry=None, avoid_label_collisions=True):
+    tolerance, encoding, quantum = geometry or (0.0, "json", None)
+    simplified, positions = level_geometry(paths_per_level, units, tolerance, avoid_label_collisions)
+
+    levels = []
+    for iso, paths, points in zip(iso_levels, simplified, positions):
+        if encoding != "json":
+            levels.append(level_result(iso, points, illuminance_units, encoded=encode_paths(paths, encoding, quantum)))
+        else:
+            levels.append(level_result(iso, points, illuminance_units, paths))
+    return levels
+
+def level_paths(level):
+    """Vertex lists of an IsolineLevelResult, whichever way its paths were sent."""
+    if level.encodedPaths is not None:
+        return [v.tolist() for v in decode_paths(level.encodedPaths.dict())]
+    return level.paths
+
+def grid_cache_key(req, photometry_key):
+    return (
+        "grid", photometry_key, req.mountingHeight, req.calcPlaneHeight,
+        req.radiusFactor * req.mountingHeight, req.detailLevel, req.llf,
+        req.rotationX, req.rotationY, req.rotationZ, req.units, req.illuminanceUnits
+    )
+
+def contour_grid_result(result_id, x, y, illuminance, meta, iso_levels, options):
+    geometry = path_geometry(options, float(x[1] - x[0]) if len(x) > 1 else 1.0)
+    paths_per_level = contour_grid(x, y, illuminance, [iso.value for iso in iso_levels])
+    levels = build_level_results(
+        iso_levels, paths_per_level, meta["units"], meta["illuminanceUnits"], geometry, options.avoidLabelCollisions
+    )
+    return ComputeResponse(
+        **meta,
+        levels=levels,
+        evaluatedPoints=int(illuminance.size),
+        resultId=result_id
+    )
+
+def contour_cached_result(cached, iso_levels, options):
+    return contour_grid_result(cached.id, cached.x, cached.y, cached.values, cached.meta, iso_levels, options)
 
 # --- Endpoints ---
 
@@ -392,10 +557,22 @@ async def compute_isolines(
         req = ComputeRequest(**params_dict)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
-        
+
+    raw = await file.read()
+    radius = req.radiusFactor * req.mountingHeight
+    spacing = grid_spacing(req.detailLevel)
+
+    # Level or color edits reuse the cached grid without re-parsing the IES file
+    photometry_key = photometry_hash(raw)
+    cache_key = grid_cache_key(req, photometry_key)
+    if req.evaluationMode != "adaptive":
+        cached = grid_store.find_result(cache_key)
+        if cached is not None:
+            return await run_in_threadpool(contour_cached_result, cached, req.isoLevels, req)
+
     # Read and parse IES
     try:
-        content = (await file.read()).decode("utf-8", errors="ignore")
+        content = raw.decode("utf-8", errors="ignore")
         ies_data = parse_ies(content)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
@@ -405,252 +582,953 @@ async def compute_isolines(
         raise HTTPException(status_code=500, detail=f"Unexpected IES parsing error: {str(e)}")
         
     try:
-        # Compute Grid
-        radius = req.radiusFactor * req.mountingHeight
-        
-        # Check grid size to prevent OOM
-        if req.detailLevel == "low":
-            spacing = 2.0
-        elif req.detailLevel == "high":
-            spacing = 0.5
-        else: # medium
-            spacing = 1.0
-            
-        grid_dim = int((2 * radius) / spacing)
-        num_points = grid_dim * grid_dim
-        
-        if num_points > 5000000: # Limit to ~5 million points
-            raise HTTPException(status_code=400, detail=f"Grid too large ({num_points} points). Please reduce Radius or Detail Level.")
-            
-        xx, yy, illuminance = compute_grid(
-            ies_data, 
-            req.mountingHeight, 
-            req.calcPlaneHeight, 
-            radius, 
-            req.detailLevel, 
+        meta = {
+            "units": req.units,
+            "illuminanceUnits": req.illuminanceUnits,
+            "mountingHeight": req.mountingHeight,
+            "calcPlaneHeight": req.calcPlaneHeight,
+            "radius": radius,
+            "extents": {"minX": -radius, "maxX": radius, "minY": -radius, "maxY": radius},
+            "scaleBar": {"length": 50 if req.units == "ft" else 15, "label": "50'" if req.units == "ft" else "15m"},
+        }
+        unit_scale = illuminance_unit_scale(req.units, req.illuminanceUnits)
+
+        if req.evaluationMode == "adaptive":
+            # Quadtree refinement: only cells straddling an iso level are evaluated
+            # at full detail. Samples are capped by the memory budget, the run by the time budget.
+            interp = build_candela_interpolator(ies_data)
+
+            def evaluate(px, py):
+                values = illuminance_at_points(
+                    ies_data, px, py,
+                    req.mountingHeight, req.calcPlaneHeight, req.llf,
+                    req.rotationX, req.rotationY, req.rotationZ,
+                    interp=interp
+                )
+                return np.nan_to_num(values, nan=0.0) * unit_scale
+
+            coarse_spacing = (req.mountingHeight - req.calcPlaneHeight) * ADAPTIVE_COARSE_FRACTION
+            paths_per_level, evaluated_points = await run_in_threadpool(
+                adaptive_isolines,
+                evaluate, radius, spacing, coarse_spacing, [iso.value for iso in req.isoLevels],
+                max_points=int(GRID_MEMORY_BUDGET_MB * 1024 * 1024 / ADAPTIVE_BYTES_PER_POINT),
+                deadline=compute_deadline()
+            )
+
+            # Generate Isolines
+            geometry = path_geometry(req, spacing)
+            levels = await run_in_threadpool(
+                build_level_results,
+                req.isoLevels, paths_per_level, req.units, req.illuminanceUnits, geometry, req.avoidLabelCollisions
+            )
+            return ComputeResponse(**meta, levels=levels, evaluatedPoints=evaluated_points)
+
+        x, y = grid_axes(radius, spacing)
+        check_grid_budget(len(x), len(y))
+
+        illuminance = await run_in_threadpool(
+            compute_grid_tiled,
+            ies_data,
+            x, y,
+            req.mountingHeight,
+            req.calcPlaneHeight,
             req.llf,
             req.rotationX,
             req.rotationY,
-            req.rotationZ
+            req.rotationZ,
+            deadline=compute_deadline(),
+            table=candela_table(photometry_key, ies_data)
         )
-        
+
         # Sanitize NaNs
-        illuminance = np.nan_to_num(illuminance, nan=0.0)
-        
-        # Convert units if needed
-        grid_units = "fc" if req.units == "ft" else "lux"
-        
-        if grid_units == "fc" and req.illuminanceUnits == "lux":
-            illuminance *= 10.7639
-        elif grid_units == "lux" and req.illuminanceUnits == "fc":
-            illuminance /= 10.7639
-            
-        # Generate Isolines
-        levels = []
-        for iso in req.isoLevels:
-            # Use matplotlib to find contours
-            fig = plt.figure()
-            ax = fig.add_subplot(111)
-            cs = ax.contour(xx, yy, illuminance, levels=[iso.value])
-            
-            paths = []
-            labels = []
-            
-            # Use allsegs to get paths. cs.allsegs is a list of levels.
-            # We requested 1 level, so we take index 0.
-            if len(cs.allsegs) > 0:
-                for v in cs.allsegs[0]:
-                    # v is a numpy array of vertices (N, 2)
-                    if len(v) == 0:
-                        continue
-                        
-                    paths.append(v.tolist())
-                    
-                    # Generate sparse labels
-                    last_pt = v[0]
-                    accum_dist = 0
-                    label_interval = 40.0 if req.units == "ft" else 12.0
-                    
-                    for i in range(1, len(v)):
-                        pt = v[i]
-                        dist = np.linalg.norm(pt - last_pt)
-                        accum_dist += dist
-                        if accum_dist > label_interval:
-                            labels.append({
-                                "x": float(pt[0]), 
-                                "y": float(pt[1]), 
-                                "text": f"{iso.value} {req.illuminanceUnits}"
-                            })
-                            accum_dist = 0
-                        last_pt = pt
-                        
-            plt.close(fig)
-            
-            levels.append(IsolineLevelResult(
-                value=iso.value,
-                color=iso.color,
-                paths=paths,
-                labels=labels
+        np.nan_to_num(illuminance, copy=False, nan=0.0)
+        illuminance *= unit_scale
+
+        result_id = grid_store.add_result(cache_key, x, y, illuminance, meta)
+        return await run_in_threadpool(contour_grid_result, result_id, x, y, illuminance, meta, req.isoLevels, req)
+    except HTTPException:
+        raise
+    except ComputeBudgetExceeded as e:
+        hint = "" if req.evaluationMode == "adaptive" else ", or use adaptive evaluation"
+        raise HTTPException(status_code=400, detail=f"{e} Please reduce Radius or Detail Level{hint}.")
+    except Exception as e:
+        print(f"Computation Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Computation Error: {str(e)}")
+
+@router.post("/sweep", response_model=SweepResponse)
+async def compute_sweep(
+    file: UploadFile = File(...),
+    params: str = Body(...) # JSON string
+):
+    """
+    Metrics (and optionally contours) of one fixture over every combination of
+    mounting height, tilt and LLF, on one grid sized for the highest mounting.
+    """
+    import json
+    import traceback
+
+    try:
+        req = SweepRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+
+    combos = sweep_combinations(
+        req.mountingHeights or [req.mountingHeight],
+        req.rotationsX or [req.rotationX],
+        req.rotationsY or [req.rotationY],
+        req.rotationsZ or [req.rotationZ],
+    )
+    llfs = req.llfs or [req.llf]
+    if len(combos) * len(llfs) > MAX_SWEEP_COMBINATIONS:
+        raise HTTPException(status_code=400, detail=f"Sweep exceeds {MAX_SWEEP_COMBINATIONS} combinations.")
+    if any(llf <= 0 for llf in llfs):
+        raise HTTPException(status_code=400, detail="LLF values must be positive.")
+
+    raw = await file.read()
+    try:
+        ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+
+    # One grid for every combination so coverage areas are comparable
+    radius = req.radiusFactor * max(combo["mountingHeight"] for combo in combos)
+    spacing = grid_spacing(req.detailLevel)
+    x, y = grid_axes(radius, spacing)
+    check_grid_budget(len(x), len(y), bytes_per_point=4 * min(len(combos), os.cpu_count() or 1))
+
+    iso_values = [iso.value for iso in req.isoLevels]
+    try:
+        results = await run_in_threadpool(
+            run_sweep,
+            ies_data, x, y, req.calcPlaneHeight, combos, llfs, iso_values,
+            illuminance_unit_scale(req.units, req.illuminanceUnits),
+            compute_deadline(), req.includeContours,
+            table=candela_table(photometry_hash(raw), ies_data)
+        )
+
+        geometry = path_geometry(req, spacing)
+        combinations = []
+        for result in results:
+            levels = None
+            if result["paths"] is not None:
+                levels = await run_in_threadpool(
+                    build_level_results,
+                    req.isoLevels, result["paths"], req.units, req.illuminanceUnits,
+                    geometry, req.avoidLabelCollisions
+                )
+            combinations.append(SweepCombination(
+                mountingHeight=result["mountingHeight"],
+                rotationX=result["rotationX"],
+                rotationY=result["rotationY"],
+                rotationZ=result["rotationZ"],
+                llf=result["llf"],
+                statistics=CalcGridStatistics(**result["statistics"]),
+                coverage=[
+                    SweepLevelCoverage(value=value, area=area)
+                    for value, area in zip(iso_values, result["coverage"])
+                ],
+                levels=levels
             ))
-            
-        return ComputeResponse(
+
+        return SweepResponse(
             units=req.units,
             illuminanceUnits=req.illuminanceUnits,
-            mountingHeight=req.mountingHeight,
             calcPlaneHeight=req.calcPlaneHeight,
-            radius=radius,
             extents={"minX": -radius, "maxX": radius, "minY": -radius, "maxY": radius},
-            scaleBar={"length": 50 if req.units == "ft" else 15, "label": "50'" if req.units == "ft" else "15m"},
-            levels=levels
+            spacing=spacing,
+            nx=len(x),
+            ny=len(y),
+            combinations=combinations
         )
+    except HTTPException:
+        raise
+    except ComputeBudgetExceeded as e:
+        raise HTTPException(status_code=400, detail=f"{e} Please reduce the sweep, Radius or Detail Level.")
     except Exception as e:
-        print(f"Computation Error: {e}")
+        print(f"Sweep Error: {e}")
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Computation Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Sweep Error: {str(e)}")
 
-from fastapi import Form
+@router.post("/compute-planes", response_model=PlaneComputeResponse)
+async def compute_planes(
+    file: UploadFile = File(...),
+    params: str = Body(...) # JSON string
+):
+    """
+    Illuminance of one luminaire at (luminaireX, luminaireY, mountingHeight) on a
+    batch of arbitrary planes, e.g. the vertical faces of a building elevation or
+    a tilted sign face, with statistics and contours per plane.
+    """
+    import json
+    import traceback
 
-@router.post("/export-pdf")
-async def export_pdf(body: str = Form(...)):
+    try:
+        req = PlaneComputeRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+    if not req.planes:
+        raise HTTPException(status_code=400, detail="At least one plane is required.")
+
+    planes = []
+    for plane in req.planes:
+        spacing = plane.spacing or grid_spacing(req.detailLevel)
+        if len(plane.origin) != 3 or len(plane.uAxis) != 3 or len(plane.vAxis) != 3:
+            raise HTTPException(status_code=400, detail=f"Plane {plane.name}: origin and axes need three coordinates.")
+        if plane.width <= 0 or plane.height <= 0 or spacing <= 0:
+            raise HTTPException(status_code=400, detail=f"Plane {plane.name}: invalid extents or spacing.")
+        try:
+            normal = plane_basis(plane.origin, plane.uAxis, plane.vAxis)[3]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Plane {plane.name}: {e}")
+        planes.append({
+            "origin": plane.origin,
+            "uAxis": plane.uAxis,
+            "vAxis": plane.vAxis,
+            "s": np.arange(0.0, plane.width + spacing / 2, spacing),
+            "t": np.arange(0.0, plane.height + spacing / 2, spacing),
+            "spacing": spacing,
+            "normal": normal,
+        })
+    check_grid_budget(sum(len(p["s"]) * len(p["t"]) for p in planes), 1)
+
+    raw = await file.read()
+    try:
+        ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+
+    try:
+        values_per_plane = await run_in_threadpool(
+            compute_planes_tiled,
+            ies_data, planes,
+            (req.luminaireX, req.luminaireY, req.mountingHeight), req.llf,
+            req.rotationX, req.rotationY, req.rotationZ,
+            deadline=compute_deadline(),
+            table=candela_table(photometry_hash(raw), ies_data)
+        )
+
+        unit_scale = illuminance_unit_scale(req.units, req.illuminanceUnits)
+        results = []
+        for plane, spec, values in zip(planes, req.planes, values_per_plane):
+            np.nan_to_num(values, copy=False, nan=0.0)
+            values *= unit_scale
+            paths_per_level = await run_in_threadpool(
+                contour_grid, plane["s"], plane["t"], values, [iso.value for iso in req.isoLevels]
+            )
+            levels = await run_in_threadpool(
+                build_level_results,
+                req.isoLevels, paths_per_level, req.units, req.illuminanceUnits,
+                path_geometry(req, plane["spacing"]), req.avoidLabelCollisions
+            )
+            results.append(PlaneResult(
+                name=spec.name,
+                normal=plane["normal"].tolist(),
+                spacing=plane["spacing"],
+                ns=len(plane["s"]),
+                nt=len(plane["t"]),
+                summary=CalcGridStatistics(**grid_statistics(values)),
+                levels=levels,
+                values=values.tolist() if req.includeValues else None
+            ))
+        return PlaneComputeResponse(units=req.units, illuminanceUnits=req.illuminanceUnits, planes=results)
+    except HTTPException:
+        raise
+    except ComputeBudgetExceeded as e:
+        raise HTTPException(status_code=400, detail=f"{e} Please reduce the planes or Detail Level.")
+    except Exception as e:
+        print(f"Plane Computation Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Plane Computation Error: {str(e)}")
+
+@router.post("/photometry", response_model=PhotometryReport)
+async def photometry_report(file: UploadFile = File(...)):
+    """Zonal lumens, BUG rating and beam spreads of an IES file, memoized by content hash."""
     import traceback
+
+    raw = await file.read()
+    photometry_key = photometry_hash(raw)
+    report = report_cache.get(photometry_key)
+    if report is None:
+        try:
+            ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+        try:
+            report = await run_in_threadpool(photometric_report, ies_data)
+        except Exception as e:
+            print(f"Photometry Report Error: {e}")
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Photometry Report Error: {str(e)}")
+        report_cache.put(photometry_key, report)
+    return PhotometryReport(photometryId=photometry_key, **report)
+
+@router.post("/photometry/polar-plot")
+async def photometry_polar_plot(
+    file: UploadFile = File(...),
+    params: str = Body("{}") # JSON string
+):
+    """Polar candela plot of an IES file as PNG or SVG, cached by content hash."""
+    import json
+    import traceback
+
     try:
-        req = ExportPdfRequest.parse_raw(body)
-        buffer = BytesIO()
-        
-        # Create PDF
-        # Page size
-        page_w, page_h = 36*inch, 24*inch
-            
-        c = canvas.Canvas(buffer, pagesize=(page_w, page_h))
-        
-        # Setup coordinate system
-        # We want (0,0) of grid to be center of page
-        c.translate(page_w/2, page_h/2)
-        
-        # Scale: Map real units to points
-        # Let's say 1 inch = 10 ft (1:120 scale) or fit to page?
-        # "Fit to page" is safer for "visual reference".
-        
-        extents = req.isolineData.extents
-        data_w = extents["maxX"] - extents["minX"]
-        data_h = extents["maxY"] - extents["minY"]
-        
-        # Margin
-        margin = 2 * inch
-        avail_w = page_w - 2*margin
-        avail_h = page_h - 2*margin
-        
-        scale_x = avail_w / data_w
-        scale_y = avail_h / data_h
-        scale = min(scale_x, scale_y)
-        
-        c.scale(scale, scale)
-        
+        req = PolarPlotRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+    media_types = {"png": "image/png", "svg": "image/svg+xml"}
+    if req.format not in media_types:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {req.format}")
 
-        # Draw Grid if requested
-        if req.options.includeGrid and req.options.gridSpacing:
-            c.setStrokeColorRGB(0.5, 0.5, 0.5) # Darker gray (#808080)
-            c.setLineWidth(0.5 / scale) # Thin line
-            c.setDash([1 / scale, 2 / scale]) # Dotted
-            
-            spacing = req.options.gridSpacing
-            min_x, max_x = extents["minX"], extents["maxX"]
-            min_y, max_y = extents["minY"], extents["maxY"]
-            
-            # Vertical lines
-            start_x = (int(min_x / spacing)) * spacing
-            x = start_x
-            while x <= max_x:
-                if x >= min_x:
-                    c.line(x, min_y, x, max_y)
-                x += spacing
-                
-            # Horizontal lines
-            start_y = (int(min_y / spacing)) * spacing
-            y = start_y
-            while y <= max_y:
-                if y >= min_y:
-                    c.line(min_x, y, max_x, y)
-                y += spacing
-                
-            c.setDash([]) # Reset dash
+    raw = await file.read()
+    cache_key = hashlib.sha1(f"polar|{photometry_hash(raw)}|{req.json()}".encode("utf-8")).hexdigest()
+    content = export_cache.get(cache_key)
+    if content is None:
+        try:
+            ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+        try:
+            content = await run_in_threadpool(render_polar_plot, ies_data, req.format, req.title or "")
+        except Exception as e:
+            print(f"Polar Plot Error: {e}")
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Polar Plot Error: {str(e)}")
+        export_cache.put(cache_key, content)
+    return Response(content=content, media_type=media_types[req.format])
 
-        # Draw Isolines
-        c.setLineWidth(1.0/scale) # Constant width in points regardless of scale
-        
-        for level in req.isolineData.levels:
-            c.setStrokeColor(HexColor(level.color))
-            for path in level.paths:
-                if not path or len(path) < 2:
-                    continue
-                p = c.beginPath()
-                p.moveTo(path[0][0], path[0][1])
-                for pt in path[1:]:
-                    p.lineTo(pt[0], pt[1])
-                c.drawPath(p)
-                
-            # Labels
-            if req.options.includeLabels:
-                c.setFillColor(HexColor(level.color))
-                # Text size needs to be readable. e.g. 10pt
-                # Since we scaled the canvas, we need to unscale font size
-                font_size = 10.0 / scale
-                c.setFont("Helvetica", font_size)
-                
-                for label in level.labels:
-                    c.drawString(label.x, label.y, label.text)
-                    
-        # Draw Crosshair
-        c.setStrokeColor(HexColor("#000000"))
-        c.setLineWidth(1.0/scale)
-        ch_size = (5.0 if req.isolineData.units == "ft" else 1.5) # 5ft or 1.5m
-        c.line(-ch_size, 0, ch_size, 0)
-        c.line(0, -ch_size, 0, ch_size)
-        
-        # Draw MH Tag
-        mh_text = f"MH={req.isolineData.mountingHeight}{req.isolineData.units}"
-        c.setFont("Helvetica", 12.0/scale)
-        c.setFillColor(HexColor("#000000"))
-        c.drawString(ch_size * 1.2, -ch_size * 1.2, mh_text)
-        
-        # Draw Scale Bar (bottom left of data area)
-        sb_len = req.options.scaleBarLength
-        sb_x = extents["minX"] + (data_w * 0.05)
-        sb_y = extents["minY"] + (data_h * 0.05)
-        
-        c.setStrokeColor(HexColor("#000000"))
-        c.setLineWidth(2.0/scale)
-        c.line(sb_x, sb_y, sb_x + sb_len, sb_y)
+def prepare_terrain(req: TerrainRequest):
+    if (req.heightmap is None) == (req.tin is None):
+        raise ValueError("Provide either a heightmap or a TIN.")
+    if req.heightmap is not None:
+        elevations = [[np.nan if z is None else z for z in row] for row in req.heightmap.elevations]
+        return heightmap_surface(req.heightmap.originX, req.heightmap.originY, req.heightmap.spacing, elevations)
+    return tin_surface(req.tin.vertices, req.tin.triangles, req.tin.spacing)
+
+def terrain_response(terrain_id, surface):
+    z = surface.z[surface.valid]
+    return TerrainResponse(
+        terrainId=terrain_id,
+        extents={"minX": float(surface.x[0]), "maxX": float(surface.x[-1]), "minY": float(surface.y[0]), "maxY": float(surface.y[-1])},
+        spacing=surface.spacing,
+        nx=len(surface.x),
+        ny=len(surface.y),
+        minElevation=float(z.min()) if z.size else 0.0,
+        maxElevation=float(z.max()) if z.size else 0.0
+    )
+
+@router.post("/terrain", response_model=TerrainResponse)
+async def upload_terrain(req: TerrainRequest):
+    """
+    Prepares a heightmap or TIN calc surface (calc points, elevations and normals)
+    once; fixture studies on it reference the returned terrainId.
+    """
+    import traceback
+
+    terrain_id = hashlib.sha1(req.json().encode("utf-8")).hexdigest()
+    surface = terrain_store.get(terrain_id)
+    if surface is None:
+        if req.tin is not None and req.tin.spacing > 0:
+            vertices = np.asarray(req.tin.vertices, dtype=float).reshape(-1, 3) if req.tin.vertices else np.zeros((0, 3))
+            if len(vertices):
+                span = np.ptp(vertices[:, :2], axis=0) / req.tin.spacing + 1
+                check_grid_budget(int(span[0]), int(span[1]), bytes_per_point=20)
+        try:
+            surface = await run_in_threadpool(prepare_terrain, req)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid terrain: {e}")
+        except Exception as e:
+            print(f"Terrain Error: {e}")
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Terrain Error: {str(e)}")
+        terrain_store.put(terrain_id, surface)
+    return terrain_response(terrain_id, surface)
+
+@router.post("/compute-terrain", response_model=ComputeResponse)
+async def compute_terrain(
+    file: UploadFile = File(...),
+    params: str = Body(...) # JSON string
+):
+    """
+    Isolines (in plan) of one luminaire over a prepared terrain surface: every
+    calc point has its own elevation, distance and incidence on the ground slope.
+    """
+    import json
+    import traceback
+
+    try:
+        req = TerrainComputeRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+
+    surface = terrain_store.get(req.terrainId)
+    if surface is None:
+        raise HTTPException(status_code=404, detail="Terrain not found")
+
+    raw = await file.read()
+    photometry_key = photometry_hash(raw)
+    cache_key = ("terrain", req.terrainId, photometry_key, req.json(exclude=OUTPUT_FIELDS))
+    cached = grid_store.find_result(cache_key)
+    if cached is not None:
+        return await run_in_threadpool(contour_cached_result, cached, req.isoLevels, req)
+
+    try:
+        ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+
+    try:
+        ground = surface.elevation_at(req.luminaireX, req.luminaireY)
+        illuminance = await run_in_threadpool(
+            compute_surface_tiled,
+            ies_data,
+            surface.x, surface.y, surface.z + np.float32(req.calcHeight), surface.normals,
+            (req.luminaireX, req.luminaireY, ground + req.mountingHeight), req.llf,
+            req.rotationX, req.rotationY, req.rotationZ,
+            deadline=compute_deadline(),
+            table=candela_table(photometry_key, ies_data)
+        )
+
+        np.nan_to_num(illuminance, copy=False, nan=0.0)
+        illuminance[~surface.valid] = 0.0
+        illuminance *= illuminance_unit_scale(req.units, req.illuminanceUnits)
+
+        x, y = surface.x.astype(float), surface.y.astype(float)
+        meta = {
+            "units": req.units,
+            "illuminanceUnits": req.illuminanceUnits,
+            "mountingHeight": req.mountingHeight,
+            "calcPlaneHeight": req.calcHeight,
+            "radius": float(max(abs(x[0]), abs(x[-1]), abs(y[0]), abs(y[-1]))),
+            "extents": {"minX": float(x[0]), "maxX": float(x[-1]), "minY": float(y[0]), "maxY": float(y[-1])},
+            "scaleBar": {"length": 50 if req.units == "ft" else 15, "label": "50'" if req.units == "ft" else "15m"},
+        }
+        result_id = grid_store.add_result(cache_key, x, y, illuminance, meta)
+        return await run_in_threadpool(contour_grid_result, result_id, x, y, illuminance, meta, req.isoLevels, req)
+    except HTTPException:
+        raise
+    except ComputeBudgetExceeded as e:
+        raise HTTPException(status_code=400, detail=f"{e} Please use a coarser terrain spacing.")
+    except Exception as e:
+        print(f"Terrain Computation Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Terrain Computation Error: {str(e)}")
+
+@router.post("/recontour", response_model=ComputeResponse)
+async def recontour(req: RecontourRequest):
+    """Contours a cached grid for new iso levels; no upload or grid evaluation."""
+    cached = grid_store.get_result(req.resultId)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return await run_in_threadpool(contour_cached_result, cached, req.isoLevels, req)
+
+@router.post("/compute-layout", response_model=ComputeResponse)
+async def compute_layout(
+    files: List[UploadFile] = File(...),
+    params: str = Body(...) # JSON string
+):
+    """Isolines of a multi-luminaire site layout; luminaires reference IES files by filename."""
+    import json
+    import traceback
+
+    try:
+        req = LayoutComputeRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+
+    uploads = {f.filename: await f.read() for f in files}
+    cache_key = (
+        "layout",
+        tuple(sorted((name, photometry_hash(raw)) for name, raw in uploads.items())),
+        req.json(exclude=OUTPUT_FIELDS)
+    )
+    cached = grid_store.find_result(cache_key)
+    if cached is not None:
+        return await run_in_threadpool(contour_cached_result, cached, req.isoLevels, req)
+
+    photometry = {}
+    for name, raw in uploads.items():
+        try:
+            photometry[name] = parse_ies(raw.decode("utf-8", errors="ignore"))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"IES Parsing Error ({name}): {str(e)}")
+
+    missing = {lum.photometryId for lum in req.luminaires} - set(photometry)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown photometryId: {', '.join(sorted(missing))}")
+
+    grid = req.grid
+    if grid.spacing <= 0 or grid.maxX <= grid.minX or grid.maxY <= grid.minY:
+        raise HTTPException(status_code=400, detail="Invalid calc grid extents or spacing.")
+
+    x = np.arange(grid.minX, grid.maxX + grid.spacing, grid.spacing)
+    y = np.arange(grid.minY, grid.maxY + grid.spacing, grid.spacing)
+    luminaires = [lum.dict() for lum in req.luminaires]
+    # Pool batches each return the window of the grid their luminaires reach
+    needed_mb = layout_memory_bytes(luminaires, x, y) / (1024 * 1024)
+    if needed_mb > GRID_MEMORY_BUDGET_MB:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Layout too large ({x.size * y.size} points, ~{needed_mb:.0f} MB with its partial grids). Please set luminaire cutoff distances, coarsen the grid spacing or reduce the grid extents."
+        )
+
+    try:
+        illuminance = await run_in_threadpool(
+            layout_illuminance,
+            photometry,
+            luminaires,
+            x, y, grid.calcPlaneHeight
+        )
+        illuminance *= illuminance_unit_scale(req.units, req.illuminanceUnits)
+        illuminance = illuminance.astype(np.float32)
+
+        meta = {
+            "units": req.units,
+            "illuminanceUnits": req.illuminanceUnits,
+            "mountingHeight": max((lum.mountingHeight for lum in req.luminaires), default=0.0),
+            "calcPlaneHeight": grid.calcPlaneHeight,
+            "radius": max(abs(grid.minX), abs(grid.maxX), abs(grid.minY), abs(grid.maxY)),
+            "extents": {"minX": grid.minX, "maxX": grid.maxX, "minY": grid.minY, "maxY": grid.maxY},
+            "scaleBar": {"length": 50 if req.units == "ft" else 15, "label": "50'" if req.units == "ft" else "15m"},
+        }
+        result_id = grid_store.add_result(cache_key, x, y, illuminance, meta)
+        return await run_in_threadpool(contour_grid_result, result_id, x, y, illuminance, meta, req.isoLevels, req)
+    except Exception as e:
+        print(f"Layout Computation Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Layout Computation Error: {str(e)}")
+
+@router.post("/compute-array", response_model=ComputeResponse)
+async def compute_array(
+    file: UploadFile = File(...),
+    params: str = Body(...) # JSON string
+):
+    """Isolines of a regular pole array of identical, identically aimed luminaires."""
+    import json
+    import traceback
+
+    try:
+        req = ArrayComputeRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+
+    raw = await file.read()
+    photometry_key = photometry_hash(raw)
+    cache_key = ("array", photometry_key, req.json(exclude=OUTPUT_FIELDS))
+    cached = grid_store.find_result(cache_key)
+    if cached is not None:
+        return await run_in_threadpool(contour_cached_result, cached, req.isoLevels, req)
+
+    try:
+        ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+
+    grid = req.grid
+    pole_array = req.array
+    if grid.spacing <= 0 or grid.maxX <= grid.minX or grid.maxY <= grid.minY:
+        raise HTTPException(status_code=400, detail="Invalid calc grid extents or spacing.")
+    if pole_array.countX < 1 or pole_array.countY < 1:
+        raise HTTPException(status_code=400, detail="Pole array must have at least one pole.")
+
+    x = np.arange(grid.minX, grid.maxX + grid.spacing, grid.spacing)
+    y = np.arange(grid.minY, grid.maxY + grid.spacing, grid.spacing)
+    pole_x, pole_y = np.meshgrid(
+        pole_array.originX + np.arange(pole_array.countX) * pole_array.spacingX,
+        pole_array.originY + np.arange(pole_array.countY) * pole_array.spacingY
+    )
+
+    # Kernels span the whole grid unless truncated, one per sub-grid pole offset
+    needed_mb = array_memory_bytes(pole_x, pole_y, x, y, req.kernelRadius, req.method) / (1024 * 1024)
+    if needed_mb > GRID_MEMORY_BUDGET_MB:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Array too large ({x.size * y.size} points, ~{needed_mb:.0f} MB with its kernels). Please set a Kernel Radius, coarsen the grid spacing or reduce the grid extents."
+        )
+
+    try:
+        illuminance = await run_in_threadpool(
+            array_illuminance,
+            ies_data,
+            photometry_key,
+            pole_x.ravel(), pole_y.ravel(),
+            x, y,
+            req.mountingHeight, grid.calcPlaneHeight, req.llf,
+            req.rotationX, req.rotationY, req.rotationZ,
+            req.kernelRadius,
+            req.method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        illuminance *= illuminance_unit_scale(req.units, req.illuminanceUnits)
+        illuminance = illuminance.astype(np.float32)
+
+        meta = {
+            "units": req.units,
+            "illuminanceUnits": req.illuminanceUnits,
+            "mountingHeight": req.mountingHeight,
+            "calcPlaneHeight": grid.calcPlaneHeight,
+            "radius": max(abs(grid.minX), abs(grid.maxX), abs(grid.minY), abs(grid.maxY)),
+            "extents": {"minX": grid.minX, "maxX": grid.maxX, "minY": grid.minY, "maxY": grid.maxY},
+            "scaleBar": {"length": 50 if req.units == "ft" else 15, "label": "50'" if req.units == "ft" else "15m"},
+        }
+        result_id = grid_store.add_result(cache_key, x, y, illuminance, meta)
+        return await run_in_threadpool(contour_grid_result, result_id, x, y, illuminance, meta, req.isoLevels, req)
+    except Exception as e:
+        print(f"Array Computation Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Array Computation Error: {str(e)}")
+
+@router.post("/calc-grid")
+async def compute_calc_grid(
+    file: UploadFile = File(...),
+    params: str = Body(...) # JSON string
+):
+    """
+    Point-by-point illuminance for compliance: summary and per-area statistics as
+    JSON ("stats"), or the full grid streamed as float32 binary or CSV with the
+    summary statistics (no areas) in the X-Calc-Statistics header.
+    """
+    import json
+    import traceback
+
+    try:
+        req = CalcGridRequest(**json.loads(params))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}")
+    if req.outputFormat not in ("stats", "binary", "csv"):
+        raise HTTPException(status_code=400, detail=f"Unknown outputFormat: {req.outputFormat}")
+
+    raw = await file.read()
+    radius = req.radiusFactor * req.mountingHeight
+    spacing = grid_spacing(req.detailLevel)
+
+    # Shares cached grids with /isoline/compute
+    photometry_key = photometry_hash(raw)
+    cache_key = grid_cache_key(req, photometry_key)
+    cached = grid_store.find_result(cache_key)
+    if cached is not None:
+        result_id, x, y, illuminance = cached.id, cached.x, cached.y, cached.values
+    else:
+        try:
+            ies_data = parse_ies(raw.decode("utf-8", errors="ignore"))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"IES Parsing Error: {str(e)}")
+
+        x, y = grid_axes(radius, spacing)
+        check_grid_budget(len(x), len(y))
+
+        try:
+            illuminance = await run_in_threadpool(
+                compute_grid_tiled,
+                ies_data,
+                x, y,
+                req.mountingHeight,
+                req.calcPlaneHeight,
+                req.llf,
+                req.rotationX,
+                req.rotationY,
+                req.rotationZ,
+                deadline=compute_deadline(),
+                table=candela_table(photometry_key, ies_data)
+            )
+        except ComputeBudgetExceeded as e:
+            raise HTTPException(status_code=400, detail=f"{e} Please reduce Radius or Detail Level.")
+
+        np.nan_to_num(illuminance, copy=False, nan=0.0)
+        illuminance *= illuminance_unit_scale(req.units, req.illuminanceUnits)
+        result_id = grid_store.add_result(cache_key, x, y, illuminance, {
+            "units": req.units,
+            "illuminanceUnits": req.illuminanceUnits,
+            "mountingHeight": req.mountingHeight,
+            "calcPlaneHeight": req.calcPlaneHeight,
+            "radius": radius,
+            "extents": {"minX": -radius, "maxX": radius, "minY": -radius, "maxY": radius},
+            "scaleBar": {"length": 50 if req.units == "ft" else 15, "label": "50'" if req.units == "ft" else "15m"},
+        })
+
+    try:
+        areas = calc_area_statistics(x, y, illuminance, [area.dict() for area in req.calcAreas])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = CalcGridResponse(
+            units=req.units,
+            illuminanceUnits=req.illuminanceUnits,
+            extents={"minX": float(x[0]), "maxX": float(x[-1]), "minY": float(y[0]), "maxY": float(y[-1])},
+            spacing=spacing,
+            nx=len(x),
+            ny=len(y),
+            resultId=result_id,
+            summary=CalcGridStatistics(**grid_statistics(illuminance)),
+            areas=[CalcGridStatistics(**stats) for stats in areas]
+        )
+    except Exception as e:
+        print(f"Calc Grid Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Calc Grid Error: {str(e)}")
+
+    if req.outputFormat == "stats":
+        return result
+
+    if req.outputFormat == "binary":
+        body = iter_grid_binary(x, y, illuminance, req.illuminanceUnits)
+        media_type = "application/octet-stream"
+        download_name = "calc_grid.bin"
+    else:
+        body = iter_grid_csv(x, y, illuminance, req.illuminanceUnits)
+        media_type = "text/csv"
+        download_name = "calc_grid.csv"
+
+    # Only the summary goes in the header (area names are user text and the area
+    # list is unbounded); ASCII-escaped JSON keeps the header value latin-1 safe.
+    # Per-area statistics: request outputFormat "stats", served from the cached grid.
+    header_stats = result.dict(exclude={"areas"})
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename={download_name}",
+        "X-Calc-Statistics": json.dumps(header_stats, ensure_ascii=True)
+    })
+
+from fastapi import Form
+
+# --- Export ---
+
+EXPORT_CHUNK_BYTES = 1 << 16
+
+def export_cache_key(kind, req):
+    """Hash of everything that determines an export file except its download name."""
+    payload = req.json(include={"resultId", "isoLevels", "simplifyTolerance", "avoidLabelCollisions"})
+    options = req.options.json(exclude={"fileName", "format"})
+    return hashlib.sha1(f"{kind}|{payload}|{options}".encode("utf-8")).hexdigest()
+
+def export_data(req):
+    """ComputeResponse to draw: re-contoured from the cached grid, or the one posted."""
+    if req.resultId:
+        cached = grid_store.get_result(req.resultId)
+        if cached is not None:
+            return contour_cached_result(cached, req.isoLevels, req.copy(update={"pathEncoding": "json"}))
+        if req.isolineData is None:
+            raise HTTPException(status_code=404, detail="Result not found")
+    if req.isolineData is None:
+        raise HTTPException(status_code=400, detail="Either isolineData or resultId is required")
+    return req.isolineData
+
+def vector_export_data(req):
+    """
+    (data, paths per level in data.levels order) for the streamed SVG/DXF
+    exports. For a cached grid the levels carry labels only and the paths are
+    the contoured numpy arrays, so no nested coordinate lists are built for the
+    whole result; posted results are decoded level by level as they're written.
+    """
+    cached = grid_store.get_result(req.resultId) if req.resultId else None
+    if cached is None:
+        data = export_data(req)
+        return data, map(level_paths, data.levels)
+    x = cached.x
+    tolerance, _, _ = path_geometry(req.copy(update={"pathEncoding": "json"}), float(x[1] - x[0]) if len(x) > 1 else 1.0)
+    paths_per_level = contour_grid(x, cached.y, cached.values, [iso.value for iso in req.isoLevels])
+    simplified, positions = level_geometry(paths_per_level, cached.meta["units"], tolerance, req.avoidLabelCollisions)
+    levels = [
+        level_result(iso, points, cached.meta["illuminanceUnits"])
+        for iso, points in zip(req.isoLevels, positions)
+    ]
+    data = ComputeResponse(**cached.meta, levels=levels, evaluatedPoints=int(cached.values.size), resultId=cached.id)
+    return data, simplified
+
+def download_response(content, extension, file_name):
+    download_name = download_name_for(extension, file_name)
+
+    def chunks():
+        for start in range(0, len(content), EXPORT_CHUNK_BYTES):
+            yield content[start:start + EXPORT_CHUNK_BYTES]
+
+    return StreamingResponse(chunks(), media_type="application/octet-stream", headers={
+        "Content-Disposition": f"attachment; filename={download_name}",
+        "Content-Length": str(len(content))
+    })
+
+def download_name_for(extension, file_name):
+    if file_name:
+        # Sanitize filename: allow alphanumeric, spaces, dashes, underscores, dots
+        safe_name = re.sub(r'[^\w\s\-\.]', '', file_name).strip()
+        if safe_name:
+            return f"{safe_name}.{extension}"
+    return f"isolines.{extension}"
+
+async def export_file(kind, req, render):
+    # Only id-based exports are cached; posted geometry has no stable identity
+    cache_key = export_cache_key(kind, req) if req.resultId else None
+    content = export_cache.get(cache_key) if cache_key else None
+    if content is None:
+        data = await run_in_threadpool(export_data, req)
+        content = await run_in_threadpool(render, data, req.options)
+        if cache_key:
+            export_cache.put(cache_key, content)
+    return download_response(content, kind, req.options.fileName)
+
+def render_pdf(data: ComputeResponse, options: ExportOptions) -> bytes:
+    buffer = BytesIO()
+    
+    # Create PDF
+    # Page size
+    page_w, page_h = 36*inch, 24*inch
         
-        # Scale Bar Label
-        font_size = 12.0 / scale
-        c.setFont("Helvetica", font_size)
-        c.setFillColor(HexColor("#000000"))
-        c.drawString(sb_x, sb_y + (2.0/scale), f"{sb_len} {req.isolineData.units}")
+    c = canvas.Canvas(buffer, pagesize=(page_w, page_h))
+    
+    # Setup coordinate system
+    # We want (0,0) of grid to be center of page
+    c.translate(page_w/2, page_h/2)
+    
+    # Scale: Map real units to points
+    # Let's say 1 inch = 10 ft (1:120 scale) or fit to page?
+    # "Fit to page" is safer for "visual reference".
+    
+    extents = data.extents
+    data_w = extents["maxX"] - extents["minX"]
+    data_h = extents["maxY"] - extents["minY"]
+    
+    # Margin
+    margin = 2 * inch
+    avail_w = page_w - 2*margin
+    avail_h = page_h - 2*margin
+    
+    scale_x = avail_w / data_w
+    scale_y = avail_h / data_h
+    scale = min(scale_x, scale_y)
+    
+    c.scale(scale, scale)
+    
+
+    # Draw Grid if requested
+    if options.includeGrid and options.gridSpacing:
+        c.setStrokeColorRGB(0.5, 0.5, 0.5) # Darker gray (#808080)
+        c.setLineWidth(0.5 / scale) # Thin line
+        c.setDash([1 / scale, 2 / scale]) # Dotted
         
-        # Disclaimer
-        if req.options.includeDisclaimer:
-            disclaimer = "For preliminary layout and visual reference only."
-            c.drawString(extents["minX"], extents["minY"] - (data_h * 0.05), disclaimer)
+        # All grid lines in one path object
+        c.addLiteral(pdf_grid_operators(extents, options.gridSpacing))
             
-        c.showPage()
-        c.save()
-        
-        buffer.seek(0)
+        c.setDash([]) # Reset dash
 
-        buffer.seek(0)
-        from fastapi.responses import StreamingResponse
-        
-        # Determine filename
-        download_name = "isolines.pdf"
-        if req.options.fileName:
-            # Sanitize filename: allow alphanumeric, spaces, dashes, underscores, dots
-            safe_name = re.sub(r'[^\w\s\-\.]', '', req.options.fileName).strip()
-            if safe_name:
-                download_name = f"{safe_name}.pdf"
+    # Draw Isolines
+    c.setLineWidth(1.0/scale) # Constant width in points regardless of scale
+    
+    # Anything finer than the plot tolerance is invisible on the sheet
+    tolerance = PDF_PLOT_TOLERANCE_PT / scale if options.simplifyForPlot else 0.0
+    for level in data.levels:
+        c.setStrokeColor(HexColor(level.color))
+        # One path object per level, emitted straight into the content stream
+        c.addLiteral(pdf_polyline_operators(level_paths(level), tolerance))
+            
+        # Labels
+        if options.includeLabels:
+            c.setFillColor(HexColor(level.color))
+            # Text size needs to be readable. e.g. 10pt
+            # Since we scaled the canvas, we need to unscale font size
+            font_size = 10.0 / scale
+            c.setFont("Helvetica", font_size)
+            
+            for label in level.labels:
+                c.drawString(label.x, label.y, label.text)
                 
-        return StreamingResponse(buffer, media_type="application/octet-stream", headers={"Content-Disposition": f"attachment; filename={download_name}"})
+    # Draw Crosshair
+    c.setStrokeColor(HexColor("#000000"))
+    c.setLineWidth(1.0/scale)
+    ch_size = (5.0 if data.units == "ft" else 1.5) # 5ft or 1.5m
+    c.line(-ch_size, 0, ch_size, 0)
+    c.line(0, -ch_size, 0, ch_size)
+    
+    # Draw MH Tag
+    mh_text = f"MH={data.mountingHeight}{data.units}"
+    c.setFont("Helvetica", 12.0/scale)
+    c.setFillColor(HexColor("#000000"))
+    c.drawString(ch_size * 1.2, -ch_size * 1.2, mh_text)
+    
+    # Draw Scale Bar (bottom left of data area)
+    sb_len = options.scaleBarLength
+    sb_x = extents["minX"] + (data_w * 0.05)
+    sb_y = extents["minY"] + (data_h * 0.05)
+    
+    c.setStrokeColor(HexColor("#000000"))
+    c.setLineWidth(2.0/scale)
+    c.line(sb_x, sb_y, sb_x + sb_len, sb_y)
+    
+    # Scale Bar Label
+    font_size = 12.0 / scale
+    c.setFont("Helvetica", font_size)
+    c.setFillColor(HexColor("#000000"))
+    c.drawString(sb_x, sb_y + (2.0/scale), f"{sb_len} {data.units}")
+    
+    # Disclaimer
+    if options.includeDisclaimer:
+        disclaimer = "For preliminary layout and visual reference only."
+        c.drawString(extents["minX"], extents["minY"] - (data_h * 0.05), disclaimer)
         
+    c.showPage()
+    c.save()
+    
+    return buffer.getvalue()
+
+def grid_line_positions(lo, hi, spacing):
+    start = (int(lo / spacing)) * spacing
+    positions = []
+    value = start
+    while value <= hi:
+        if value >= lo:
+            positions.append(value)
+        value += spacing
+    return positions
+
+def render_png(data: ComputeResponse, options: ExportOptions) -> bytes:
+    # Direct anti-aliased raster: one polyline call per level, labels from a glyph atlas
+    extents = data.extents
+    raster = IsolineRaster(extents)
+
+    # Draw Grid if requested
+    if options.includeGrid and options.gridSpacing:
+        raster.dotted_grid(
+            grid_line_positions(extents["minX"], extents["maxX"], options.gridSpacing),
+            grid_line_positions(extents["minY"], extents["maxY"], options.gridSpacing),
+            "#808080", 0.5
+        )
+
+    for level in data.levels:
+        raster.polylines(level_paths(level), level.color, 1.5)
+        if options.includeLabels:
+            for label in level.labels:
+                raster.text(label.x, label.y, label.text, level.color, 8)
+
+    # Crosshair
+    raster.line(-5, 0, 5, 0, "black", 1)
+    raster.line(0, -5, 0, 5, "black", 1)
+
+    # MH Tag
+    raster.text(6, -6, f"MH={data.mountingHeight}{data.units}", "black", 10)
+
+    # Scale Bar
+    sb_len = options.scaleBarLength
+    sb_x = extents["minX"] + (extents["maxX"] - extents["minX"]) * 0.1
+    sb_y = extents["minY"] + (extents["maxY"] - extents["minY"]) * 0.05
+    raster.line(sb_x, sb_y, sb_x + sb_len, sb_y, "black", 2)
+    raster.text(sb_x, sb_y + 1, f"{sb_len} {data.units}", "black", 10)
+
+    # Disclaimer
+    if options.includeDisclaimer:
+        raster.text(extents["minX"], extents["minY"], "For preliminary layout only", "black", 8)
+
+    return raster.encode_png()
+
+@router.post("/export-pdf")
+async def export_pdf(body: str = Form(...)):
+    import traceback
+    try:
+        req = ExportPdfRequest.parse_raw(body)
+        return await export_file("pdf", req, render_pdf)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"PDF Export Error: {e}")
         traceback.print_exc()
@@ -661,105 +1539,46 @@ async def export_png(body: str = Form(...)):
     import traceback
     try:
         req = ExportPngRequest.parse_raw(body)
-        # Use matplotlib to render to PNG
-        # We can reuse the logic from compute but this time we plot properly
-        
-        fig, ax = plt.subplots(figsize=(10, 10)) # Arbitrary size, we will set DPI
-        
-        extents = req.isolineData.extents
-        
-        # We don't have the grid data here, only paths.
-        # So we just plot paths.
-        
-        # Draw Grid if requested
-        if req.options.includeGrid and req.options.gridSpacing:
-            spacing = req.options.gridSpacing
-            
-            # Vertical lines
-            start_x = (int(extents["minX"] / spacing)) * spacing
-            x_lines = []
-            x = start_x
-            while x <= extents["maxX"]:
-                if x >= extents["minX"]:
-                    x_lines.append(x)
-                x += spacing
-                
-
-            if x_lines:
-                ax.vlines(x_lines, extents["minY"], extents["maxY"], colors='#808080', linestyles=':', linewidth=0.5)
-                
-            # Horizontal lines
-            start_y = (int(extents["minY"] / spacing)) * spacing
-            y_lines = []
-            y = start_y
-            while y <= extents["maxY"]:
-                if y >= extents["minY"]:
-                    y_lines.append(y)
-                y += spacing
-                
-
-            if y_lines:
-                ax.hlines(y_lines, extents["minX"], extents["maxX"], colors='#808080', linestyles=':', linewidth=0.5)
-
-        for level in req.isolineData.levels:
-            color = level.color
-            for path in level.paths:
-                if not path or len(path) < 2:
-                    continue
-                pts = np.array(path)
-                ax.plot(pts[:, 0], pts[:, 1], color=color, linewidth=1.5)
-                
-            if req.options.includeLabels:
-                for label in level.labels:
-                    ax.text(label.x, label.y, label.text, color=color, fontsize=8)
-                    
-        # Set limits
-        ax.set_xlim(extents["minX"], extents["maxX"])
-        ax.set_ylim(extents["minY"], extents["maxY"])
-        ax.set_aspect('equal')
-        ax.axis('off') # Turn off axis
-        
-        # Crosshair
-        ax.plot([-5, 5], [0, 0], 'k-', linewidth=1)
-        ax.plot([0, 0], [-5, 5], 'k-', linewidth=1)
-        
-        # MH Tag
-        mh_text = f"MH={req.isolineData.mountingHeight}{req.isolineData.units}"
-        ax.text(6, -6, mh_text, color='black', fontsize=10)
-        
-        # Scale Bar
-        sb_len = req.options.scaleBarLength
-        sb_x = extents["minX"] + (extents["maxX"] - extents["minX"]) * 0.1
-        sb_y = extents["minY"] + (extents["maxY"] - extents["minY"]) * 0.05
-        ax.plot([sb_x, sb_x + sb_len], [sb_y, sb_y], 'k-', linewidth=2)
-        ax.text(sb_x, sb_y + 1, f"{sb_len} {req.isolineData.units}", color='black')
-        
-        # Disclaimer
-        if req.options.includeDisclaimer:
-            ax.text(extents["minX"], extents["minY"], "For preliminary layout only", fontsize=8)
-        
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', transparent=True, dpi=300, bbox_inches='tight', pad_inches=0)
-        plt.close(fig)
-        
-        buffer.seek(0)
-
-        buffer.seek(0)
-        from fastapi.responses import StreamingResponse
-        
-        # Determine filename
-        download_name = "isolines.png"
-        if req.options.fileName:
-            # Sanitize filename
-            safe_name = re.sub(r'[^\w\s\-\.]', '', req.options.fileName).strip()
-            if safe_name:
-                download_name = f"{safe_name}.png"
-                
-        return StreamingResponse(buffer, media_type="application/octet-stream", headers={"Content-Disposition": f"attachment; filename={download_name}"})
-        
+        return await export_file("png", req, render_png)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"PNG Export Error: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"PNG Export Error: {str(e)}")
 
+@router.post("/export-svg")
+async def export_svg(body: str = Form(...)):
+    """Layered SVG, streamed level by level."""
+    import traceback
+    try:
+        req = ExportPdfRequest.parse_raw(body)
+        data, paths = await run_in_threadpool(vector_export_data, req)
+        return StreamingResponse(
+            iter_svg(data, req.options, paths), media_type="image/svg+xml",
+            headers={"Content-Disposition": f"attachment; filename={download_name_for('svg', req.options.fileName)}"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"SVG Export Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"SVG Export Error: {str(e)}")
 
+@router.post("/export-dxf")
+async def export_dxf(body: str = Form(...)):
+    """DXF (R12) with one layer per iso level, streamed level by level."""
+    import traceback
+    try:
+        req = ExportPdfRequest.parse_raw(body)
+        data, paths = await run_in_threadpool(vector_export_data, req)
+        return StreamingResponse(
+            iter_dxf(data, req.options, paths), media_type="application/dxf",
+            headers={"Content-Disposition": f"attachment; filename={download_name_for('dxf', req.options.fileName)}"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"DXF Export Error: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"DXF Export Error: {str(e)}")
@@ -0,0 +1,375 @@
+import math
+import os
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+from .illuminance import build_candela_interpolator, illuminance_at_points
+from .process_pool import get_pool
+
+
+# Points evaluated per kernel call; bounds the scratch memory of each worker.
+CHUNK_POINTS = 262144
+# Below this many luminaire-point evaluations a process pool costs more than it saves.
+MIN_PARALLEL_EVALUATIONS = 2000000
+
+# Pole positions closer than this fraction of the grid spacing share a kernel.
+OFFSET_TOLERANCE = 1e-3
+# Array modes need one kernel per distinct sub-grid pole offset; cap the variety.
+MAX_KERNEL_OFFSETS = 16
+# Evaluating one kernel (untiled) holds about this many float64 arrays of its size.
+KERNEL_SCRATCH_ARRAYS = 20
+# An FFT convolution holds about this many float64 arrays of the padded grid size
+# (the pole impulse image, both real transforms and the full result).
+FFT_WORKSPACE_ARRAYS = 5
+
+
+def _window(axis: np.ndarray, center: float, cutoff: Optional[float]) -> slice:
+    """Index range of a sorted axis within `cutoff` of `center` (whole axis if no cutoff)."""
+    if cutoff is None:
+        return slice(0, len(axis))
+    lo = np.searchsorted(axis, center - cutoff, side="left")
+    hi = np.searchsorted(axis, center + cutoff, side="right")
+    return slice(lo, hi)
+
+
+def _accumulate_luminaires(
+    photometry: Dict[str, Dict],
+    luminaires: List[Dict],
+    x: np.ndarray,
+    y: np.ndarray,
+    calc_plane: float,
+) -> np.ndarray:
+    """Sum of the horizontal illuminance of `luminaires` over the grid x (nx,) by y (ny,)."""
+    total = np.zeros((len(y), len(x)))
+    interps = {}
+
+    for lum in luminaires:
+        pid = lum["photometryId"]
+        if pid not in interps:
+            interps[pid] = build_candela_interpolator(photometry[pid])
+
+        cutoff = lum.get("cutoffDistance")
+        cols = _window(x, lum["x"], cutoff)
+        rows = _window(y, lum["y"], cutoff)
+        wx = x[cols] - lum["x"]
+        wy = y[rows] - lum["y"]
+        if len(wx) == 0 or len(wy) == 0:
+            continue
+
+        rows_per_chunk = max(1, CHUNK_POINTS // len(wx))
+        for r0 in range(0, len(wy), rows_per_chunk):
+            cy = wy[r0:r0 + rows_per_chunk]
+            px, py = np.meshgrid(wx, cy)
+            values = illuminance_at_points(
+                photometry[pid], px, py,
+                lum["mountingHeight"], calc_plane, lum.get("llf", 1.0),
+                lum.get("rotationX", 0.0), lum.get("rotationY", 0.0), lum.get("rotationZ", 0.0),
+                interp=interps[pid]
+            ).reshape(px.shape)
+            values = np.nan_to_num(values, nan=0.0)
+            if cutoff is not None:
+                values[px**2 + py**2 > cutoff**2] = 0.0
+
+            row_start = rows.start + r0
+            total[row_start:row_start + len(cy), cols] += values
+
+    return total
+
+
+def _layout_batches(luminaires: List[Dict], x: np.ndarray, y: np.ndarray, max_workers: Optional[int]):
+    """
+    Batches of luminaires for the process pool as (batch, rows, cols) with the
+    grid window the batch reaches, or None when the layout is evaluated in-process.
+    Batches are strips of luminaires sorted by x, so with cutoffs each window
+    stays a fraction of the grid.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(luminaires) <= 1 or len(luminaires) * x.size * y.size < MIN_PARALLEL_EVALUATIONS:
+        return None
+
+    # A couple of batches per worker keeps the pool busy when cutoffs make work uneven
+    n_batches = min(len(luminaires), workers * 2)
+    ordered = sorted(luminaires, key=lambda lum: (lum["x"], lum["y"]))
+    bounds = np.linspace(0, len(ordered), n_batches + 1).astype(int)
+    batches = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        batch = ordered[start:stop]
+        cols = [_window(x, lum["x"], lum.get("cutoffDistance")) for lum in batch]
+        rows = [_window(y, lum["y"], lum.get("cutoffDistance")) for lum in batch]
+        batches.append((
+            batch,
+            slice(min(r.start for r in rows), max(r.stop for r in rows)),
+            slice(min(c.start for c in cols), max(c.stop for c in cols)),
+        ))
+    return batches
+
+
+def _accumulate_window(photometry, luminaires, x, y, calc_plane, rows: slice, cols: slice):
+    return rows, cols, _accumulate_luminaires(photometry, luminaires, x[cols], y[rows], calc_plane)
+
+
+def layout_memory_bytes(luminaires: List[Dict], x, y, max_workers: Optional[int] = None) -> int:
+    """
+    Peak bytes of layout_illuminance: the float64 field plus, when it runs in the
+    pool, every batch's windowed partial (pickled and unpickled, and results can
+    all arrive before they are added), plus one chunk of evaluation scratch.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    needed = x.size * y.size * 8 + CHUNK_POINTS * 8 * KERNEL_SCRATCH_ARRAYS
+    batches = _layout_batches(luminaires, x, y, max_workers)
+    if batches is None:
+        return needed
+    return needed + sum(
+        max(0, r.stop - r.start) * max(0, c.stop - c.start) * 8 * 2 for _, r, c in batches
+    )
+
+
+def layout_illuminance(
+    photometry: Dict[str, Dict],
+    luminaires: List[Dict],
+    x: np.ndarray,
+    y: np.ndarray,
+    calc_plane: float,
+    max_workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Superposed horizontal illuminance of many luminaires on a rectilinear calc grid.
+
+    `photometry` maps photometry ids to parsed IES data; each luminaire dict has
+    x, y, mountingHeight, photometryId and optionally rotationX/Y/Z, llf and
+    cutoffDistance (contributions beyond it are ignored). Luminaires are split
+    into batches that run in a shared process pool; each batch walks its
+    luminaires in point chunks of CHUNK_POINTS and returns only the grid window
+    they reach. Returns an (ny, nx) array.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if not luminaires:
+        return np.zeros((len(y), len(x)))
+
+    batches = _layout_batches(luminaires, x, y, max_workers)
+    if batches is None:
+        return _accumulate_luminaires(photometry, luminaires, x, y, calc_plane)
+
+    futures = []
+    for batch, rows, cols in batches:
+        if rows.stop <= rows.start or cols.stop <= cols.start:
+            continue
+        used = {lum["photometryId"] for lum in batch}
+        futures.append(get_pool().submit(
+            _accumulate_window, {pid: photometry[pid] for pid in used}, batch, x, y, calc_plane, rows, cols
+        ))
+
+    # Each batch returns only the window its luminaires reach
+    total = np.zeros((len(y), len(x)))
+    for future in as_completed(futures):
+        rows, cols, partial = future.result()
+        total[rows, cols] += partial
+    return total
+
+
+class KernelCache:
+    """Memory-bounded LRU of single-luminaire kernel grids."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self._kernels: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            kernel = self._kernels.get(key)
+            if kernel is not None:
+                self._kernels.move_to_end(key)
+            return kernel
+
+    def put(self, key: Tuple, kernel: np.ndarray):
+        with self._lock:
+            if key in self._kernels or kernel.nbytes > self._max_bytes:
+                return
+            self._kernels[key] = kernel
+            self._bytes += kernel.nbytes
+            while self._bytes > self._max_bytes:
+                _, evicted = self._kernels.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+kernel_cache = KernelCache()
+
+
+def array_kernel(
+    ies_data: Dict,
+    photometry_key: str,
+    spacing: float,
+    half_cols: int,
+    half_rows: int,
+    offset: Tuple[float, float],
+    mh: float,
+    calc_plane: float,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+) -> np.ndarray:
+    """
+    Illuminance of one luminaire sampled on a (2 * half_rows + 1, 2 * half_cols + 1)
+    lattice of `spacing`, centred on the luminaire and shifted by the sub-grid
+    `offset` (in grid cells) of the poles it will be used for. Cached by value.
+    """
+    key = (photometry_key, spacing, half_cols, half_rows, offset, mh, calc_plane, llf, rot_x, rot_y, rot_z)
+    kernel = kernel_cache.get(key)
+    if kernel is None:
+        kx = (np.arange(-half_cols, half_cols + 1) - offset[0]) * spacing
+        ky = (np.arange(-half_rows, half_rows + 1) - offset[1]) * spacing
+        kxx, kyy = np.meshgrid(kx, ky)
+        kernel = illuminance_at_points(
+            ies_data, kxx, kyy, mh, calc_plane, llf, rot_x, rot_y, rot_z
+        ).reshape(kxx.shape)
+        kernel = np.nan_to_num(kernel, nan=0.0)
+        kernel.setflags(write=False)
+        kernel_cache.put(key, kernel)
+    return kernel
+
+
+def _shift_and_add(total: np.ndarray, kernel: np.ndarray, rows: np.ndarray, cols: np.ndarray):
+    """Add `kernel`, centred on each integer (row, col), into `total` with edge clipping."""
+    ny, nx = total.shape
+    half_rows, half_cols = kernel.shape[0] // 2, kernel.shape[1] // 2
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        r0, r1 = max(r - half_rows, 0), min(r + half_rows + 1, ny)
+        c0, c1 = max(c - half_cols, 0), min(c + half_cols + 1, nx)
+        if r0 >= r1 or c0 >= c1:
+            continue
+        total[r0:r1, c0:c1] += kernel[
+            r0 - (r - half_rows):r1 - (r - half_rows),
+            c0 - (c - half_cols):c1 - (c - half_cols)
+        ]
+
+
+def _fft_add(total: np.ndarray, kernel: np.ndarray, rows: np.ndarray, cols: np.ndarray):
+    """Same as _shift_and_add, as one FFT convolution of the kernel with a pole impulse image."""
+    ny, nx = total.shape
+    half_rows, half_cols = kernel.shape[0] // 2, kernel.shape[1] // 2
+    # Poles up to one kernel half-width outside the grid still reach into it
+    impulses = np.zeros((ny + 2 * half_rows, nx + 2 * half_cols))
+    r = rows + half_rows
+    c = cols + half_cols
+    inside = (r >= 0) & (r < impulses.shape[0]) & (c >= 0) & (c < impulses.shape[1])
+    np.add.at(impulses, (r[inside], c[inside]), 1.0)
+    # Round-off leaves tiny negative values where the field is dark
+    total += np.clip(fftconvolve(impulses, kernel, mode="valid"), 0.0, None)
+
+
+def _grid_spacing(x: np.ndarray, y: np.ndarray) -> float:
+    return float(x[1] - x[0]) if len(x) > 1 else float(y[1] - y[0])
+
+
+def _kernel_half_size(x: np.ndarray, y: np.ndarray, spacing: float, kernel_radius: Optional[float]) -> Tuple[int, int]:
+    """(half_cols, half_rows) of the array kernel; without a radius it spans the whole grid."""
+    if kernel_radius is None:
+        return len(x) - 1, len(y) - 1
+    half = int(math.ceil(kernel_radius / spacing))
+    return half, half
+
+
+def _pole_offsets(pole_x, pole_y, x: np.ndarray, y: np.ndarray, spacing: float):
+    """Pole positions in grid cells as (rows, cols) indices plus quantized sub-grid offsets (fx, fy)."""
+    gx = (np.asarray(pole_x, dtype=float).ravel() - x[0]) / spacing
+    gy = (np.asarray(pole_y, dtype=float).ravel() - y[0]) / spacing
+    cols = np.floor(gx + OFFSET_TOLERANCE).astype(np.int64)
+    rows = np.floor(gy + OFFSET_TOLERANCE).astype(np.int64)
+    quantum = OFFSET_TOLERANCE * 10
+    fx = np.round(np.clip(gx - cols, 0.0, None) / quantum) * quantum
+    fy = np.round(np.clip(gy - rows, 0.0, None) / quantum) * quantum
+    return rows, cols, fx, fy
+
+
+def array_memory_bytes(pole_x, pole_y, x, y, kernel_radius: Optional[float] = None, method: str = "auto") -> int:
+    """
+    Peak bytes of array_illuminance: the float64 field, one kernel per sub-grid
+    pole offset (kept by the kernel cache up to its limit), and the larger of
+    the scratch of evaluating a kernel and, unless method is "shift", the FFT
+    workspace.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    spacing = _grid_spacing(x, y)
+    half_cols, half_rows = _kernel_half_size(x, y, spacing, kernel_radius)
+    _, _, fx, fy = _pole_offsets(pole_x, pole_y, x, y, spacing)
+    count = min(len(set(zip(fx.tolist(), fy.tolist()))), MAX_KERNEL_OFFSETS)
+
+    kernel = (2 * half_rows + 1) * (2 * half_cols + 1) * 8
+    needed = len(x) * len(y) * 8
+    needed += min(count * kernel, kernel_cache.max_bytes)
+    # Kernel evaluation and convolution run one after the other
+    workspace = kernel * KERNEL_SCRATCH_ARRAYS
+    if method != "shift":
+        padded = (len(y) + 4 * half_rows) * (len(x) + 4 * half_cols)
+        workspace = max(workspace, padded * 8 * FFT_WORKSPACE_ARRAYS)
+    return needed + workspace
+
+
+def array_illuminance(
+    ies_data: Dict,
+    photometry_key: str,
+    pole_x: np.ndarray,
+    pole_y: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    mh: float,
+    calc_plane: float,
+    llf: float,
+    rot_x: float = 0.0,
+    rot_y: float = 0.0,
+    rot_z: float = 0.0,
+    kernel_radius: Optional[float] = None,
+    method: str = "auto",
+) -> np.ndarray:
+    """
+    Superposed illuminance of identical, identically aimed luminaires on a uniform grid.
+
+    The field is one cached single-luminaire kernel convolved with the pole
+    positions. Poles are grouped by their sub-grid offset so each group's kernel
+    is sampled exactly; each group is then added by integer shift-and-add or by
+    FFT convolution ("auto" picks the cheaper). Without `kernel_radius` the
+    kernel spans the whole grid, so no contribution is truncated.
+    Returns an (ny, nx) array for the uniform axes x (nx,) and y (ny,).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    spacing = _grid_spacing(x, y)
+    half_cols, half_rows = _kernel_half_size(x, y, spacing, kernel_radius)
+    rows, cols, fx, fy = _pole_offsets(pole_x, pole_y, x, y, spacing)
+
+    offsets = sorted(set(zip(fx.tolist(), fy.tolist())))
+    if len(offsets) > MAX_KERNEL_OFFSETS:
+        raise ValueError("Pole spacing must be a multiple (or simple fraction) of the grid spacing.")
+
+    total = np.zeros((len(y), len(x)))
+    for offset in offsets:
+        sel = (fx == offset[0]) & (fy == offset[1])
+        kernel = array_kernel(
+            ies_data, photometry_key, spacing, half_cols, half_rows, offset,
+            mh, calc_plane, llf, rot_x, rot_y, rot_z
+        )
+        use_fft = method == "fft"
+        if method == "auto":
+            padded = (len(y) + 2 * half_rows) * (len(x) + 2 * half_cols)
+            use_fft = int(sel.sum()) * kernel.size > 4 * padded * math.log2(max(padded, 2))
+        if use_fft:
+            _fft_add(total, kernel, rows[sel], cols[sel])
+        else:
+            _shift_and_add(total, kernel, rows[sel], cols[sel])
+
+    return total
@@ -0,0 +1,118 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .calc_grid import grid_statistics
+from .contouring import contour_grid
+from .illuminance import CandelaTable, compute_grid_tiled
+
+
+# Upper bound on the number of parameter combinations of one sweep.
+MAX_SWEEP_COMBINATIONS = 256
+
+
+def sweep_combinations(
+    mounting_heights: Sequence[float],
+    rotations_x: Sequence[float],
+    rotations_y: Sequence[float],
+    rotations_z: Sequence[float],
+) -> List[Dict[str, float]]:
+    """Cartesian product of the geometric sweep parameters (LLF is applied separately)."""
+    return [
+        {"mountingHeight": mh, "rotationX": rx, "rotationY": ry, "rotationZ": rz}
+        for mh, rx, ry, rz in itertools.product(mounting_heights, rotations_x, rotations_y, rotations_z)
+    ]
+
+
+def iso_coverage(values: np.ndarray, levels: Sequence[float], cell_area: float) -> List[float]:
+    """Area of the grid at or above each level, counting `cell_area` per point."""
+    flat = values.ravel()
+    return [float(np.count_nonzero(flat >= level)) * cell_area for level in levels]
+
+
+def _sweep_geometry(
+    table: CandelaTable,
+    ies_data: Dict,
+    x: np.ndarray,
+    y: np.ndarray,
+    calc_plane: float,
+    combo: Dict[str, float],
+    llfs: Sequence[float],
+    iso_levels: Sequence[float],
+    unit_scale: float,
+    cell_area: float,
+    deadline: Optional[float],
+    contour: bool,
+) -> List[Dict]:
+    values = compute_grid_tiled(
+        ies_data, x, y, combo["mountingHeight"], calc_plane, 1.0,
+        combo["rotationX"], combo["rotationY"], combo["rotationZ"],
+        deadline=deadline, table=table
+    )
+    np.nan_to_num(values, copy=False, nan=0.0)
+    values *= unit_scale
+
+    # Illuminance is linear in LLF: one grid serves every LLF by scaling the
+    # thresholds and statistics instead of the values
+    base_lit = values[values >= min(iso_levels) / max(llfs)] if iso_levels else values
+    results = []
+    for llf in llfs:
+        thresholds = [level / llf for level in iso_levels]
+        lit = base_lit[base_lit >= min(thresholds)] if iso_levels else base_lit
+        stats = grid_statistics(lit)
+        for key in ("avg", "max", "min"):
+            if stats[key] is not None:
+                stats[key] *= llf
+        results.append({
+            **combo,
+            "llf": llf,
+            "statistics": stats,
+            "coverage": iso_coverage(values, thresholds, cell_area),
+            "paths": contour_grid(x, y, values, thresholds) if contour else None,
+        })
+    return results
+
+
+def run_sweep(
+    ies_data: Dict,
+    x: np.ndarray,
+    y: np.ndarray,
+    calc_plane: float,
+    combos: Sequence[Dict[str, float]],
+    llfs: Sequence[float],
+    iso_levels: Sequence[float],
+    unit_scale: float = 1.0,
+    deadline: Optional[float] = None,
+    contour: bool = False,
+    max_workers: Optional[int] = None,
+    table: Optional[CandelaTable] = None,
+) -> List[Dict]:
+    """
+    Metrics of every (combo, llf) pair on one shared grid x (nx,) by y (ny,).
+
+    The photometry is tabulated once and shared by all combinations; each
+    geometric combination evaluates one grid (in a thread pool) and derives
+    every LLF from it. Statistics cover the points at or above the lowest iso
+    level (the whole grid without levels); coverage is the area at or above
+    each level. Results follow the order of `combos`, LLFs innermost.
+    """
+    if table is None:
+        table = CandelaTable(ies_data)
+    cell_area = float((x[1] - x[0]) * (y[1] - y[0])) if len(x) > 1 and len(y) > 1 else 0.0
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(combos)))
+
+    def evaluate(combo):
+        return _sweep_geometry(
+            table, ies_data, x, y, calc_plane, combo, llfs, iso_levels,
+            unit_scale, cell_area, deadline, contour
+        )
+
+    if workers == 1:
+        per_combo = [evaluate(combo) for combo in combos]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            per_combo = list(pool.map(evaluate, combos))
+    return [result for results in per_combo for result in results]
@@ -0,0 +1,138 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Sequence
+
+import numpy as np
+import matplotlib.tri as mtri
+
+
+class TerrainSurface:
+    """
+    A calc surface sampled on a rectilinear grid: elevations z (ny, nx), upward
+    unit normals (3, ny, nx) and a mask of the points that lie on the terrain.
+    The arrays are read-only, so one surface serves any number of fixture studies.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, z: np.ndarray, normals: np.ndarray, valid: np.ndarray):
+        self.x = np.asarray(x, dtype=np.float32)
+        self.y = np.asarray(y, dtype=np.float32)
+        self.z = np.ascontiguousarray(z, dtype=np.float32)
+        self.normals = np.ascontiguousarray(normals, dtype=np.float32)
+        self.valid = valid
+        for array in (self.x, self.y, self.z, self.normals, self.valid):
+            array.setflags(write=False)
+
+    @property
+    def nbytes(self) -> int:
+        return self.x.nbytes + self.y.nbytes + self.z.nbytes + self.normals.nbytes + self.valid.nbytes
+
+    @property
+    def spacing(self) -> float:
+        return float(self.x[1] - self.x[0]) if len(self.x) > 1 else 0.0
+
+    def elevation_at(self, px: float, py: float) -> float:
+        """Bilinear elevation at (px, py), clamped to the grid."""
+        fx = float(np.interp(px, self.x, np.arange(len(self.x))))
+        fy = float(np.interp(py, self.y, np.arange(len(self.y))))
+        i0, j0 = min(int(fx), len(self.x) - 2), min(int(fy), len(self.y) - 2)
+        tx, ty = fx - i0, fy - j0
+        z = self.z[j0:j0 + 2, i0:i0 + 2].astype(np.float64)
+        return float((z[0, 0] * (1 - tx) + z[0, 1] * tx) * (1 - ty) + (z[1, 0] * (1 - tx) + z[1, 1] * tx) * ty)
+
+
+def _unit_normals(nx: np.ndarray, ny: np.ndarray, nz: np.ndarray) -> np.ndarray:
+    normals = np.stack((nx, ny, nz))
+    normals /= np.linalg.norm(normals, axis=0, keepdims=True)
+    return normals
+
+
+def heightmap_surface(origin_x: float, origin_y: float, spacing: float, elevations: Sequence[Sequence[float]]) -> TerrainSurface:
+    """
+    Surface of a regular heightmap whose row j, column i sits at
+    (origin_x + i * spacing, origin_y + j * spacing). Normals come from central
+    differences (one-sided at the edges).
+    """
+    z = np.asarray(elevations, dtype=np.float64)
+    if z.ndim != 2 or z.shape[0] < 2 or z.shape[1] < 2:
+        raise ValueError("Heightmap needs at least 2 x 2 elevations.")
+    if spacing <= 0:
+        raise ValueError("Heightmap spacing must be positive.")
+
+    x = origin_x + np.arange(z.shape[1]) * spacing
+    y = origin_y + np.arange(z.shape[0]) * spacing
+    valid = np.isfinite(z)
+    filled = np.where(valid, z, np.nanmean(z) if valid.any() else 0.0)
+    dz_dy, dz_dx = np.gradient(filled, spacing)
+    return TerrainSurface(x, y, filled, _unit_normals(-dz_dx, -dz_dy, np.ones_like(filled)), valid)
+
+
+def tin_surface(vertices: Sequence[Sequence[float]], triangles: Sequence[Sequence[int]], spacing: float) -> TerrainSurface:
+    """
+    Surface of a triangulated irregular network sampled every `spacing` over its
+    bounding box. Elevations are linear within each triangle, and every point
+    takes the normal of the triangle it falls in; points outside the TIN are
+    masked (and filled with the mean elevation).
+    """
+    v = np.asarray(vertices, dtype=np.float64)
+    tris = np.asarray(triangles, dtype=np.int64)
+    if v.ndim != 2 or v.shape[1] != 3 or tris.ndim != 2 or tris.shape[1] != 3 or len(tris) == 0:
+        raise ValueError("TIN needs [x, y, z] vertices and [i, j, k] triangles.")
+    if tris.min() < 0 or tris.max() >= len(v):
+        raise ValueError("TIN triangle references a missing vertex.")
+    if spacing <= 0:
+        raise ValueError("Sampling spacing must be positive.")
+
+    # Face normals, flipped to point up whatever the triangle winding
+    p0, p1, p2 = v[tris[:, 0]], v[tris[:, 1]], v[tris[:, 2]]
+    face = np.cross(p1 - p0, p2 - p0)
+    face[face[:, 2] < 0] *= -1
+    length = np.linalg.norm(face, axis=1)
+    if np.any(face[:, 2] <= 1e-12 * np.maximum(length, 1e-300)):
+        raise ValueError("TIN contains vertical or degenerate triangles.")
+    face /= length[:, None]
+
+    x = np.arange(v[:, 0].min(), v[:, 0].max() + spacing / 2, spacing)
+    y = np.arange(v[:, 1].min(), v[:, 1].max() + spacing / 2, spacing)
+    if len(x) < 2 or len(y) < 2:
+        raise ValueError("TIN is smaller than the sampling spacing; use a finer spacing.")
+    xx, yy = np.meshgrid(x, y)
+
+    triangulation = mtri.Triangulation(v[:, 0], v[:, 1], tris)
+    owner = triangulation.get_trifinder()(xx, yy)
+    z = mtri.LinearTriInterpolator(triangulation, v[:, 2])(xx, yy).filled(np.nan)
+
+    valid = owner >= 0
+    normals = np.where(valid[None], face[np.maximum(owner, 0)].transpose(2, 0, 1), np.array([0.0, 0.0, 1.0])[:, None, None])
+    fill = np.nanmean(z) if valid.any() else 0.0
+    return TerrainSurface(x, y, np.where(valid, z, fill), normals, valid)
+
+
+class TerrainStore:
+    """Memory-bounded LRU of prepared terrain surfaces keyed by the hash of their definition."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self._surfaces: "OrderedDict[str, TerrainSurface]" = OrderedDict()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[TerrainSurface]:
+        with self._lock:
+            surface = self._surfaces.get(key)
+            if surface is not None:
+                self._surfaces.move_to_end(key)
+            return surface
+
+    def put(self, key: str, surface: TerrainSurface):
+        with self._lock:
+            if key in self._surfaces or surface.nbytes > self._max_bytes:
+                return
+            self._surfaces[key] = surface
+            self._bytes += surface.nbytes
+            while self._bytes > self._max_bytes:
+                _, evicted = self._surfaces.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+terrain_store = TerrainStore(max_bytes=int(float(os.getenv("ISOLINE_TERRAIN_CACHE_MB", "256")) * 1024 * 1024))
@@ -0,0 +1,252 @@
+import re
+from typing import Iterable, Iterator, List, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+from matplotlib.colors import to_rgb
+
+from .polyline import simplify_paths
+
+
+# Output is flushed whenever this much text has accumulated, so memory stays
+# bounded by one chunk plus the largest single path regardless of result size.
+FLUSH_CHARS = 1 << 18
+COORD_FORMAT = "%.4f"
+
+# Deviation allowed when simplifying PDF paths to the plotted scale, in points
+# (0.1 pt is about 0.035 mm on paper).
+PDF_PLOT_TOLERANCE_PT = 0.1
+
+# AutoCAD Color Index entries used to approximate level colors in DXF R12,
+# which has no true color.
+ACI_COLORS = {
+    1: (255, 0, 0), 2: (255, 255, 0), 3: (0, 255, 0), 4: (0, 255, 255),
+    5: (0, 0, 255), 6: (255, 0, 255), 7: (0, 0, 0), 8: (128, 128, 128),
+    9: (192, 192, 192), 30: (255, 127, 0), 40: (255, 191, 0), 94: (0, 129, 0),
+    150: (0, 127, 255), 170: (0, 0, 127), 200: (191, 0, 255), 210: (255, 0, 191),
+    14: (127, 0, 0), 250: (51, 51, 51),
+}
+
+# Vertex lists of each level, in the order of data.levels
+LevelPaths = Iterable[Sequence[Sequence[Sequence[float]]]]
+
+
+class _Chunker:
+    """Collects text pieces and hands them out as encoded chunks of about FLUSH_CHARS."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._size = 0
+
+    def add(self, text: str) -> bool:
+        self._parts.append(text)
+        self._size += len(text)
+        return self._size >= FLUSH_CHARS
+
+    def flush(self) -> bytes:
+        data = "".join(self._parts).encode("utf-8")
+        self._parts, self._size = [], 0
+        return data
+
+
+def _format_pairs(v: np.ndarray, template: str) -> str:
+    """`template` (with two % fields) repeated for every row of an (N, 2) array, in one format call."""
+    return (template * len(v)) % tuple(v.ravel().tolist())
+
+
+def pdf_polyline_operators(paths: Sequence[Sequence[Sequence[float]]], tolerance: float = 0.0) -> str:
+    """
+    PDF content-stream operators stroking all `paths` as one path object
+    ("x y m x y l ... S"), formatted in bulk per path from numpy arrays.
+    `tolerance` > 0 simplifies each path first, in path units.
+    """
+    arrays = [np.asarray(path, dtype=float) for path in paths if len(path) >= 2]
+    if tolerance > 0:
+        arrays = simplify_paths(arrays, tolerance)
+    parts = []
+    for v in arrays:
+        parts.append("%.3f %.3f m " % (v[0, 0], v[0, 1]))
+        parts.append(_format_pairs(v[1:], "%.3f %.3f l "))
+    if not parts:
+        return ""
+    parts.append("S")
+    return "".join(parts)
+
+
+def pdf_grid_operators(extents, spacing: float) -> str:
+    """Operators stroking every grid line of `spacing` within `extents` as one path."""
+    xs = np.asarray(grid_lines(extents["minX"], extents["maxX"], spacing))
+    ys = np.asarray(grid_lines(extents["minY"], extents["maxY"], spacing))
+    if len(xs) == 0 and len(ys) == 0:
+        return ""
+    vertical = np.column_stack((xs, np.full_like(xs, extents["minY"]), xs, np.full_like(xs, extents["maxY"])))
+    horizontal = np.column_stack((np.full_like(ys, extents["minX"]), ys, np.full_like(ys, extents["maxX"]), ys))
+    segments = np.vstack((vertical, horizontal))
+    return ("%.3f %.3f m %.3f %.3f l " * len(segments)) % tuple(segments.ravel().tolist()) + "S"
+
+
+def grid_lines(lo: float, hi: float, spacing: float) -> List[float]:
+    first = np.ceil(lo / spacing) * spacing
+    return np.arange(first, hi + spacing * 1e-9, spacing).tolist()
+
+
+def label_height(extents) -> float:
+    """Label text height in data units: the 10 pt labels of the 36x24 in PDF."""
+    data_w = extents["maxX"] - extents["minX"]
+    data_h = extents["maxY"] - extents["minY"]
+    scale = min((36 - 4) * 72 / data_w, (24 - 4) * 72 / data_h)
+    return 10.0 / scale
+
+
+def iter_svg(data, options, level_paths: LevelPaths) -> Iterator[bytes]:
+    """
+    SVG with one <g> layer per iso level, written level by level. Coordinates
+    are data units with y negated (SVG's y axis points down); strokes don't
+    scale, so the drawing can be resized freely.
+    """
+    ext = data.extents
+    width, height = ext["maxX"] - ext["minX"], ext["maxY"] - ext["minY"]
+    text_h = label_height(ext)
+    out = _Chunker()
+    out.add(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{ext["minX"]:g} {-ext["maxY"]:g} {width:g} {height:g}">\n'
+        '<style>path, line { fill: none; vector-effect: non-scaling-stroke; }</style>\n'
+    )
+
+    if options.includeGrid and options.gridSpacing:
+        out.add('<g id="grid" stroke="#808080" stroke-width="0.5" stroke-dasharray="1 2">\n')
+        for x in grid_lines(ext["minX"], ext["maxX"], options.gridSpacing):
+            out.add(f'<line x1="{x:g}" y1="{-ext["minY"]:g}" x2="{x:g}" y2="{-ext["maxY"]:g}"/>\n')
+        for y in grid_lines(ext["minY"], ext["maxY"], options.gridSpacing):
+            out.add(f'<line x1="{ext["minX"]:g}" y1="{-y:g}" x2="{ext["maxX"]:g}" y2="{-y:g}"/>\n')
+        out.add('</g>\n')
+
+    move = f"M{COORD_FORMAT} {COORD_FORMAT}"
+    line_to = f"L{COORD_FORMAT} {COORD_FORMAT}"
+    for index, (level, paths) in enumerate(zip(data.levels, level_paths)):
+        out.add(f'<g id="{svg_level_id(index, level.value, data.illuminanceUnits)}" stroke={quoteattr(level.color)} stroke-width="1">\n<path d="')
+        for path in paths:
+            if len(path) < 2:
+                continue
+            v = np.asarray(path, dtype=float) * (1.0, -1.0)
+            if out.add(move % tuple(v[0]) + _format_pairs(v[1:], line_to)):
+                yield out.flush()
+        out.add('"/>\n')
+
+        if options.includeLabels and level.labels:
+            out.add(f'<g fill={quoteattr(level.color)} font-family="Helvetica, Arial, sans-serif" font-size="{text_h:g}">\n')
+            for label in level.labels:
+                out.add(f'<text x="{label.x:.4f}" y="{-label.y:.4f}">{escape(label.text)}</text>\n')
+            out.add('</g>\n')
+        out.add('</g>\n')
+        yield out.flush()
+
+    ch = 5.0 if data.units == "ft" else 1.5
+    out.add(
+        f'<g id="annotations" stroke="#000000" fill="#000000" stroke-width="1" font-family="Helvetica, Arial, sans-serif" font-size="{text_h * 1.2:g}">\n'
+        f'<line x1="{-ch:g}" y1="0" x2="{ch:g}" y2="0"/><line x1="0" y1="{-ch:g}" x2="0" y2="{ch:g}"/>\n'
+        f'<text x="{ch * 1.2:g}" y="{ch * 1.2:g}" stroke="none">MH={data.mountingHeight}{escape(data.units)}</text>\n'
+    )
+    if options.includeScaleBar:
+        sb_x = ext["minX"] + width * 0.05
+        sb_y = ext["minY"] + height * 0.05
+        sb_len = options.scaleBarLength
+        out.add(
+            f'<line x1="{sb_x:g}" y1="{-sb_y:g}" x2="{sb_x + sb_len:g}" y2="{-sb_y:g}" stroke-width="2"/>\n'
+            f'<text x="{sb_x:g}" y="{-(sb_y + text_h * 0.3):g}" stroke="none">{sb_len:g} {escape(data.units)}</text>\n'
+        )
+    if options.includeDisclaimer:
+        out.add(f'<text x="{ext["minX"]:g}" y="{-(ext["minY"] - height * 0.05):g}" stroke="none">For preliminary layout and visual reference only.</text>\n')
+    out.add('</g>\n</svg>\n')
+    yield out.flush()
+
+
+def svg_level_id(index: int, value: float, illuminance_units: str) -> str:
+    # Unique even for repeated levels, and a valid XML id (no spaces)
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"level-{index}-{value:g}-{illuminance_units}")
+
+
+def dxf_layer_name(value: float, illuminance_units: str) -> str:
+    # R12 layer names allow letters, digits, "$", "-" and "_" only
+    return re.sub(r"[^A-Z0-9$_-]", "_", f"ISO_{value:g}_{illuminance_units}".upper())
+
+
+def nearest_aci(color: str) -> int:
+    rgb = np.asarray(to_rgb(color)) * 255
+    return min(ACI_COLORS, key=lambda index: float(np.sum((np.asarray(ACI_COLORS[index]) - rgb) ** 2)))
+
+
+def _dxf_text(layer: str, x: float, y: float, height: float, text: str) -> str:
+    return f"0\nTEXT\n8\n{layer}\n10\n{x:.4f}\n20\n{y:.4f}\n30\n0.0\n40\n{height:.4f}\n1\n{text}\n"
+
+
+def _dxf_line(layer: str, x0: float, y0: float, x1: float, y1: float) -> str:
+    return f"0\nLINE\n8\n{layer}\n10\n{x0:.4f}\n20\n{y0:.4f}\n30\n0.0\n11\n{x1:.4f}\n21\n{y1:.4f}\n31\n0.0\n"
+
+
+def iter_dxf(data, options, level_paths: LevelPaths) -> Iterator[bytes]:
+    """
+    ASCII DXF (R12) in drawing units, one layer per iso level colored with
+    the nearest ACI color; isolines are 2D POLYLINE entities, labels TEXT on
+    the level's layer. Written level by level.
+    """
+    ext = data.extents
+    text_h = label_height(ext)
+    levels: List[Tuple[object, str]] = [(level, dxf_layer_name(level.value, data.illuminanceUnits)) for level in data.levels]
+    layers = {name: nearest_aci(level.color) for level, name in reversed(levels)}
+    layers.update({"GRID": 8, "ANNOTATION": 7})
+
+    out = _Chunker()
+    out.add(
+        "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n"
+        f"9\n$EXTMIN\n10\n{ext['minX']:.4f}\n20\n{ext['minY']:.4f}\n30\n0.0\n"
+        f"9\n$EXTMAX\n10\n{ext['maxX']:.4f}\n20\n{ext['maxY']:.4f}\n30\n0.0\n"
+        "0\nENDSEC\n"
+        f"0\nSECTION\n2\nTABLES\n0\nTABLE\n2\nLAYER\n70\n{len(layers)}\n"
+    )
+    for name, aci in layers.items():
+        out.add(f"0\nLAYER\n2\n{name}\n70\n0\n62\n{aci}\n6\nCONTINUOUS\n")
+    out.add("0\nENDTAB\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n")
+
+    if options.includeGrid and options.gridSpacing:
+        for x in grid_lines(ext["minX"], ext["maxX"], options.gridSpacing):
+            out.add(_dxf_line("GRID", x, ext["minY"], x, ext["maxY"]))
+        for y in grid_lines(ext["minY"], ext["maxY"], options.gridSpacing):
+            out.add(_dxf_line("GRID", ext["minX"], y, ext["maxX"], y))
+        yield out.flush()
+
+    for (level, layer), paths in zip(levels, level_paths):
+        vertex = f"0\nVERTEX\n8\n{layer}\n10\n{COORD_FORMAT}\n20\n{COORD_FORMAT}\n30\n0.0\n"
+        for path in paths:
+            if len(path) < 2:
+                continue
+            v = np.asarray(path, dtype=float)
+            closed = len(v) > 2 and np.array_equal(v[0], v[-1])
+            if closed:
+                v = v[:-1]
+            out.add(f"0\nPOLYLINE\n8\n{layer}\n66\n1\n70\n{1 if closed else 0}\n10\n0.0\n20\n0.0\n30\n0.0\n")
+            out.add(_format_pairs(v, vertex))
+            if out.add(f"0\nSEQEND\n8\n{layer}\n"):
+                yield out.flush()
+        if options.includeLabels:
+            for label in level.labels:
+                out.add(_dxf_text(layer, label.x, label.y, text_h, label.text))
+        yield out.flush()
+
+    ch = 5.0 if data.units == "ft" else 1.5
+    out.add(_dxf_line("ANNOTATION", -ch, 0.0, ch, 0.0))
+    out.add(_dxf_line("ANNOTATION", 0.0, -ch, 0.0, ch))
+    out.add(_dxf_text("ANNOTATION", ch * 1.2, -ch * 1.2, text_h * 1.2, f"MH={data.mountingHeight}{data.units}"))
+    if options.includeScaleBar:
+        sb_x = ext["minX"] + (ext["maxX"] - ext["minX"]) * 0.05
+        sb_y = ext["minY"] + (ext["maxY"] - ext["minY"]) * 0.05
+        out.add(_dxf_line("ANNOTATION", sb_x, sb_y, sb_x + options.scaleBarLength, sb_y))
+        out.add(_dxf_text("ANNOTATION", sb_x, sb_y + text_h * 0.3, text_h * 1.2, f"{options.scaleBarLength:g} {data.units}"))
+    if options.includeDisclaimer:
+        out.add(_dxf_text(
+            "ANNOTATION", ext["minX"], ext["minY"] - (ext["maxY"] - ext["minY"]) * 0.05, text_h * 1.2,
+            "For preliminary layout and visual reference only."
+        ))
+    out.add("0\nENDSEC\n0\nEOF\n")
+    yield out.flush()
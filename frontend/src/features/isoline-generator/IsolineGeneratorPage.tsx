@@ -17,6 +17,8 @@ const IsolineGeneratorPage: React.FC = () => {
     const inputPanelRef = React.useRef<InputPanelHandle | null>(null);
     const [file, setFile] = React.useState<File | null>(null);
     const [computeData, setComputeData] = useState<ComputeResponse | null>(null);
+    // Inputs of the last successful compute, to tell level-only edits apart
+    const lastComputeRef = React.useRef<{ file: File; params: ComputeRequest } | null>(null);
     const [isGenerating, setIsGenerating] = useState(false);
     const [isExporting, setIsExporting] = useState(false);
     const [error, setError] = useState<string | null>(null);
@@ -80,7 +82,20 @@ const IsolineGeneratorPage: React.FC = () => {
         setFileName(name);
 
         try {
-            const data = await isolineService.compute(uploadedFile, params);
+            const last = lastComputeRef.current;
+            const onlyLevelsChanged = last !== null
+                && last.file === uploadedFile
+                && JSON.stringify({ ...last.params, isoLevels: [] }) === JSON.stringify({ ...params, isoLevels: [] });
+
+            let data: ComputeResponse | null = null;
+            if (onlyLevelsChanged && computeData?.resultId) {
+                // Same grid, new levels: re-contour server-side instead of recomputing
+                data = await isolineService.recontour(computeData.resultId, params.isoLevels).catch(() => null);
+            }
+            if (!data) {
+                data = await isolineService.compute(uploadedFile, params);
+            }
+            lastComputeRef.current = { file: uploadedFile, params: { ...params } };
             setComputeData(data);
             // Update default scale bar length based on units if needed, or keep user preference?
             // Let's keep user preference but maybe reset if units change? 
@@ -144,6 +159,29 @@ const IsolineGeneratorPage: React.FC = () => {
         }
     };
 
+    const handleExportVector = async (options: ExportOptions) => {
+        if (!computeData) return;
+        setIsExporting(true);
+        try {
+            const finalOptions = {
+                ...options,
+                scaleBarLength,
+                includeScaleBar,
+                includeLabels,
+                includeDisclaimer,
+                includeGrid,
+                gridSpacing: includeGrid ? gridSize : undefined,
+                fileName: fileName
+            };
+            await isolineService.exportVector(computeData, finalOptions);
+        } catch (err) {
+            console.error(err);
+            showToast(`Failed to export ${options.format.toUpperCase()}.`, 'error');
+        } finally {
+            setIsExporting(false);
+        }
+    };
+
     return (
         <div className={PAGE_LAYOUT.root}>
             <header className={PAGE_LAYOUT.header}>
@@ -205,6 +243,7 @@ const IsolineGeneratorPage: React.FC = () => {
                             rotation={rotation}
                             onExportPdf={handleExportPdf}
                             onExportPng={handleExportPng}
+                            onExportVector={handleExportVector}
                             isExporting={isExporting}
                             scaleBarLength={scaleBarLength}
                             includeScaleBar={includeScaleBar}
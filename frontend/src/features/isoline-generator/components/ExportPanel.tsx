@@ -17,6 +17,7 @@ interface ExportPanelProps {
     rotation: { x: number; y: number; z: number };
     onExportPdf: (options: ExportOptions) => void;
     onExportPng: (options: ExportOptions) => void;
+    onExportVector: (options: ExportOptions) => void;
     isExporting: boolean;
     scaleBarLength: number;
     includeScaleBar: boolean;
@@ -38,6 +39,7 @@ const ExportPanel: React.FC<ExportPanelProps> = ({
     rotation,
     onExportPdf,
     onExportPng,
+    onExportVector,
     isExporting,
     scaleBarLength,
     includeScaleBar,
@@ -73,6 +75,17 @@ const ExportPanel: React.FC<ExportPanelProps> = ({
         });
     };
 
+    const handleVector = (format: 'svg' | 'dxf') => {
+        onExportVector({
+            format,
+            includeScaleBar,
+            includeLabels,
+            includeDisclaimer,
+            includeGrid,
+            scaleBarLength
+        });
+    };
+
     return (
         <div className={`${TOOL_CARD_PADDED} flex flex-col gap-4`}>
             <h3 className={`${TOOL_CARD_TITLE} border-b border-app-border pb-2`}>Export Isolines</h3>
@@ -134,6 +147,22 @@ const ExportPanel: React.FC<ExportPanelProps> = ({
                     {isExporting ? 'Exporting...' : 'Export PNG'}
                 </button>
             </div>
+            <div className="flex gap-2">
+                <button
+                    onClick={() => handleVector('svg')}
+                    disabled={!data || isExporting}
+                    className={`flex-1 py-1.5 ${TOOL_BUTTON_SECONDARY}`}
+                >
+                    Export SVG
+                </button>
+                <button
+                    onClick={() => handleVector('dxf')}
+                    disabled={!data || isExporting}
+                    className={`flex-1 py-1.5 ${TOOL_BUTTON_SECONDARY}`}
+                >
+                    Export DXF
+                </button>
+            </div>
 
             <div className="flex flex-col gap-2">
                 <label className="flex items-center gap-2 text-sm text-app-text cursor-pointer">
@@ -175,7 +204,7 @@ const ExportPanel: React.FC<ExportPanelProps> = ({
             </div>
 
             <div className="text-xs text-app-text-muted">
-                PDF is vector-based and scale-accurate. PNG is high-resolution transparent raster. Both are optimized for Bluebeam overlay.
+                PDF is vector-based and scale-accurate. PNG is high-resolution transparent raster. Both are optimized for Bluebeam overlay. SVG and DXF are drawn in project units with one layer per iso level for CAD.
             </div>
         </div>
     );
@@ -17,17 +17,29 @@ export interface ComputeRequest {
     rotationX: number;
     rotationY: number;
     rotationZ: number;
+    evaluationMode?: 'grid' | 'adaptive';
+    simplifyTolerance?: number | null;
+    pathEncoding?: 'json' | 'delta' | 'float32';
+    avoidLabelCollisions?: boolean;
 }
 
 export interface IsolinePath {
     path: number[][]; // [[x, y], ...]
 }
 
+export interface EncodedPaths {
+    encoding: 'delta' | 'float32';
+    quantum?: number | null;
+    offsets: number[]; // path i spans vertices offsets[i] .. offsets[i + 1]
+    data: number[] | string; // delta: interleaved integer x, y steps; float32: base64 x, y pairs
+}
+
 export interface IsolineLevelResult {
     value: number;
     color: string;
     paths: number[][][]; // List of paths
     labels: { x: number; y: number; text: string }[];
+    encodedPaths?: EncodedPaths | null;
 }
 
 export interface ComputeResponse {
@@ -39,11 +51,160 @@ export interface ComputeResponse {
     extents: { minX: number; maxX: number; minY: number; maxY: number };
     scaleBar: { length: number; label: string };
     levels: IsolineLevelResult[];
+    evaluatedPoints?: number | null;
+    resultId?: string | null;
+}
+
+
+export interface SweepRequest extends ComputeRequest {
+    // Values to sweep; empty keeps the single base value
+    mountingHeights?: number[];
+    rotationsX?: number[];
+    rotationsY?: number[];
+    rotationsZ?: number[];
+    llfs?: number[];
+    includeContours?: boolean;
+}
+
+export interface SweepStatistics {
+    points: number;
+    avg: number | null;
+    max: number | null;
+    min: number | null;
+    avgMin: number | null;
+    maxMin: number | null;
+}
+
+export interface SweepCombination {
+    mountingHeight: number;
+    rotationX: number;
+    rotationY: number;
+    rotationZ: number;
+    llf: number;
+    statistics: SweepStatistics; // points at or above the lowest iso level
+    coverage: { value: number; area: number }[];
+    levels?: IsolineLevelResult[] | null;
+}
+
+export interface SweepResponse {
+    units: 'ft' | 'm';
+    illuminanceUnits: 'fc' | 'lux';
+    calcPlaneHeight: number;
+    extents: { minX: number; maxX: number; minY: number; maxY: number };
+    spacing: number;
+    nx: number;
+    ny: number;
+    combinations: SweepCombination[];
+}
+
+export interface CalcPlane {
+    name: string;
+    origin: [number, number, number]; // (s, t) = (0, 0) corner
+    uAxis?: [number, number, number]; // direction of s
+    vAxis?: [number, number, number]; // direction of t; lit side faces uAxis x vAxis
+    width: number;
+    height: number;
+    spacing?: number;
+}
+
+export interface PlaneComputeRequest {
+    units?: 'ft' | 'm';
+    illuminanceUnits?: 'fc' | 'lux';
+    luminaireX?: number;
+    luminaireY?: number;
+    mountingHeight: number;
+    llf?: number;
+    rotationX?: number;
+    rotationY?: number;
+    rotationZ?: number;
+    detailLevel?: 'low' | 'medium' | 'high';
+    planes: CalcPlane[];
+    isoLevels?: IsolineLevel[];
+    includeValues?: boolean;
+    simplifyTolerance?: number;
+    pathEncoding?: 'json' | 'delta' | 'float32';
+    avoidLabelCollisions?: boolean;
+}
+
+export interface PlaneResult {
+    name: string;
+    normal: [number, number, number];
+    spacing: number;
+    ns: number;
+    nt: number;
+    summary: SweepStatistics;
+    levels: IsolineLevelResult[]; // plane (s, t) coordinates
+    values?: number[][] | null;
+}
+
+export interface PlaneComputeResponse {
+    units: 'ft' | 'm';
+    illuminanceUnits: 'fc' | 'lux';
+    planes: PlaneResult[];
+}
+
+export interface ZoneLumens {
+    start: number; // vertical angle from nadir, degrees
+    end: number;
+    lumens: number;
+    percent: number;
+}
+
+export interface PhotometryReport {
+    photometryId: string;
+    totalLumens: number;
+    downwardLumens: number;
+    upwardLumens: number;
+    maxCandela: number;
+    maxCandelaAngles: { horizontal: number; vertical: number };
+    zones: ZoneLumens[];
+    summary: ZoneLumens[];
+    bug: {
+        rating: string; // e.g. "B2-U0-G1"
+        backlight: number;
+        uplight: number;
+        glare: number;
+        zoneLumens: Record<string, number>;
+    };
+    beamSpreads: { plane: string; beamAngle: number | null; fieldAngle: number | null }[];
+}
+
+export interface TerrainRequest {
+    // Exactly one of the two
+    heightmap?: { originX?: number; originY?: number; spacing: number; elevations: (number | null)[][] };
+    tin?: { vertices: [number, number, number][]; triangles: [number, number, number][]; spacing?: number };
+}
+
+export interface TerrainResponse {
+    terrainId: string;
+    extents: { minX: number; maxX: number; minY: number; maxY: number };
+    spacing: number;
+    nx: number;
+    ny: number;
+    minElevation: number;
+    maxElevation: number;
 }
 
+export interface TerrainComputeRequest {
+    terrainId: string;
+    units?: 'ft' | 'm';
+    illuminanceUnits?: 'fc' | 'lux';
+    luminaireX?: number;
+    luminaireY?: number;
+    mountingHeight: number; // above grade at the pole
+    calcHeight?: number; // above grade
+    llf?: number;
+    rotationX?: number;
+    rotationY?: number;
+    rotationZ?: number;
+    isoLevels: IsolineLevel[];
+    simplifyTolerance?: number;
+    pathEncoding?: 'json' | 'delta' | 'float32';
+    avoidLabelCollisions?: boolean;
+}
 
 export interface ExportOptions {
-    format: 'pdf' | 'png';
+    format: 'pdf' | 'png' | 'svg' | 'dxf';
     includeScaleBar: boolean;
     includeLabels: boolean;
     includeDisclaimer: boolean;
@@ -72,11 +233,56 @@ const submitForm = (url: string, data: Record<string, unknown>) => {
 
 import { API_BASE_URL as API_URL } from '../config';
 
+const decodePaths = (encoded: EncodedPaths): number[][][] => {
+    let values: ArrayLike<number>;
+    if (encoded.encoding === 'float32') {
+        const bytes = Uint8Array.from(atob(encoded.data as string), ch => ch.charCodeAt(0));
+        values = new Float32Array(bytes.buffer);
+    } else {
+        values = encoded.data as number[];
+    }
+
+    const paths: number[][][] = [];
+    for (let i = 0; i + 1 < encoded.offsets.length; i++) {
+        const path: number[][] = [];
+        let x = 0;
+        let y = 0;
+        for (let k = encoded.offsets[i]; k < encoded.offsets[i + 1]; k++) {
+            if (encoded.encoding === 'float32') {
+                path.push([values[2 * k], values[2 * k + 1]]);
+            } else {
+                // Integer steps from the previous vertex, in multiples of quantum
+                x += values[2 * k];
+                y += values[2 * k + 1];
+                path.push([x * (encoded.quantum ?? 1), y * (encoded.quantum ?? 1)]);
+            }
+        }
+        paths.push(path);
+    }
+    return paths;
+};
+
+// Cached results are re-contoured from the server's grid by id; the geometry
+// rides along so the export still works once that grid has been evicted
+const exportBody = (isolineData: ComputeResponse, options: ExportOptions) => (
+    isolineData.resultId
+        ? { resultId: isolineData.resultId, isoLevels: isolineData.levels.map(({ value, color }) => ({ value, color })), isolineData, options }
+        : { isolineData, options }
+);
+
+// Expands compact path encodings so the rest of the UI only deals with `paths`
+const withDecodedPaths = (data: ComputeResponse): ComputeResponse => ({
+    ...data,
+    levels: data.levels.map(level => level.encodedPaths
+        ? { ...level, paths: decodePaths(level.encodedPaths), encodedPaths: null }
+        : level),
+});
+
 export const isolineService = {
     compute: async (file: File, params: ComputeRequest) => {
         const formData = new FormData();
         formData.append('file', file);
-        formData.append('params', JSON.stringify(params));
+        formData.append('params', JSON.stringify({ pathEncoding: 'delta', ...params }));
 
         // Using api.upload is not sufficient here because we have extra fields 'params'
         // But api.post accepts FormData if we construct it, or we can use our helper.
@@ -84,7 +290,77 @@ export const isolineService = {
 
         return api.post<ComputeResponse>('/isoline/compute', formData, {
             headers: { 'Content-Type': 'multipart/form-data' }
+        }).then(withDecodedPaths);
+    },
+
+    // One upload, metrics for every mounting height / tilt / LLF combination
+    sweep: async (file: File, params: SweepRequest) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('params', JSON.stringify({ pathEncoding: 'delta', ...params }));
+
+        const data = await api.post<SweepResponse>('/isoline/sweep', formData, {
+            headers: { 'Content-Type': 'multipart/form-data' }
         });
+        return {
+            ...data,
+            combinations: data.combinations.map(combo => combo.levels
+                ? { ...combo, levels: withDecodedPaths({ levels: combo.levels } as ComputeResponse).levels }
+                : combo),
+        };
+    },
+
+    // Facade / tilted-plane illuminance, all planes in one request
+    computePlanes: async (file: File, params: PlaneComputeRequest) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('params', JSON.stringify({ pathEncoding: 'delta', ...params }));
+
+        const data = await api.post<PlaneComputeResponse>('/isoline/compute-planes', formData, {
+            headers: { 'Content-Type': 'multipart/form-data' }
+        });
+        return {
+            ...data,
+            planes: data.planes.map(plane => ({
+                ...plane,
+                levels: withDecodedPaths({ levels: plane.levels } as ComputeResponse).levels,
+            })),
+        };
+    },
+
+    // Zonal lumens, BUG rating and beam spreads (cached per file on the server)
+    photometryReport: async (file: File) => {
+        return api.upload<PhotometryReport>('/isoline/photometry', file);
+    },
+
+    // Polar candela plot as an image Blob, e.g. for URL.createObjectURL
+    polarPlot: async (file: File, format: 'png' | 'svg' = 'png', title?: string) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('params', JSON.stringify({ format, title }));
+        return api.upload<Blob>('/isoline/photometry/polar-plot', formData, { responseType: 'blob' });
+    },
+
+    // Prepares a site surface once; studies reference it by terrainId
+    uploadTerrain: async (terrain: TerrainRequest) => {
+        return api.post<TerrainResponse>('/isoline/terrain', terrain);
+    },
+
+    // Isolines over a prepared terrain; 404 once the server has evicted it
+    computeTerrain: async (file: File, params: TerrainComputeRequest) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('params', JSON.stringify({ pathEncoding: 'delta', ...params }));
+
+        return api.post<ComputeResponse>('/isoline/compute-terrain', formData, {
+            headers: { 'Content-Type': 'multipart/form-data' }
+        }).then(withDecodedPaths);
+    },
+
+    // Re-contours a cached grid at new iso levels; 404 once the server has evicted it
+    recontour: async (resultId: string, isoLevels: IsolineLevel[]) => {
+        return api.post<ComputeResponse>('/isoline/recontour', { resultId, isoLevels, pathEncoding: 'delta' })
+            .then(withDecodedPaths);
     },
 
     exportPdf: async (isolineData: ComputeResponse, options: ExportOptions) => {
@@ -93,10 +369,15 @@ export const isolineService = {
         // The original implementation used a form submit to open in new tab/download. 
         // Let's preserve that behavior as requested ("DO NOT change the core UX flows").
         // We just need to make sure the URL is correct.
-        submitForm(`${API_URL}/isoline/export-pdf`, { isolineData, options });
+        submitForm(`${API_URL}/isoline/export-pdf`, exportBody(isolineData, options));
     },
 
     exportPng: async (isolineData: ComputeResponse, options: ExportOptions) => {
-        submitForm(`${API_URL}/isoline/export-png`, { isolineData, options });
+        submitForm(`${API_URL}/isoline/export-png`, exportBody(isolineData, options));
+    },
+
+    // Layered vector files for CAD; options.format picks 'svg' or 'dxf'
+    exportVector: async (isolineData: ComputeResponse, options: ExportOptions) => {
+        submitForm(`${API_URL}/isoline/export-${options.format}`, exportBody(isolineData, options));
     },
 };
@@ -15,6 +15,9 @@ import { TransmittalModal } from './components/TransmittalModal';
 import { PAGE_LAYOUT } from '../../layouts/pageLayoutTokens';
 import { TOOL_CANVAS_SURFACE, TOOL_CARD_PADDED, TOOL_PAGE_TITLE } from '../../styles/toolStyleTokens';
 
+// Graphics changes listed per sheet in the narrative prompt (a redrawn sheet can have hundreds)
+const MAX_PROMPT_DRAWING_CHANGES = 50;
+
 const ChangeNarrativePage: React.FC = () => {
     const { geminiApiKey } = useAiConfig();
     const [isKeyModalOpen, setIsKeyModalOpen] = useState(false);
@@ -109,9 +112,21 @@ const ChangeNarrativePage: React.FC = () => {
                     : "";
 
                 let changesContext = "";
-                if (sheet.changes && sheet.changes.length > 0) {
-                    const changeList = sheet.changes.map(c =>
-                        `- [${c.type}] "${c.text}" (Near: ${c.location_context || 'General'})`
+                const drawingChanges = sheet.drawingChanges ?? [];
+                if ((sheet.changes && sheet.changes.length > 0) || drawingChanges.length > 0) {
+                    const changeList = (sheet.changes ?? []).map(c => {
+                        let detail = '';
+                        if (c.type === 'EDITED' && c.edits && c.edits.length > 0) {
+                            detail = ` (Edits: ${c.edits.map(e => `"${e.previous}" -> "${e.current}"`).join(', ')})`;
+                        } else if (c.type === 'MOVED') {
+                            detail = ` (From: ${c.previousLocationContext || 'General'})`;
+                        }
+                        return `- [${c.type}] "${c.text}"${detail} (Near: ${c.location_context || 'General'})`;
+                    }).concat(drawingChanges.slice(0, MAX_PROMPT_DRAWING_CHANGES).map(d =>
+                        `- [${d.type} GRAPHIC] ${d.pathCount} path(s) (Near: ${d.location_context || 'General'})`
+                    )).concat(drawingChanges.length > MAX_PROMPT_DRAWING_CHANGES
+                        ? [`- ...and ${drawingChanges.length - MAX_PROMPT_DRAWING_CHANGES} more graphic changes`]
+                        : []
                     ).join('\n');
 
                     changesContext = `\nSPECIFIC CHANGES DETECTED:\n${changeList}\n\nINSTRUCTIONS: You are a Lighting Design Construction Administrator. Use the above changes to write the narrative. \n\nREQUIRED FORMAT RULES:\n1. OUTPUT FORMAT:\n   - Provide ONLY a bulleted list.\n   - Do NOT include the Sheet Number/Title in the bullets (that is handled by the system).\n   - TEMPLATE for each bullet: "* [Room Name OR Grid Location] - [1 Sentence description]"\n\n2. EXAMPLES:\n   - "* Vestibule 101 - Added luminaire type TB, removed type TA."\n   - "* General Note 4 - Revised requirements for wireless testing."\n   - "* B-4 Region - Relocated Type X fixture to match grid."\n\n3. CONCISENESS & COMPLETENESS:\n   - Be CONCISE (max 20 words per bullet).
@@ -259,8 +274,7 @@ const ChangeNarrativePage: React.FC = () => {
                             sheetId={selectedSheetId}
                             sheets={sheets}
                             setSheets={setSheets}
-                            prevPdf={prevPdf}
-                            currPdf={currPdf}
+                            sessionId={results?.sessionId ?? null}
                         />
                     </div>
                 </div>
@@ -5,6 +5,7 @@ import { API_BASE_URL } from '../../../config';
 import {
     TOOL_CANVAS_SURFACE,
     TOOL_CARD,
+    TOOL_CHIP_ACTIVE,
     TOOL_CHIP_INACTIVE,
     TOOL_TEXTAREA
 } from '../../../styles/toolStyleTokens';
@@ -13,24 +14,26 @@ interface SheetDetailViewProps {
     sheetId: string | null;
     sheets: SheetData[];
     setSheets: React.Dispatch<React.SetStateAction<SheetData[]>>;
-    prevPdf: File | null;
-    currPdf: File | null;
+    sessionId: string | null;
 }
 
 export const SheetDetailView: React.FC<SheetDetailViewProps> = ({
     sheetId,
     sheets,
     setSheets,
-    prevPdf,
-    currPdf
+    sessionId
 }) => {
     const [isLoadingPreviews, setIsLoadingPreviews] = React.useState(false);
     const [previewError, setPreviewError] = React.useState<string | null>(null);
+    const [selectedRegion, setSelectedRegion] = React.useState<number | null>(null);
+    const [regionCrop, setRegionCrop] = React.useState<{ previous: string | null; current: string | null } | null>(null);
+    const [isLoadingCrop, setIsLoadingCrop] = React.useState(false);
+    const [cropError, setCropError] = React.useState<string | null>(null);
 
     const sheet = React.useMemo(() => sheets.find(s => s.sheetId === sheetId), [sheets, sheetId]);
 
     React.useEffect(() => {
-        if (!sheetId || !sheet || !prevPdf || !currPdf) return;
+        if (!sheetId || !sheet || !sessionId) return;
 
         // If we already have previews for this sheet, don't fetch again
         if (sheet.previousPreviewBase64 && sheet.currentPreviewBase64) return;
@@ -39,17 +42,20 @@ export const SheetDetailView: React.FC<SheetDetailViewProps> = ({
             setIsLoadingPreviews(true);
             setPreviewError(null);
             try {
+                // The PDFs stay on the server for the comparison session
                 const formData = new FormData();
+                formData.append('sessionId', sessionId);
                 formData.append('sheetNumber', sheet.sheetNumber);
-                formData.append('previousPdf', prevPdf);
-                formData.append('currentPdf', currPdf);
 
                 const res = await fetch(`${API_BASE_URL}/api/change-narrative/preview`, {
                     method: 'POST',
                     body: formData
                 });
 
-                if (!res.ok) throw new Error("Failed to load previews");
+                if (!res.ok) {
+                    const errorData = await res.json().catch(() => null);
+                    throw new Error(errorData?.detail || "Failed to load previews");
+                }
 
                 const data = await res.json();
 
@@ -68,7 +74,44 @@ export const SheetDetailView: React.FC<SheetDetailViewProps> = ({
         };
 
         fetchPreviews();
-    }, [sheetId, sheet, prevPdf, currPdf, setSheets]);
+    }, [sheetId, sheet, sessionId, setSheets]);
+
+    React.useEffect(() => {
+        setSelectedRegion(null);
+        setRegionCrop(null);
+        setCropError(null);
+    }, [sheetId]);
+
+    const showRegion = async (regionIndex: number) => {
+        if (!sheet || !sessionId) return;
+        setSelectedRegion(regionIndex);
+        setRegionCrop(null);
+        setIsLoadingCrop(true);
+        setCropError(null);
+        try {
+            const formData = new FormData();
+            formData.append('sessionId', sessionId);
+            formData.append('sheetNumber', sheet.sheetNumber);
+            formData.append('regionIndex', String(regionIndex));
+
+            const res = await fetch(`${API_BASE_URL}/api/change-narrative/region-crop`, {
+                method: 'POST',
+                body: formData
+            });
+
+            if (!res.ok) {
+                const errorData = await res.json().catch(() => null);
+                throw new Error(errorData?.detail || "Failed to load region");
+            }
+
+            setRegionCrop(await res.json());
+        } catch (err: unknown) {
+            console.error(err);
+            setCropError(err instanceof Error ? err.message : 'Failed to load region');
+        } finally {
+            setIsLoadingCrop(false);
+        }
+    };
 
     if (!sheetId) {
         return (
@@ -160,6 +203,51 @@ export const SheetDetailView: React.FC<SheetDetailViewProps> = ({
                     </div>
                 </div>
             </div>
+
+            {/* Changed Regions */}
+            {displayedSheet.changedRegions && displayedSheet.changedRegions.length > 0 && (
+                <div className={`${TOOL_CARD} p-6 space-y-4`}>
+                    <h4 className="text-sm font-bold text-app-text-muted uppercase">Changed Regions</h4>
+                    <div className="flex flex-wrap gap-2">
+                        {displayedSheet.changedRegions.map((region, i) => (
+                            <button
+                                key={i}
+                                onClick={() => showRegion(i)}
+                                className={selectedRegion === i ? TOOL_CHIP_ACTIVE : `${TOOL_CHIP_INACTIVE} border border-app-border`}
+                            >
+                                Region {i + 1} ({Math.round(region.x1 - region.x0)} × {Math.round(region.y1 - region.y0)} pt)
+                            </button>
+                        ))}
+                    </div>
+                    {selectedRegion !== null && (
+                        isLoadingCrop ? (
+                            <div className="flex items-center gap-2 text-app-text-muted text-xs">
+                                <Loader2 className="w-4 h-4 text-app-primary animate-spin" />
+                                <span>Rendering region...</span>
+                            </div>
+                        ) : cropError ? (
+                            <div className="text-xs text-app-text-muted">{cropError}</div>
+                        ) : regionCrop && (
+                            <div className="grid grid-cols-2 gap-6">
+                                {(['previous', 'current'] as const).map(key => (
+                                    <div key={key} className="space-y-2">
+                                        <span className="text-xs font-bold text-app-text-muted uppercase tracking-wider">
+                                            {key === 'previous' ? 'Previous Issue' : 'Current Issue'}
+                                        </span>
+                                        <div className="bg-app-bg border border-app-border rounded-2xl overflow-hidden shadow-inner">
+                                            {regionCrop[key] ? (
+                                                <img src={`data:image/png;base64,${regionCrop[key]}`} className="w-full h-auto" />
+                                            ) : (
+                                                <div className="p-4 text-app-text-muted text-xs">Not on this issue</div>
+                                            )}
+                                        </div>
+                                    </div>
+                                ))}
+                            </div>
+                        )
+                    )}
+                </div>
+            )}
         </div>
     );
 };
@@ -14,9 +14,34 @@ export const SheetKind = {
     OTHER: "other" as SheetKind
 };
 
+export interface TextEdit {
+    previous: string;
+    current: string;
+}
+
 export interface ChangeItem {
     text: string;
-    type: "ADDED" | "REMOVED";
+    type: "ADDED" | "REMOVED" | "MOVED" | "EDITED";
+    location_context?: string;
+    previousText?: string; // EDITED
+    previousLocationContext?: string; // MOVED
+    edits?: TextEdit[]; // EDITED, word-level
+}
+
+export interface ChangedRegion {
+    // Page points, origin top-left as in the previews
+    x0: number;
+    y0: number;
+    x1: number;
+    y1: number;
+}
+
+export interface DrawingChange {
+    // A group of added, removed or moved vector paths (e.g. a fixture symbol)
+    type: "ADDED" | "REMOVED" | "MOVED";
+    bbox: ChangedRegion;
+    previousBbox?: ChangedRegion; // MOVED
+    pathCount: number;
     location_context?: string;
 }
 
@@ -34,6 +59,8 @@ export interface SheetData {
     oneLineSummary?: string;
     isIncluded?: boolean;
     changes: ChangeItem[];
+    changedRegions?: ChangedRegion[]; // crops via /region-crop
+    drawingChanges?: DrawingChange[];
 }
 
 export interface TagConsistencyReport {
@@ -49,4 +76,5 @@ export interface TagConsistencyReport {
 export interface ComparisonResponse {
     sheets: SheetData[];
     tagConsistency: TagConsistencyReport;
+    sessionId?: string; // server-side copy of both PDFs, used by /preview
 }